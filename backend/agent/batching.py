@@ -0,0 +1,89 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import List, Optional, Set, Tuple
+import numpy as np
+from agent.perception import Detections, PerceptionEngine
+
+PendingFrame = Tuple[np.ndarray, Optional[str], asyncio.Future]
+
+class MicroBatcher:
+    def __init__(
+        self,
+        perception: PerceptionEngine,
+        executor: Optional[Executor] = None,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_in_flight: int = 1,
+    ):
+        """
+        Groups frames from many cameras into batched detect calls.
+        :param max_batch_size: Largest number of frames sent to the model at once.
+        :param max_wait_ms: How long the first queued frame may wait for others to join its batch.
+        :param max_in_flight: Batches running at the same time (usually the model pool size).
+        """
+        self.perception = perception
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self._slots = asyncio.Semaphore(max(1, max_in_flight))
+        self._pending: List[PendingFrame] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.frames = 0
+
+    @property
+    def average_batch_size(self) -> float:
+        return self.frames / self.batches if self.batches else 0.0
+
+    async def detect(self, frame: np.ndarray, camera_id: Optional[str] = None) -> Detections:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((frame, camera_id, future))
+        if len(self._pending) >= self.max_batch_size or self.max_wait_ms <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def reset_camera(self, camera_id: Optional[str]):
+        self.perception.reset_camera(camera_id)
+
+    def _flush(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            task = asyncio.get_running_loop().create_task(self._run_batch())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self):
+        # The batch is cut only once a slot is free, so frames that arrive
+        # while the model is busy join the next batch instead of queueing alone
+        async with self._slots:
+            batch = [p for p in self._pending[:self.max_batch_size] if not p[2].done()]
+            del self._pending[:self.max_batch_size]
+            if self._pending and self._timer is None:
+                self._flush()
+            if not batch:
+                return
+
+            frames, camera_ids, futures = zip(*batch)
+            loop = asyncio.get_running_loop()
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.perception.detect_batch, list(frames), list(camera_ids)
+                )
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            self.batches += 1
+            self.frames += len(batch)
+            for future, detections in zip(futures, results):
+                if not future.done():
+                    future.set_result(detections)
@@ -1,11 +1,66 @@
-from typing import List
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
+import config
 from agent.perception import Incident
-from incidents.logger import IncidentLogger
+from incidents.logger import incident_logger
 
 class DecisionEngine:
-    def __init__(self):
-        self.logger = IncidentLogger()
+    def __init__(
+        self,
+        confidence_threshold: float = config.INCIDENT_CONFIDENCE_THRESHOLD,
+        cooldown_seconds: float = config.INCIDENT_COOLDOWN_SECONDS,
+    ):
+        self.logger = incident_logger
+        self.confidence_threshold = confidence_threshold
+        self.cooldown_seconds = cooldown_seconds
+        # (worker_id, incident type) -> monotonic time of the last incident, within the cooldown
+        self._last_raised: Dict[Tuple[str, str], float] = {}
+
+    def evaluate(self, result: Dict[str, Any], worker_id: str, camera_id: Optional[str] = None, zone: Optional[str] = None) -> Optional[Incident]:
+        """
+        Turns a rules or LLM verdict into an Incident.
+        Low-confidence verdicts and repeats of the same violation within the cooldown are ignored.
+        :param camera_id: Camera and zone the worker was in, so the incident can be scoped to them.
+        """
+        if not result or not result.get("incident"):
+            return None
+        confidence = float(result.get("confidence", 0.0))
+        if confidence <= self.confidence_threshold:
+            return None
+
+        reason = result.get("reason", "")
+        incident_type = result.get("type") or self._infer_type(reason)
+        now = time.monotonic()
+        key = (worker_id, incident_type)
+        if now - self._last_raised.get(key, float("-inf")) < self.cooldown_seconds:
+            return None
+        # Track ids keep growing on a long-running camera; expired entries no longer suppress anything
+        self._last_raised = {k: t for k, t in self._last_raised.items() if now - t < self.cooldown_seconds}
+        self._last_raised[key] = now
+
+        return Incident(
+            id=f"INC-{uuid.uuid4().hex[:8]}",
+            timestamp=datetime.now().isoformat(),
+            workerId=worker_id,
+            type=incident_type,
+            severity=result.get("severity") or ("High" if incident_type == "PPE Violation" else "Medium"),
+            confidence=confidence,
+            details=reason,
+            acknowledged=False,
+            cameraId=camera_id,
+            zone=zone,
+        )
+
+    def _infer_type(self, reason: str) -> str:
+        text = reason.lower()
+        if any(word in text for word in ("ppe", "helmet", "vest")):
+            return "PPE Violation"
+        if "posture" in text:
+            return "Unsafe Posture"
+        return "Zone Intrusion"
 
     def act(self, decisions: List[Incident], frame: np.ndarray):
         """
@@ -14,5 +69,5 @@ class DecisionEngine:
         """
         for incident in decisions:
             # Filter Gemini's output (e.g., if confidence > 0.85: log_incident())
-            if incident.confidence > 0.85:
-                self.logger.log_incident(incident, frame)
+            if incident.confidence > self.confidence_threshold:
+                self.logger.log(incident, frame)
@@ -0,0 +1,103 @@
+import asyncio
+import inspect
+import traceback
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Union
+import config
+from agent.reasoning_client import AsyncReasoningClient
+
+ResultCallback = Callable[[Dict[str, Any]], Union[Awaitable[None], None]]
+
+class EscalationQueue:
+    def __init__(
+        self,
+        reasoning: Optional[AsyncReasoningClient] = None,
+        maxsize: int = config.ESCALATION_QUEUE_SIZE,
+        concurrency: int = config.ESCALATION_CONCURRENCY,
+    ):
+        """
+        Sends ambiguous timelines to the LLM in the background.
+        At most one request per key is outstanding and submissions are dropped
+        rather than queued without bound. Rate limiting and batching of the
+        concurrent timelines happen in the reasoning client.
+        """
+        self.reasoning = reasoning or AsyncReasoningClient()
+        self.maxsize = maxsize
+        self.concurrency = max(1, concurrency)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending: Set[Hashable] = set()
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+
+    def submit(
+        self,
+        key: Hashable,
+        worker_id: str,
+        timeline: List[Any],
+        on_result: ResultCallback,
+        camera_id: Optional[str] = None,
+        features: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Queue a timeline without blocking. Returns False if it was dropped.
+        :param camera_id: Camera the worker is on, whose zones the verdict is based on.
+        :param features: WorkerFeatures.to_dict() of the worker, sent along with the timeline.
+        """
+        if key in self._pending:
+            return False
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((key, worker_id, timeline, on_result, camera_id, features))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self._pending.add(key)
+        self.submitted += 1
+        return True
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.concurrency:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._queue = None
+        self._pending.clear()
+        await self.reasoning.aclose()
+
+    async def _worker(self):
+        while True:
+            key, worker_id, timeline, on_result, camera_id, features = await self._queue.get()
+            try:
+                result = await self.reasoning.analyze_worker(worker_id, timeline, camera_id, features)
+                outcome = on_result({"source": "llm", **result})
+                if inspect.isawaitable(outcome):
+                    await outcome
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in escalation for {worker_id}: {e}")
+                traceback.print_exc()
+            finally:
+                self._pending.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            **self.reasoning.stats(),
+        }
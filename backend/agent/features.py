@@ -0,0 +1,105 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+import config
+
+MICROS = 1_000_000
+
+@dataclass
+class WorkerFeatures:
+    """
+    Streaming aggregates of one worker's observations, updated in O(1) per sample.
+    Times are microseconds since epoch, as stored by WorkerMemory.
+    """
+    stationary_speed: float = config.FEATURE_STATIONARY_SPEED
+    smoothing: float = config.FEATURE_VELOCITY_SMOOTHING
+    first_seen: Optional[int] = None
+    last_seen: Optional[int] = None
+    x: float = 0.0
+    y: float = 0.0
+    # Smoothed velocity in normalized units (percent of the frame) per second
+    vx: float = 0.0
+    vy: float = 0.0
+    zone: Optional[str] = None
+    zone_since: Optional[int] = None
+    zone_transitions: int = 0
+    # Seconds spent per zone, up to the latest sample
+    zone_dwell: Dict[str, float] = field(default_factory=dict)
+    helmet_seen: Optional[int] = None
+    vest_seen: Optional[int] = None
+    stationary_since: Optional[int] = None
+    samples: int = 0
+
+    def observe(self, micros: int, x: float, y: float, zone: str, has_helmet: bool, has_vest: bool):
+        if self.last_seen is None:
+            self.first_seen = self.zone_since = micros
+            self.zone = zone
+        else:
+            dt = (micros - self.last_seen) / MICROS
+            if dt > 0:
+                # Time since the previous sample counts towards the zone it was in
+                self.zone_dwell[self.zone] = self.zone_dwell.get(self.zone, 0.0) + dt
+                self.vx += self.smoothing * ((x - self.x) / dt - self.vx)
+                self.vy += self.smoothing * ((y - self.y) / dt - self.vy)
+                if self.speed < self.stationary_speed:
+                    if self.stationary_since is None:
+                        self.stationary_since = self.last_seen
+                else:
+                    self.stationary_since = None
+            if zone != self.zone:
+                self.zone = zone
+                self.zone_since = micros
+                self.zone_transitions += 1
+
+        if has_helmet:
+            self.helmet_seen = micros
+        if has_vest:
+            self.vest_seen = micros
+        self.x, self.y = x, y
+        self.last_seen = micros
+        self.samples += 1
+
+    @property
+    def speed(self) -> float:
+        return (self.vx ** 2 + self.vy ** 2) ** 0.5
+
+    @property
+    def status(self) -> str:
+        return 'Stationary' if self.stationary_since is not None else 'Moving'
+
+    def _seconds_since(self, micros: Optional[int]) -> float:
+        if self.last_seen is None:
+            return 0.0
+        # Never seen counts from the first sample
+        start = micros if micros is not None else self.first_seen
+        return (self.last_seen - start) / MICROS
+
+    @property
+    def stationary_seconds(self) -> float:
+        return self._seconds_since(self.stationary_since) if self.stationary_since is not None else 0.0
+
+    @property
+    def zone_seconds(self) -> float:
+        return self._seconds_since(self.zone_since)
+
+    @property
+    def seconds_without_helmet(self) -> float:
+        return self._seconds_since(self.helmet_seen)
+
+    @property
+    def seconds_without_vest(self) -> float:
+        return self._seconds_since(self.vest_seen)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact feature vector for the rules and the reasoning prompt."""
+        return {
+            "zone": self.zone,
+            "zone_seconds": round(self.zone_seconds, 2),
+            "zone_dwell": {zone: round(seconds, 2) for zone, seconds in self.zone_dwell.items()},
+            "zone_transitions": self.zone_transitions,
+            "seconds_without_helmet": round(self.seconds_without_helmet, 2),
+            "seconds_without_vest": round(self.seconds_without_vest, 2),
+            "speed": round(self.speed, 2),
+            "status": self.status,
+            "stationary_seconds": round(self.stationary_seconds, 2),
+            "tracked_seconds": round(self._seconds_since(None), 2),
+        }
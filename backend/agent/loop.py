@@ -1,22 +1,43 @@
 import asyncio
 import os
 import traceback
-from video.ingest import VideoIngest
+import uuid
+from typing import Optional, Union
+import config
+from video.capture import CaptureProcess, CaptureThread, FrameQueue
+from video.shm import FrameRing, SharedFrameReader
 from agent.perception import PerceptionEngine, SystemState, TimelineEvent
+from agent.batching import MicroBatcher
 from agent.memory import Memory
-from agent.reasoning import ReasoningEngine
+from agent.throttle import TokenBucket
+from agent.rules import RulesEngine
+from agent.escalation import EscalationQueue
 from agent.decision import DecisionEngine
-from incidents.logger import IncidentLogger
+from incidents.logger import IncidentLogger, incident_logger
 from api.server import ConnectionManager
 from datetime import datetime
 
 class AgentRunner:
-    def __init__(self, manager: ConnectionManager):
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        camera_id: Optional[str] = None,
+        batcher: Optional[MicroBatcher] = None,
+        inference_budget: Optional[TokenBucket] = None,
+        escalation: Optional[EscalationQueue] = None,
+    ):
         self.manager = manager
+        self.camera_id = camera_id
+        # Shared across runners when owned by the AgentSupervisor
+        self.batcher = batcher or MicroBatcher(PerceptionEngine(), max_batch_size=1)
+        self.inference_budget = inference_budget
+        self.escalation = escalation or EscalationQueue()
         self.running = False
         self.task = None
         self.video_source = None
-        self.current_video_ingest = None
+        self.capture: Optional[Union[CaptureThread, CaptureProcess]] = None
+        self.frames: Optional[Union[FrameQueue, SharedFrameReader]] = None
+        self.ring: Optional[FrameRing] = None
 
     async def start(self, video_source: str):
         if self.running:
@@ -26,7 +47,7 @@ class AgentRunner:
         self.video_source = video_source
         self.running = True
         self.task = asyncio.create_task(self._loop())
-        print(f"Agent started with source: {video_source}")
+        print(f"Agent started for camera {self.camera_id} with source: {video_source}")
 
     async def stop(self):
         if not self.running:
@@ -34,8 +55,10 @@ class AgentRunner:
             
         print("Stopping Agent...")
         self.running = False
-        if self.current_video_ingest:
-            self.current_video_ingest.stop()
+        if self.capture:
+            # Joining may wait on a blocking read, so keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.capture.stop, 5)
+            self.capture = None
             
         if self.task:
             try:
@@ -43,100 +66,137 @@ class AgentRunner:
             except asyncio.CancelledError:
                 pass
             self.task = None
+        if self.ring:
+            # Only once the loop no longer holds views into it
+            self.ring.close()
+            self.ring = None
+        # A restarted pipeline should not inherit tracks from the old source
+        self.batcher.reset_camera(self.camera_id)
         print("Agent Stopped")
 
+    def _act(self, result, worker_id: str, zone: str, frame, box, decision: DecisionEngine, logger: IncidentLogger, memory: Memory):
+        incident = decision.evaluate(result, worker_id, self.camera_id, zone)
+        if not incident:
+            return
+
+        # Log (the snapshot is encoded off the loop from this frame copy; None logs without one)
+        logger.log(incident, frame, box)
+        
+        # Add to global timeline
+        memory.add_timeline_event(TimelineEvent(
+            # Unique, since delta clients key timeline events by id
+            id=f"evt_{uuid.uuid4().hex[:8]}",
+            workerId=worker_id,
+            timestamp=datetime.now().isoformat(),
+            type="Violation",
+            description=f"{incident.type}: {incident.details}"
+        ))
+
     async def _loop(self):
         print(f"Initializing Sentinel Agent with video source: {self.video_source}")
         
         # Initialize Modules
         try:
-            self.current_video_ingest = VideoIngest(self.video_source, fps_limit=5)
-            perception = PerceptionEngine() # Loads YOLO
-            memory = Memory(retention_seconds=10)
-            reasoning = ReasoningEngine()
+            memory = Memory()
+            rules = RulesEngine()
             decision = DecisionEngine()
-            logger = IncidentLogger()
+            logger = incident_logger
         except Exception as e:
             print(f"Initialization Error: {e}")
             self.running = False
             return
 
+        # Staged pipeline: capture thread -> bounded frame queue -> batched inference -> async publish
+        if config.CAPTURE_PROCESS:
+            # Capture process -> shared-memory ring, read without copying
+            self.ring = FrameRing.create(config.FRAME_RING_SLOTS, config.FRAME_RING_SLOT_BYTES)
+            self.frames = SharedFrameReader(self.ring)
+            self.capture = CaptureProcess(self.video_source, self.frames, fps_limit=config.CAMERA_FPS)
+        else:
+            self.frames = FrameQueue(maxsize=config.FRAME_QUEUE_SIZE, policy=config.FRAME_QUEUE_POLICY)
+            self.capture = CaptureThread(self.video_source, self.frames, fps_limit=config.CAMERA_FPS)
+        self.capture.start()
+
         print("Agent Loop Started")
         
         frame_count = 0
         
-        # Video generator is synchronous, so we iterate but must yield for asyncio
-        video_gen = self.current_video_ingest.get_frames()
-        
         while self.running:
             try:
-                # Manually iterate generator to allow await
-                try:
-                    timestamp, frame = next(video_gen)
-                except StopIteration:
-                    print("Video ended. Restarting...")
-                    self.current_video_ingest.stop()
-                    # Re-init video
-                    if not self.running: break
-                    self.current_video_ingest = VideoIngest(self.video_source, fps_limit=5)
-                    video_gen = self.current_video_ingest.get_frames()
-                    continue
-                except Exception as e:
-                    print(f"Video Error: {e}")
-                    await asyncio.sleep(1)
+                packet = await self.frames.get_async(timeout=1.0)
+                if packet is None:
+                    if self.frames.closed:
+                        break
                     continue
+                timestamp, frame = packet
                     
-                # 1. Perception
-                workers = perception.detect(frame)
+                # 1. Perception (throttled by the supervisor's global inference cap)
+                if self.inference_budget:
+                    await self.inference_budget.acquire()
+                # The tracker has already consumed the frame, so the result is always kept;
+                # a reused shared-memory slot only rules out snapshots (see step 3)
+                detections = await self.batcher.detect(frame, self.camera_id)
+                # Worker objects are built once here, at the API boundary
+                workers = detections.to_workers()
                 
-                # 2. Memory
-                memory.update(workers)
+                # 2. Memory (stale tracks are evicted here)
+                left = memory.update(workers, detections.timestamp)
+                if config.MEMORY_WORKER_LEFT_EVENTS:
+                    for worker_id in left:
+                        memory.add_timeline_event(TimelineEvent(
+                            id=f"evt_{uuid.uuid4().hex[:8]}",
+                            workerId=worker_id,
+                            timestamp=detections.timestamp,
+                            type="Worker Left",
+                            description=f"{worker_id} left the scene"
+                        ))
                 
                 # 3. Reasoning & Decision (Throttled)
                 if frame_count % 5 == 0: # Every ~1 sec
+                    # Incidents may be logged after the frame's slot is reused, so they get their own
+                    # copy; None if the slot was already reused, and the incident has no snapshot
+                    snapshot = self.frames.detach(frame) if workers else None
                     for w in workers:
                         mem = memory.get_worker_memory(w.id)
                         if not mem: continue
                         
-                        timeline = mem.get_timeline(seconds=5)
+                        timeline = mem.get_timeline(seconds=config.REASONING_WINDOW_SECONDS)
                         
                         # Only reason if we have enough history
                         if len(timeline) > 3: 
-                            result = reasoning.analyze_worker(w.id, timeline)
-                            
-                            incident = decision.evaluate(result, w.id)
-                            
-                            if incident:
-                                # Log
-                                logger.log(incident, frame)
-                                
-                                # Add to global timeline
-                                memory.add_timeline_event(TimelineEvent(
-                                    id=f"evt_{int(datetime.now().timestamp())}",
-                                    workerId=w.id,
-                                    timestamp=datetime.now().isoformat(),
-                                    type="Violation",
-                                    description=f"{incident.type}: {incident.details}"
-                                ))
+                            # Clear cases are settled locally; ambiguous ones go to the LLM in the background
+                            result = rules.evaluate(timeline, self.camera_id, mem.features)
+                            if result is None:
+                                self.escalation.submit(
+                                    (self.camera_id, w.id), w.id, timeline,
+                                    lambda result, worker_id=w.id, zone=w.zone, box=detections.box_of(w.id): self._act(
+                                        result, worker_id, zone, snapshot, box, decision, logger, memory
+                                    ),
+                                    camera_id=self.camera_id,
+                                    features=mem.features.to_dict(),
+                                )
+                            else:
+                                self._act(result, w.id, w.zone, snapshot, detections.box_of(w.id), decision, logger, memory)
 
                 # 4. Broadcast State
-                recent_incidents = logger.get_all()[:10]
+                recent_incidents = logger.recent(10, self.camera_id)
                 
                 state = SystemState(
                     workers=workers,
                     incidents=recent_incidents,
                     timeline=memory.get_global_timeline(),
                     stats={
-                        "fps": 5, 
+                        "fps": config.CAMERA_FPS, 
                         "active_workers": len(workers),
+                        "dropped_frames": self.frames.dropped,
                         "system_status": "Autonomous" if self.running else "Stopped"
-                    }
+                    },
+                    camera_id=self.camera_id
                 )
                 
                 await self.manager.broadcast(state.model_dump())
                 
                 frame_count += 1
-                await asyncio.sleep(0.01) # Yield to event loop
                 
             except Exception as e:
                 print(f"Error in Agent Loop: {e}")
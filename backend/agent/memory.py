@@ -1,63 +1,201 @@
-from collections import deque
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import config
+from agent.features import WorkerFeatures
 from agent.perception import Worker, TimelineEvent
 
+STATUSES = ('Moving', 'Stationary', 'Working')
+_STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+HELMET_BIT = 1
+VEST_BIT = 2
+
+# lastSeen strings are naive ISO timestamps; they are stored as exact microsecond offsets
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def to_micros(timestamp: str) -> int:
+    return (datetime.fromisoformat(timestamp).replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+
+def from_micros(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+class ZoneCodes:
+    """Interns zone names as small integers, shared by all worker memories."""
+    def __init__(self):
+        self.names: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
 class WorkerMemory:
-    def __init__(self, max_len: int = 100):
-        self.history: deque[Worker] = deque(maxlen=max_len)
+    def __init__(self, max_len: int = 100, zones: Optional[ZoneCodes] = None):
+        """
+        Columnar history of one worker.
+        Samples are appended to arrays twice the retained length; when they fill up,
+        the newest max_len samples are moved to the front, so appends are amortized O(1)
+        and the history is always one contiguous, time-ordered slice.
+        Streaming features (dwell, PPE, motion) are kept alongside in `features`.
+        """
+        self.max_len = max_len
+        self.zones = zones or ZoneCodes()
+        capacity = 2 * max_len
+        self.times = np.zeros(capacity, dtype=np.int64)  # microseconds since epoch
+        # float64, so timelines return the exact values perception reported
+        self.xy = np.zeros((capacity, 2), dtype=np.float64)
+        self.zone_codes = np.zeros(capacity, dtype=np.int16)
+        self.ppe = np.zeros(capacity, dtype=np.uint8)  # HELMET_BIT | VEST_BIT
+        self.status_codes = np.zeros(capacity, dtype=np.int8)
+        self.confidence = np.zeros(capacity, dtype=np.float64)
+        self.worker_id: Optional[str] = None
+        self.features = WorkerFeatures()
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def last_seen(self) -> Optional[int]:
+        return int(self.times[self._end - 1]) if self._end > self._start else None
 
-    def update(self, worker_state: Worker):
-        """Add new observations to a deque/list."""
-        self.history.append(worker_state)
+    def _columns(self) -> Tuple[np.ndarray, ...]:
+        return self.times, self.xy, self.zone_codes, self.ppe, self.status_codes, self.confidence
 
-    def get_timeline(self, seconds: int = 10) -> List[Worker]:
+    def update(self, worker_state: Worker, micros: Optional[int] = None):
+        """
+        Add new observations to the ring buffer.
+        The stored status is derived from the worker's motion, not taken from perception.
+        """
+        if micros is None:
+            micros = to_micros(worker_state.lastSeen)
+        self.features.observe(
+            micros, worker_state.x, worker_state.y, worker_state.zone,
+            worker_state.hasHelmet, worker_state.hasVest,
+        )
+        if self._end == len(self.times):
+            # Slide the retained window to the front
+            keep = self._end - self.max_len
+            for column in self._columns():
+                column[:self.max_len] = column[keep:self._end]
+            self._start, self._end = 0, self.max_len
+
+        i = self._end
+        self.worker_id = worker_state.id
+        self.times[i] = micros
+        self.xy[i] = (worker_state.x, worker_state.y)
+        self.zone_codes[i] = self.zones.code(worker_state.zone)
+        self.ppe[i] = (HELMET_BIT if worker_state.hasHelmet else 0) | (VEST_BIT if worker_state.hasVest else 0)
+        self.status_codes[i] = _STATUS_CODES[self.features.status]
+        self.confidence[i] = worker_state.confidence
+        self._end += 1
+        self._start = max(self._start, self._end - self.max_len)
+
+    def window(self, seconds: float = 10) -> slice:
+        """Index range of the samples within `seconds` of the latest one, by binary search."""
+        if self._end == self._start:
+            return slice(0, 0)
+        cutoff = self.times[self._end - 1] - int(seconds * 1_000_000)
+        first = self._start + int(np.searchsorted(self.times[self._start:self._end], cutoff, side='left'))
+        return slice(first, self._end)
+
+    def get_timeline(self, seconds: int = 10) -> List[dict]:
         """Retrieve the recent history of a worker to allow reasoning about duration."""
-        if not self.history:
+        window = self.window(seconds)
+        if window.stop == window.start:
             return []
-
-        # Assuming the latest state is the reference point for 'now'
-        last_state = self.history[-1]
-        try:
-            now = datetime.fromisoformat(last_state.lastSeen)
-        except ValueError:
-            return list(self.history)
-
-        cutoff = now - timedelta(seconds=seconds)
-        
-        timeline = []
-        # Iterate backwards to find states within the window
-        for state in reversed(self.history):
-            try:
-                state_time = datetime.fromisoformat(state.lastSeen)
-                if state_time < cutoff:
-                    break
-                timeline.insert(0, state)
-            except ValueError:
-                continue
-            
-        return timeline
+        names = self.zones.names
+        ppe = self.ppe[window]
+        xs, ys = self.xy[window, 0].tolist(), self.xy[window, 1].tolist()
+        return [
+            {
+                "id": self.worker_id,
+                "x": x,
+                "y": y,
+                "hasHelmet": bool(bits & HELMET_BIT),
+                "hasVest": bool(bits & VEST_BIT),
+                "zone": names[zone],
+                "status": STATUSES[status],
+                "lastSeen": from_micros(micros),
+                "confidence": conf,
+            }
+            for micros, x, y, zone, bits, status, conf in zip(
+                self.times[window].tolist(), xs, ys, self.zone_codes[window].tolist(),
+                ppe.tolist(), self.status_codes[window].tolist(), self.confidence[window].tolist(),
+            )
+        ]
 
 class Memory:
-    def __init__(self, retention_seconds: int = 10):
-        self.workers: Dict[str, WorkerMemory] = {}
+    def __init__(self, retention_seconds: float = config.MEMORY_RETENTION_SECONDS, max_tracks: int = config.MEMORY_MAX_TRACKS):
+        """
+        Per-worker histories plus the global event timeline.
+        Workers not seen for retention_seconds are forgotten, and beyond max_tracks
+        (0 = no cap) the least recently seen are dropped, except those in the current frame. Eviction runs on every update
+        and only looks at the workers it removes.
+        """
+        # Ordered from least to most recently seen
+        self.workers: "OrderedDict[str, WorkerMemory]" = OrderedDict()
+        self.zones = ZoneCodes()
         self.global_timeline: List[TimelineEvent] = []
         self.retention_seconds = retention_seconds
+        self.max_tracks = max_tracks
+        self._last_stamp: Tuple[Optional[str], int] = (None, 0)
+
+    def _micros(self, timestamp: str) -> int:
+        # All workers of a frame share one timestamp, so it is parsed once per frame
+        if self._last_stamp[0] != timestamp:
+            self._last_stamp = (timestamp, to_micros(timestamp))
+        return self._last_stamp[1]
 
-    def update(self, workers: List[Worker]):
+    def update(self, workers: List[Worker], timestamp: Optional[str] = None) -> List[str]:
+        """
+        Record a frame's workers and evict stale tracks.
+        Each worker's status is set to the one derived from its motion.
+        :param timestamp: Frame time, so eviction also runs for frames without workers.
+        :return: Ids of the workers that were evicted.
+        """
         for w in workers:
-            if w.id not in self.workers:
-                self.workers[w.id] = WorkerMemory()
-            self.workers[w.id].update(w)
+            memory = self.workers.get(w.id)
+            if memory is None:
+                memory = self.workers[w.id] = WorkerMemory(zones=self.zones)
+            else:
+                self.workers.move_to_end(w.id)
+            memory.update(w, self._micros(w.lastSeen))
+            w.status = memory.features.status
+
+        now = self._micros(timestamp) if timestamp else (self._last_stamp[1] if workers else None)
+        return self._evict(now)
+
+    def _evict(self, now: Optional[int]) -> List[str]:
+        evicted = []
+        cutoff = now - int(self.retention_seconds * 1_000_000) if now is not None else None
+        while self.workers:
+            worker_id, memory = next(iter(self.workers.items()))
+            expired = cutoff is not None and (memory.last_seen is None or memory.last_seen < cutoff)
+            # Workers of the current frame are never dropped by the cap; they sit at the tail,
+            # so the cap may be exceeded while one frame has more than max_tracks workers
+            current = now is not None and memory.last_seen == now
+            if not expired and (current or not (self.max_tracks and len(self.workers) > self.max_tracks)):
+                break
+            del self.workers[worker_id]
+            evicted.append(worker_id)
+        return evicted
 
     def get_worker_memory(self, worker_id: str) -> Optional[WorkerMemory]:
         return self.workers.get(worker_id)
-        
+
     def add_timeline_event(self, event: TimelineEvent):
         self.global_timeline.append(event)
         # Keep global timeline manageable
         if len(self.global_timeline) > 100:
              self.global_timeline.pop(0)
-        
+
     def get_global_timeline(self) -> List[TimelineEvent]:
         return self.global_timeline
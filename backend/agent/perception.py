@@ -1,9 +1,15 @@
 from pydantic import BaseModel
-from typing import Literal, List, Optional, Dict
+from typing import Literal, List, Optional, Dict, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from ultralytics import YOLO
+import queue
+import threading
 import cv2
 import numpy as np
+import config
+from agent.zones import ZoneEngine, zone_engine
 
 # --- Data Models ---
 
@@ -13,7 +19,7 @@ class Worker(BaseModel):
     y: float  # Normalized 0-100
     hasHelmet: bool
     hasVest: bool
-    zone: Literal['Safe', 'Loading Dock', 'Excavation Pit']
+    zone: str  # Name from the camera's zone config
     status: Literal['Moving', 'Stationary', 'Working']
     lastSeen: str
     confidence: float
@@ -27,12 +33,15 @@ class Incident(BaseModel):
     confidence: float
     details: str
     acknowledged: bool
+    # Where it happened; missing on incidents recorded before cameras were tracked
+    cameraId: Optional[str] = None
+    zone: Optional[str] = None
 
 class TimelineEvent(BaseModel):
     id: str
     workerId: str
     timestamp: str
-    type: Literal['Zone Change', 'Status Change', 'Violation']
+    type: Literal['Zone Change', 'Status Change', 'Violation', 'Worker Left']
     description: str
 
 class SystemState(BaseModel):
@@ -40,78 +49,199 @@ class SystemState(BaseModel):
     incidents: List[Incident]
     timeline: List[TimelineEvent]
     stats: dict
+    camera_id: Optional[str] = None
+
+@dataclass
+class Detections:
+    """
+    Tracked people in one frame, stored column-wise.
+    Per-worker pydantic objects are only built at the API boundary (to_workers / to_dicts).
+    """
+    ids: np.ndarray         # (N,) track ids
+    xyxy: np.ndarray        # (N, 4) pixel boxes
+    confidence: np.ndarray  # (N,)
+    feet: np.ndarray        # (N, 2) pixel feet points
+    norm: np.ndarray        # (N, 2) feet points normalized to 0-100
+    zone_codes: np.ndarray  # (N,) indexes into zone_names
+    has_helmet: np.ndarray  # (N,) bool
+    has_vest: np.ndarray    # (N,) bool
+    timestamp: str
+    zone_names: Sequence[str] = ("Safe",)
+    status: str = "Moving"  # Until agent Memory derives it from motion
+
+    @classmethod
+    def empty(cls, timestamp: str) -> "Detections":
+        return cls(
+            ids=np.zeros(0, dtype=np.int64),
+            xyxy=np.zeros((0, 4), dtype=np.float32),
+            confidence=np.zeros(0, dtype=np.float32),
+            feet=np.zeros((0, 2), dtype=np.float32),
+            norm=np.zeros((0, 2), dtype=np.float32),
+            zone_codes=np.zeros(0, dtype=np.int16),
+            has_helmet=np.zeros(0, dtype=bool),
+            has_vest=np.zeros(0, dtype=bool),
+            timestamp=timestamp,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def worker_ids(self) -> List[str]:
+        return [f"p_{i}" for i in self.ids.tolist()]
+
+    def box_of(self, worker_id: str) -> Optional[List[float]]:
+        matches = np.flatnonzero(self.ids == int(worker_id.split("_", 1)[1]))
+        return self.xyxy[matches[0]].tolist() if len(matches) else None
+
+    def to_dicts(self) -> List[dict]:
+        """Plain dicts in the Worker schema, converted with one tolist() per column."""
+        zones = [self.zone_names[c] for c in self.zone_codes.tolist()]
+        xs, ys = self.norm[:, 0].tolist(), self.norm[:, 1].tolist()
+        return [
+            {
+                "id": worker_id,
+                "x": x,
+                "y": y,
+                "hasHelmet": helmet,
+                "hasVest": vest,
+                "zone": zone,
+                "status": self.status,
+                "lastSeen": self.timestamp,
+                "confidence": conf,
+            }
+            for worker_id, x, y, helmet, vest, zone, conf in zip(
+                self.worker_ids(), xs, ys, self.has_helmet.tolist(), self.has_vest.tolist(),
+                zones, self.confidence.tolist(),
+            )
+        ]
+
+    def to_workers(self) -> List[Worker]:
+        # Values are already well-typed, so skip pydantic validation
+        return [Worker.model_construct(**d) for d in self.to_dicts()]
+
+# --- Model Pool ---
+
+class ModelPool:
+    def __init__(self, model_path: str = config.MODEL_PATH, size: int = 1):
+        """
+        Shared YOLO instances for all camera pipelines.
+        Models are loaded lazily and leased to one caller at a time.
+        """
+        self.model_path = model_path
+        self.size = max(1, size)
+        self._available: queue.Queue = queue.Queue()
+        self._loaded = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self):
+        model = None
+        with self._lock:
+            if self._available.empty() and self._loaded < self.size:
+                self._loaded += 1
+                model = YOLO(self.model_path)
+        if model is None:
+            model = self._available.get()
+        try:
+            yield model
+        finally:
+            self._available.put(model)
+
+def create_tracker(tracker_config: str = config.TRACKER_CONFIG):
+    """Build a standalone Ultralytics tracker so each camera keeps its own track state."""
+    from ultralytics.utils import IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+    from ultralytics.trackers.track import TRACKER_MAP
+    try:
+        from ultralytics.utils import YAML
+        cfg = YAML.load(check_yaml(tracker_config))
+    except ImportError:
+        from ultralytics.utils import yaml_load
+        cfg = yaml_load(check_yaml(tracker_config))
+    args = IterableSimpleNamespace(**cfg)
+    return TRACKER_MAP[args.tracker_type](args=args)
 
 # --- Perception Engine ---
 
 class PerceptionEngine:
-    def __init__(self, model_path: str = 'yolov8n.pt'):
-        self.model = YOLO(model_path)
+    def __init__(
+        self,
+        model_path: str = config.MODEL_PATH,
+        pool: Optional[ModelPool] = None,
+        zones: Optional[ZoneEngine] = None,
+    ):
+        # Cameras share the pool's models; a private pool keeps standalone use working
+        self.pool = pool or ModelPool(model_path)
+        self.zones = zones or zone_engine
+        # Tracker state is kept per camera so one engine can serve many streams
+        self.trackers: Dict[Optional[str], object] = {}
+        self._trackers_lock = threading.Lock()
         # Class mapping for COCO: 0 is person
         self.target_classes = [0] 
 
-    def detect(self, frame) -> List[Worker]:
-        # Run tracking (persist=True enables ID tracking across frames)
-        results = self.model.track(frame, persist=True, classes=self.target_classes, verbose=False)
-        
-        workers = []
+    def _tracker_for(self, camera_id: Optional[str]):
+        with self._trackers_lock:
+            tracker = self.trackers.get(camera_id)
+            if tracker is None:
+                tracker = self.trackers[camera_id] = create_tracker()
+            return tracker
+
+    def reset_camera(self, camera_id: Optional[str]):
+        """Drop tracker state for a camera, e.g. when its pipeline stops."""
+        with self._trackers_lock:
+            self.trackers.pop(camera_id, None)
+
+    def detect(self, frame, camera_id: Optional[str] = None) -> Detections:
+        return self.detect_batch([frame], [camera_id])[0]
+
+    def detect_batch(self, frames: List[np.ndarray], camera_ids: List[Optional[str]]) -> List[Detections]:
+        """
+        Run one batched forward pass over frames from any number of cameras.
+        Frames are tracked in list order, each with its own camera's tracker.
+        """
+        if len(frames) != len(camera_ids):
+            raise ValueError("frames and camera_ids must have the same length")
+        if not frames:
+            return []
+
+        with self.pool.lease() as model:
+            results = model.predict(frames, classes=self.target_classes, verbose=False)
+
+        return [
+            self._track(frame, result, camera_id)
+            for frame, result, camera_id in zip(frames, results, camera_ids)
+        ]
+
+    def _track(self, frame, result, camera_id: Optional[str]) -> Detections:
         height, width, _ = frame.shape
         timestamp = datetime.now().isoformat()
-        
-        if not results:
-            return []
-            
-        r = results[0]
-        if not r.boxes:
-            return []
-            
-        for box in r.boxes:
-            # Get ID (if tracking is working, id is present)
-            track_id = int(box.id.item()) if box.id is not None else -1
-            if track_id == -1:
-                continue # Skip untracked
-                
-            # Get coordinates
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            w, h = x2 - x1, y2 - y1
-            cx = x1 + w / 2
-            cy = y2 # Use feet position for zone detection
             
-            # Normalize to 0-100 for frontend
-            norm_x = (cx / width) * 100
-            norm_y = (cy / height) * 100
-            
-            # Determine Zone
-            zone = self._determine_zone(norm_x, norm_y)
-            
-            # PPE Detection (Mocked for Phase 1/2 - to be replaced with 2nd stage classifier)
-            # For demo: randomly assign or assume compliant unless in specific debug mode
-            # We'll default to compliant for now.
-            has_helmet = True
-            has_vest = True
-            
-            # Create Worker Object
-            worker = Worker(
-                id=f"p_{track_id}",
-                x=norm_x,
-                y=norm_y,
-                hasHelmet=has_helmet,
-                hasVest=has_vest,
-                zone=zone,
-                status="Moving", # Simple placeholder
-                lastSeen=timestamp,
-                confidence=float(box.conf[0].item())
-            )
-            workers.append(worker)
-            
-        return workers
-
-    def _determine_zone(self, x: float, y: float) -> str:
-        # Simple hardcoded zones based on 0-100 grid
-        # Safe: Default
-        # Loading Dock: Right side
-        # Excavation Pit: Bottom Left
-        if x > 60 and y < 50:
-            return 'Loading Dock'
-        if x < 45 and y > 50:
-            return 'Excavation Pit'
-        return 'Safe'
+        # Empty frames still update the tracker so lost tracks age out
+        # Each row: x1, y1, x2, y2, track_id, score, cls, det_idx
+        tracks = self._tracker_for(camera_id).update(result.boxes.cpu().numpy(), frame)
+        if len(tracks) == 0:
+            return Detections.empty(timestamp)
+
+        tracks = np.asarray(tracks, dtype=np.float32)
+        xyxy = tracks[:, :4]
+        # Feet position (bottom centre) is used for zone detection
+        feet = np.column_stack(((xyxy[:, 0] + xyxy[:, 2]) / 2, xyxy[:, 3]))
+        # Normalize to 0-100 for frontend
+        norm = feet / np.array([width, height], dtype=np.float32) * 100
+        count = len(tracks)
+        zone_map = self.zones.zone_map(camera_id)
+
+        # PPE Detection (Mocked for Phase 1/2 - to be replaced with 2nd stage classifier)
+        # We'll default to compliant for now.
+        return Detections(
+            ids=tracks[:, 4].astype(np.int64),
+            xyxy=xyxy,
+            confidence=tracks[:, 5],
+            feet=feet,
+            norm=norm,
+            zone_codes=zone_map.lookup(norm),
+            has_helmet=np.ones(count, dtype=bool),
+            has_vest=np.ones(count, dtype=bool),
+            timestamp=timestamp,
+            zone_names=zone_map.names,
+        )
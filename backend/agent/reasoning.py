@@ -1,104 +1,77 @@
-import os
 import json
-import google.generativeai as genai
-from typing import List, Dict, Any, Union
-from dotenv import load_dotenv
+from typing import Iterable, List, Dict, Any, Optional, Set, Union
+import config
+from agent.zones import zone_engine
 
-# Load environment variables
-load_dotenv()
+def _zone_list(names: Iterable[str]) -> str:
+    quoted = [f"'{name}'" for name in sorted(names)]
+    if len(quoted) < 2:
+        return "".join(quoted) or "none"
+    return f"{', '.join(quoted[:-1])} and {quoted[-1]}"
 
-# Configure Gemini
-GENAI_API_KEY = os.getenv("GENAI_API_KEY")
-if GENAI_API_KEY:
-    genai.configure(api_key=GENAI_API_KEY)
+def _zone_rule(hazardous: Union[Set[str], Dict[str, Set[str]]]) -> str:
+    if isinstance(hazardous, dict):
+        groups: Dict[frozenset, List[str]] = {}
+        for timeline_id, names in hazardous.items():
+            groups.setdefault(frozenset(names), []).append(timeline_id)
+        if len(groups) > 1:
+            per_timeline = "; ".join(f"{', '.join(ids)}: {_zone_list(names)}" for names, ids in groups.items())
+            return f"Hazardous Zones: the high-risk zones depend on the timeline ({per_timeline})."
+        hazardous = next(iter(groups), frozenset())
+    return f"Hazardous Zones: {_zone_list(hazardous)} {'is' if len(hazardous) == 1 else 'are'} high-risk."
 
-class ReasoningEngine:
-    def __init__(self, model_name: str = "gemini-1.5-flash"):
-        self.model_name = model_name
-        try:
-            self.model = genai.GenerativeModel(self.model_name)
-        except Exception as e:
-            print(f"Warning: Failed to initialize Gemini model: {e}")
-            self.model = None
-
-    def create_prompt(self, timeline_json: str) -> str:
-        return f"""
-You are a construction safety officer AI. Analyze the following worker timeline for safety incidents.
-
-Timeline Data:
-{timeline_json}
-
-Safety Rules:
+def safety_rules(hazardous: Union[Set[str], Dict[str, Set[str]]]) -> str:
+    """
+    Safety rules for the prompt. Hazardous zones come from the zone config, like in
+    RulesEngine, so the model and the local rules agree on them.
+    :param hazardous: Hazardous zone names, or names per timeline id for a batch whose
+                      cameras have different zones.
+    """
+    return f"""Safety Rules:
 1. PPE Compliance: Workers must have 'hasHelmet': true and 'hasVest': true at all times.
-2. Hazardous Zones: 'Loading Dock' and 'Excavation Pit' are high-risk.
-3. Loitering: Status 'Stationary' in a hazardous zone for more than 5 seconds is a warning.
+2. {_zone_rule(hazardous)}
+3. Loitering: Status 'Stationary' in a hazardous zone for more than {config.RULES_LOITER_SECONDS:g} seconds is a warning."""
 
-Task:
-Determine if there is a safety incident based on the timeline.
-Return ONLY a valid JSON object with no markdown formatting, matching this schema:
-{{
-  "incident": boolean,
-  "reason": "concise explanation of the violation or 'Safe'",
-  "confidence": float between 0.0 and 1.0
-}}
-"""
+def timeline_to_data(timeline: List[Any]) -> List[Any]:
+    """Convert a timeline of Worker objects or dicts to JSON-serializable data."""
+    timeline_data = []
+    for item in timeline:
+        if hasattr(item, 'model_dump'):
+            timeline_data.append(item.model_dump())
+        elif hasattr(item, 'dict'):
+            timeline_data.append(item.dict())
+        else:
+            timeline_data.append(item)
+    return timeline_data
 
-    def analyze_safety(self, timeline: List[Any]) -> Dict[str, Any]:
-        if not self.model:
-             # Fallback logic if model is not available (e.g. for testing without key)
-             # Basic heuristic check
-             for item in timeline:
-                 if isinstance(item, dict):
-                     zone = item.get('zone')
-                     status = item.get('status')
-                 else:
-                     zone = getattr(item, 'zone', 'Safe')
-                     status = getattr(item, 'status', 'Moving')
-                 
-                 if zone == 'Excavation Pit':
-                      return {"incident": True, "reason": "Zone Intrusion: Excavation Pit", "confidence": 0.8}
-             
-             return {"incident": False, "reason": "AI model not initialized", "confidence": 0.0}
+def parse_json_response(result_text: str) -> Any:
+    result_text = result_text.strip()
+    # Clean up potential markdown formatting just in case
+    if result_text.startswith("```"):
+        lines = result_text.splitlines()
+        if lines[0].startswith("```"):
+            lines = lines[1:]
+        if lines[-1].startswith("```"):
+            lines = lines[:-1]
+        result_text = "\n".join(lines)
+    return json.loads(result_text)
 
-        # Convert timeline to JSON
-        timeline_data = []
-        for item in timeline:
-            if hasattr(item, 'model_dump'):
-                timeline_data.append(item.model_dump())
-            elif hasattr(item, 'dict'):
-                timeline_data.append(item.dict())
-            else:
-                timeline_data.append(item)
-                
-        timeline_json = json.dumps(timeline_data, default=str)
-        prompt = self.create_prompt(timeline_json)
+def heuristic_analysis(timeline: List[Any], hazardous: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """
+    Basic heuristic check used when the model is unavailable.
+    :param hazardous: Hazardous zone names; defaults to those of the default camera.
+    """
+    if hazardous is None:
+        hazardous = zone_engine.hazardous_zones()
+    for item in timeline:
+        if isinstance(item, dict):
+            zone = item.get('zone')
+            status = item.get('status')
+        else:
+            zone = getattr(item, 'zone', 'Safe')
+            status = getattr(item, 'status', 'Moving')
         
-        try:
-            # Request JSON response
-            response = self.model.generate_content(
-                prompt, 
-                generation_config={"response_mime_type": "application/json"}
-            )
-            
-            result_text = response.text.strip()
-            # Clean up potential markdown formatting just in case
-            if result_text.startswith("```"):
-                lines = result_text.splitlines()
-                if lines[0].startswith("```"):
-                    lines = lines[1:]
-                if lines[-1].startswith("```"):
-                    lines = lines[:-1]
-                result_text = "\n".join(lines)
-            
-            return json.loads(result_text)
-        except Exception as e:
-            print(f"Error in analyze_safety: {e}")
-            return {
-                "incident": False, 
-                "reason": f"Analysis error: {str(e)}", 
-                "confidence": 0.0
-            }
-
-    def analyze_worker(self, worker_id: str, timeline: List[Any]) -> Dict[str, Any]:
-        """Wrapper for analyze_safety to match existing loop usage."""
-        return self.analyze_safety(timeline)
+        if zone in hazardous:
+             return {"incident": True, "reason": f"Zone Intrusion: {zone}", "confidence": 0.8}
+    
+    return {"incident": False, "reason": "AI model not initialized", "confidence": 0.0}
@@ -0,0 +1,85 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import config
+from agent.rules import get_field
+
+def timeline_fingerprint(timeline: List[Any], cell_size: float = config.REASONING_CACHE_CELL_SIZE) -> str:
+    """
+    Canonical key for the safety-relevant content of a timeline.
+    Consecutive samples with the same zone, PPE flags, status and coarse grid cell
+    collapse into one run; only each run's state and whole-second duration are kept,
+    so timestamps and sub-cell jitter do not change the key.
+    """
+    runs: List[Tuple[tuple, Any, Any]] = []
+    for item in timeline:
+        state = (
+            get_field(item, 'zone'),
+            bool(get_field(item, 'hasHelmet', True)),
+            bool(get_field(item, 'hasVest', True)),
+            get_field(item, 'status'),
+            int(float(get_field(item, 'x', 0.0)) // cell_size),
+            int(float(get_field(item, 'y', 0.0)) // cell_size),
+        )
+        if runs and runs[-1][0] == state:
+            runs[-1] = (state, runs[-1][1], item)
+        else:
+            runs.append((state, item, item))
+
+    canonical = []
+    for state, first, last in runs:
+        try:
+            duration = (datetime.fromisoformat(get_field(last, 'lastSeen')) - datetime.fromisoformat(get_field(first, 'lastSeen'))).total_seconds()
+        except (TypeError, ValueError):
+            duration = 0.0
+        canonical.append((state, round(duration)))
+    return hashlib.sha1(repr(canonical).encode()).hexdigest()
+
+class ReasoningCache:
+    def __init__(self, max_size: int = config.REASONING_CACHE_SIZE, ttl: float = config.REASONING_CACHE_TTL):
+        """LRU cache of reasoning verdicts with a time-to-live per entry."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, verdict = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return verdict
+
+    def put(self, key: str, verdict: Dict[str, Any]):
+        self._entries[key] = (time.monotonic(), verdict)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,216 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+import httpx
+import config
+from agent.reasoning import heuristic_analysis, parse_json_response, safety_rules, timeline_to_data
+from agent.reasoning_cache import ReasoningCache, timeline_fingerprint
+from agent.throttle import CircuitBreaker, TokenBucket
+from agent.zones import ZoneEngine, zone_engine
+
+# worker_id, timeline, streaming features, hazardous zones of its camera, fingerprint, future
+PendingTimeline = Tuple[str, List[Any], Optional[Dict[str, Any]], Set[str], str, asyncio.Future]
+
+class AsyncReasoningClient:
+    def __init__(
+        self,
+        api_key: Optional[str] = config.GENAI_API_KEY,
+        model_name: str = config.REASONING_MODEL,
+        base_url: str = config.GENAI_BASE_URL,
+        max_concurrency: int = config.REASONING_MAX_CONCURRENCY,
+        rate_per_key: float = config.REASONING_RATE_PER_KEY,
+        max_batch_size: int = config.REASONING_MAX_BATCH_SIZE,
+        max_wait_ms: float = config.REASONING_MAX_WAIT_MS,
+        timeout: float = config.REASONING_TIMEOUT,
+        breaker: Optional[CircuitBreaker] = None,
+        cache: Optional[ReasoningCache] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        zones: Optional[ZoneEngine] = None,
+    ):
+        """
+        Asynchronous Gemini client for safety reasoning.
+        Timelines submitted close together are sent as one multi-result prompt.
+        Requests are bounded by a concurrency pool and a token bucket per API key.
+        Timeouts and errors feed a circuit breaker; while it is open, and for any
+        timeline the model did not answer, the local heuristic is used instead.
+        Verdicts are cached by timeline fingerprint, so an unchanged situation
+        reuses the previous answer instead of calling the model again.
+        :param transport: Optional httpx transport, e.g. to target an in-process stub server.
+        :param zones: Source of each camera's hazardous zones for the prompt and the heuristic.
+        """
+        self.api_key = api_key
+        self.model_name = model_name
+        self.base_url = base_url.rstrip("/")
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self.timeout = timeout
+        self.rate_per_key = rate_per_key
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=config.REASONING_BREAKER_FAILURES,
+            reset_timeout=config.REASONING_BREAKER_RESET_SECONDS,
+        )
+        self.cache = cache if cache is not None else ReasoningCache()
+        self.transport = transport
+        self.zones = zones or zone_engine
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._pending: Dict[str, List[PendingTimeline]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # The loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self._http: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.failures = 0
+        self.fallbacks = 0
+
+    async def analyze(
+        self,
+        worker_id: str,
+        timeline: List[Any],
+        api_key: Optional[str] = None,
+        camera_id: Optional[str] = None,
+        features: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Verdict for one worker's timeline.
+        :param features: WorkerFeatures.to_dict() of the worker, sent with the timeline.
+        """
+        hazardous = self.zones.hazardous_zones(camera_id)
+        # A verdict only holds for the zones that were hazardous when it was given
+        fingerprint = f"{timeline_fingerprint(timeline)}|{','.join(sorted(hazardous))}"
+        cached = self.cache.get(fingerprint)
+        if cached is not None:
+            return {**cached, "source": "cache"}
+
+        key = api_key or self.api_key
+        if not key or self.breaker.state == "open":
+            return self._fallback(timeline, hazardous)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((worker_id, timeline, features, hazardous, fingerprint, future))
+        if len(pending) >= self.max_batch_size or self.max_wait_ms <= 0:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait_ms / 1000, self._flush, key)
+        return await future
+
+    def analyze_worker(self, worker_id: str, timeline: List[Any], camera_id: Optional[str] = None, features: Optional[Dict[str, Any]] = None):
+        """Alias of analyze() under the name EscalationQueue calls."""
+        return self.analyze(worker_id, timeline, camera_id=camera_id, features=features)
+
+    async def aclose(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        if self._http:
+            await self._http.aclose()
+            self._http = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "fallbacks": self.fallbacks,
+            "breaker": self.breaker.state,
+            "cache": self.cache.stats(),
+        }
+
+    def _fallback(self, timeline: List[Any], hazardous: Set[str]) -> Dict[str, Any]:
+        self.fallbacks += 1
+        return {**heuristic_analysis(timeline, hazardous), "source": "fallback"}
+
+    def _bucket(self, key: str) -> TokenBucket:
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(rate=self.rate_per_key)
+        return self._buckets[key]
+
+    def _flush(self, key: str):
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        pending = self._pending.get(key)
+        while pending:
+            batch = pending[:self.max_batch_size]
+            del pending[:self.max_batch_size]
+            task = asyncio.get_running_loop().create_task(self._send(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, key: str, batch: List[PendingTimeline]):
+        results: Dict[str, Dict[str, Any]] = {}
+        async with self._slots:
+            await self._bucket(key).acquire()
+            if self.breaker.allow():
+                try:
+                    results = await asyncio.wait_for(self._request(key, batch), self.timeout)
+                    self.breaker.record_success()
+                except Exception as e:
+                    self.failures += 1
+                    self.breaker.record_failure()
+                    print(f"Error in reasoning request: {e!r}")
+
+        for i, (worker_id, timeline, features, hazardous, fingerprint, future) in enumerate(batch):
+            if future.done():
+                continue
+            result = results.get(f"t{i}")
+            if isinstance(result, dict) and "incident" in result:
+                # Only model answers are cached; fallbacks should be retried
+                self.cache.put(fingerprint, result)
+                future.set_result({**result, "source": "llm"})
+            else:
+                future.set_result(self._fallback(timeline, hazardous))
+
+    def create_batch_prompt(self, batch: List[PendingTimeline]) -> str:
+        # Batch-local ids keep workers from different cameras apart
+        timelines = {f"t{i}": timeline_to_data(pending[1]) for i, pending in enumerate(batch)}
+        features = {f"t{i}": pending[2] for i, pending in enumerate(batch) if pending[2] is not None}
+        hazardous = {f"t{i}": pending[3] for i, pending in enumerate(batch)}
+        return f"""
+You are a construction safety officer AI. Analyze each of the following worker timelines for safety incidents.
+
+Timelines (keyed by timeline id):
+{json.dumps(timelines, default=str)}
+
+Features over each worker's whole track (keyed by timeline id; durations in seconds):
+{json.dumps(features)}
+
+{safety_rules(hazardous)}
+
+Task:
+Determine independently for every timeline if there is a safety incident.
+Return ONLY a valid JSON object with no markdown formatting, matching this schema:
+{{
+  "results": [
+    {{
+      "timeline_id": "id from the input",
+      "incident": boolean,
+      "type": "PPE Violation" | "Zone Intrusion" | "Unsafe Posture" | null,
+      "reason": "concise explanation of the violation or 'Safe'",
+      "confidence": float between 0.0 and 1.0
+    }}
+  ]
+}}
+"""
+
+    async def _request(self, key: str, batch: List[PendingTimeline]) -> Dict[str, Dict[str, Any]]:
+        if self._http is None:
+            self._http = httpx.AsyncClient(base_url=self.base_url, transport=self.transport, timeout=self.timeout)
+        self.requests += 1
+        response = await self._http.post(
+            f"/v1beta/models/{self.model_name}:generateContent",
+            headers={"x-goog-api-key": key},
+            json={
+                "contents": [{"role": "user", "parts": [{"text": self.create_batch_prompt(batch)}]}],
+                "generationConfig": {"responseMimeType": "application/json"},
+            },
+        )
+        response.raise_for_status()
+        text = response.json()["candidates"][0]["content"]["parts"][0]["text"]
+        payload = parse_json_response(text)
+        return {
+            item["timeline_id"]: {k: v for k, v in item.items() if k != "timeline_id"}
+            for item in payload.get("results", [])
+            if isinstance(item, dict) and "timeline_id" in item
+        }
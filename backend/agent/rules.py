@@ -0,0 +1,129 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+import config
+from agent.features import WorkerFeatures
+from agent.zones import ZoneEngine, zone_engine
+
+Verdict = Dict[str, Any]
+Rule = Callable[[List[Any], Set[str], Optional[WorkerFeatures]], Optional[Verdict]]
+
+# Returned by a rule when the timeline needs judgment beyond the local rules
+ESCALATE: Verdict = {"escalate": True}
+
+def get_field(item: Any, name: str, default: Any = None) -> Any:
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+def _seconds_between(start: Any, end: Any) -> float:
+    try:
+        return (datetime.fromisoformat(get_field(end, 'lastSeen')) - datetime.fromisoformat(get_field(start, 'lastSeen'))).total_seconds()
+    except (TypeError, ValueError):
+        return 0.0
+
+class RulesEngine:
+    def __init__(
+        self,
+        zones: Optional[ZoneEngine] = None,
+        ppe_violation_ratio: float = config.RULES_PPE_VIOLATION_RATIO,
+        loiter_seconds: float = config.RULES_LOITER_SECONDS,
+    ):
+        """
+        Deterministic fast path for the safety rules in the reasoning prompt (agent.reasoning.safety_rules).
+        evaluate() returns a verdict for clear cases and None when the timeline is
+        ambiguous and should be escalated to the LLM. Rules use the worker's streaming
+        features when given and fall back to scanning the timeline otherwise.
+        """
+        self.zones = zones or zone_engine
+        self.ppe_violation_ratio = ppe_violation_ratio
+        self.loiter_seconds = loiter_seconds
+        # Checked in order; the first definite finding wins
+        self.rules: List[Rule] = [self._ppe_rule, self._loitering_rule, self._hazard_presence_rule]
+
+    def evaluate(self, timeline: List[Any], camera_id: Optional[str] = None, features: Optional[WorkerFeatures] = None) -> Optional[Verdict]:
+        if not timeline:
+            return {"incident": False, "reason": "Safe", "confidence": 1.0, "source": "rules"}
+
+        hazardous = self.zones.hazardous_zones(camera_id)
+        escalate = False
+        for rule in self.rules:
+            verdict = rule(timeline, hazardous, features)
+            if verdict is ESCALATE:
+                escalate = True
+            elif verdict is not None:
+                return {**verdict, "source": "rules"}
+
+        if escalate:
+            return None
+        return {"incident": False, "reason": "Safe", "confidence": 1.0, "source": "rules"}
+
+    def _ppe_rule(self, timeline: List[Any], hazardous: Set[str], features: Optional[WorkerFeatures] = None) -> Optional[Verdict]:
+        # Rule 1: Workers must have a helmet and a vest at all times
+        span = _seconds_between(timeline[0], timeline[-1])
+        if features is not None and span > 0:
+            # Time each item has been missing, up to the timeline's length
+            missing_helmet = min(features.seconds_without_helmet, span)
+            missing_vest = min(features.seconds_without_vest, span)
+            total = span
+        else:
+            missing_helmet = sum(1 for s in timeline if not get_field(s, 'hasHelmet', True))
+            missing_vest = sum(1 for s in timeline if not get_field(s, 'hasVest', True))
+            total = len(timeline)
+        worst = max(missing_helmet, missing_vest)
+        if worst == 0:
+            return None
+
+        ratio = worst / total
+        if ratio < self.ppe_violation_ratio:
+            # Intermittent misses are usually detector flicker
+            return ESCALATE
+
+        items = [name for name, count in (("helmet", missing_helmet), ("vest", missing_vest)) if count]
+        return {
+            "incident": True,
+            "type": "PPE Violation",
+            "severity": "High",
+            "reason": f"PPE Violation: missing {' and '.join(items)}",
+            "confidence": round(0.85 + 0.15 * ratio, 3),
+        }
+
+    def _loitering_rule(self, timeline: List[Any], hazardous: Set[str], features: Optional[WorkerFeatures] = None) -> Optional[Verdict]:
+        # Rule 3: Stationary in a hazardous zone for more than the loiter threshold
+        if features is not None:
+            if features.status != 'Stationary' or features.zone not in hazardous:
+                return None
+            # The stationary run only counts from when the worker is in this zone
+            duration = min(features.stationary_seconds, features.zone_seconds)
+            zone = features.zone
+        else:
+            run_start = None
+            for state in timeline:
+                if get_field(state, 'status') == 'Stationary' and get_field(state, 'zone') in hazardous:
+                    if run_start is None:
+                        run_start = state
+                else:
+                    run_start = None
+
+            if run_start is None:
+                return None
+            last = timeline[-1]
+            duration = _seconds_between(run_start, last)
+            zone = get_field(last, 'zone')
+
+        if duration < self.loiter_seconds:
+            return ESCALATE
+        return {
+            "incident": True,
+            "type": "Zone Intrusion",
+            "severity": "Medium",
+            "reason": f"Loitering: stationary in {zone} for over {self.loiter_seconds:g}s",
+            "confidence": 0.9,
+        }
+
+    def _hazard_presence_rule(self, timeline: List[Any], hazardous: Set[str], features: Optional[WorkerFeatures] = None) -> Optional[Verdict]:
+        # Rule 2: Hazardous zones are high-risk; presence alone needs judgment
+        if features is not None:
+            present = features.zone in hazardous
+        else:
+            present = any(get_field(s, 'zone') in hazardous for s in timeline)
+        return ESCALATE if present else None
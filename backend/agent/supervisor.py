@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import config
+from agent.loop import AgentRunner
+from agent.batching import MicroBatcher
+from agent.escalation import EscalationQueue
+from agent.perception import ModelPool, PerceptionEngine
+from agent.throttle import TokenBucket
+from api.server import ConnectionManager
+
+class AgentSupervisor:
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        model_path: str = config.MODEL_PATH,
+        pool_size: int = config.MODEL_POOL_SIZE,
+        max_inference_fps: float = config.MAX_INFERENCE_FPS,
+        max_batch_size: int = config.BATCH_MAX_SIZE,
+        max_wait_ms: float = config.BATCH_MAX_WAIT_MS,
+    ):
+        """
+        Runs one AgentRunner per camera concurrently.
+        All runners share one model pool and one global inference budget,
+        so adding cameras does not load extra copies of the YOLO weights.
+        """
+        self.manager = manager
+        self.model_pool = ModelPool(model_path, size=pool_size)
+        self.inference_budget = TokenBucket(rate=max_inference_fps)
+        # One inference thread per pooled model keeps every model busy without oversubscribing
+        self.inference_executor = ThreadPoolExecutor(max_workers=self.model_pool.size, thread_name_prefix="inference")
+        # Frames from all cameras are micro-batched into one engine with per-camera trackers
+        self.batcher = MicroBatcher(
+            PerceptionEngine(pool=self.model_pool),
+            executor=self.inference_executor,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            max_in_flight=self.model_pool.size,
+        )
+        # One LLM escalation queue for all cameras so the API rate limit is global
+        self.escalation = EscalationQueue()
+        self.runners: Dict[str, AgentRunner] = {}
+
+    async def start_camera(self, camera_id: str, source: str):
+        """Start (or restart with a new source) the pipeline for one camera."""
+        runner = self.runners.get(camera_id)
+        if runner is None:
+            runner = AgentRunner(
+                self.manager,
+                camera_id=camera_id,
+                batcher=self.batcher,
+                inference_budget=self.inference_budget,
+                escalation=self.escalation,
+            )
+            self.runners[camera_id] = runner
+        elif runner.running and runner.video_source == source:
+            return
+        await runner.start(source)
+
+    async def stop_camera(self, camera_id: str):
+        runner = self.runners.pop(camera_id, None)
+        if runner:
+            await runner.stop()
+
+    async def start_all(self, cameras: List):
+        for camera in cameras:
+            await self.start_camera(camera.id, camera.source)
+
+    async def stop_all(self):
+        for camera_id in list(self.runners):
+            await self.stop_camera(camera_id)
+        await self.escalation.stop()
+
+    def is_running(self, camera_id: Optional[str] = None) -> bool:
+        if camera_id is not None:
+            runner = self.runners.get(camera_id)
+            return bool(runner and runner.running)
+        return any(r.running for r in self.runners.values())
+
+    def metrics(self) -> Dict[str, dict]:
+        return {
+            "inference": {
+                "batches": self.batcher.batches,
+                "frames": self.batcher.frames,
+                "average_batch_size": round(self.batcher.average_batch_size, 2),
+            },
+            "reasoning": self.escalation.stats(),
+            "capture": {
+                camera_id: runner.capture.stats()
+                for camera_id, runner in self.runners.items()
+                if runner.capture
+            },
+        }
+
+    def status(self) -> Dict[str, dict]:
+        return {
+            camera_id: {
+                "running": runner.running,
+                "source": runner.video_source,
+                "health": runner.capture.health if runner.capture else "stopped",
+                "lastError": runner.capture.last_error if runner.capture else None,
+            }
+            for camera_id, runner in self.runners.items()
+        }
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+import cv2
+import numpy as np
+import config
+
+DEFAULT_CAMERA = "default"
+
+class ZoneMap:
+    def __init__(self, zones: List[dict], default_zone: str = "Safe", grid_size: int = 200):
+        """
+        Rasterized polygon zones for one camera.
+        Polygons are in normalized 0-100 coordinates; each grid cell stores a zone code,
+        so assigning zones to N points is a single array lookup.
+        Later zones in the list take priority where polygons overlap.
+        """
+        self.grid_size = grid_size
+        self.zones = zones
+        self.names: List[str] = [default_zone]
+        hazardous = [False]
+        codes: Dict[str, int] = {default_zone: 0}
+        self.mask = np.zeros((grid_size, grid_size), dtype=np.uint16)
+        # 4 fractional bits keep polygon edges accurate to 1/16 of a cell
+        scale = grid_size / 100 * 16
+
+        for zone in zones:
+            name = zone["name"]
+            if name not in codes:
+                codes[name] = len(self.names)
+                self.names.append(name)
+                hazardous.append(bool(zone.get("hazardous", False)))
+            points = np.round(np.asarray(zone["polygon"], dtype=np.float64) * scale).astype(np.int32)
+            cv2.fillPoly(self.mask, [points], codes[name], lineType=cv2.LINE_8, shift=4)
+
+        self.hazardous = np.array(hazardous, dtype=bool)
+
+    def lookup(self, points: np.ndarray) -> np.ndarray:
+        """Zone codes for an (N, 2) array of normalized x, y points."""
+        if len(points) == 0:
+            return np.zeros(0, dtype=np.int16)
+        cells = (np.asarray(points, dtype=np.float32) * (self.grid_size / 100)).astype(np.intp)
+        np.clip(cells, 0, self.grid_size - 1, out=cells)
+        return self.mask[cells[:, 1], cells[:, 0]].astype(np.int16)
+
+    def zone_at(self, x: float, y: float) -> str:
+        return self.names[int(self.lookup(np.array([[x, y]]))[0])]
+
+    def hazardous_names(self) -> Set[str]:
+        return {name for name, flag in zip(self.names, self.hazardous) if flag}
+
+class ZoneEngine:
+    def __init__(
+        self,
+        path: str = config.ZONES_FILE,
+        grid_size: int = config.ZONE_GRID_SIZE,
+        reload_interval: float = config.ZONES_RELOAD_INTERVAL,
+    ):
+        """
+        Loads per-camera zone polygons from a JSON file and hot-reloads them when the file changes.
+        Cameras without their own entry use the 'default' zones.
+        """
+        self.path = path
+        self.grid_size = grid_size
+        self.reload_interval = reload_interval
+        self._maps: Dict[str, ZoneMap] = {DEFAULT_CAMERA: ZoneMap([], grid_size=grid_size)}
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        mtime = None
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            default_zone = data.get("default_zone", "Safe")
+            maps = {
+                camera_id: ZoneMap(zones, default_zone=default_zone, grid_size=self.grid_size)
+                for camera_id, zones in data.get("cameras", {}).items()
+            }
+            maps.setdefault(DEFAULT_CAMERA, ZoneMap([], default_zone=default_zone, grid_size=self.grid_size))
+        except FileNotFoundError:
+            print(f"WARNING: Zones file not found at {self.path}. Using a single default zone.")
+            mtime, maps = None, {DEFAULT_CAMERA: ZoneMap([], grid_size=self.grid_size)}
+        except (ValueError, KeyError, TypeError, cv2.error) as e:
+            # Keep serving the previous zones if an edit is malformed; retry on the next change
+            print(f"Error loading zones from {self.path}: {e}")
+            self._mtime = mtime
+            return
+        # Swap in one assignment so concurrent lookups never see a partial update
+        self._maps = maps
+        self._mtime = mtime
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked < self.reload_interval:
+                return
+            self._checked = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                self.reload()
+
+    def zone_map(self, camera_id: Optional[str] = None) -> ZoneMap:
+        self._maybe_reload()
+        maps = self._maps
+        return maps.get(camera_id) or maps[DEFAULT_CAMERA]
+
+    def zone_at(self, camera_id: Optional[str], x: float, y: float) -> str:
+        return self.zone_map(camera_id).zone_at(x, y)
+
+    def hazardous_zones(self, camera_id: Optional[str] = None) -> Set[str]:
+        return self.zone_map(camera_id).hazardous_names()
+
+zone_engine = ZoneEngine()
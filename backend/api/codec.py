@@ -0,0 +1,86 @@
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Union
+
+# Binary encoders are optional; clients asking for a missing one get JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+# Short keys used by the binary encodings
+COMPACT_KEYS = {
+    "id": "i",
+    "x": "x",
+    "y": "y",
+    "hasHelmet": "h",
+    "hasVest": "v",
+    "zone": "z",
+    "status": "s",
+    "lastSeen": "t",
+    "timestamp": "t",
+    "confidence": "c",
+    "workerId": "w",
+    "type": "k",
+    "severity": "sv",
+    "details": "d",
+    "description": "d",
+    "acknowledged": "a",
+    "notes": "n",
+    "content": "ct",
+    "workers": "W",
+    "incidents": "I",
+    "timeline": "T",
+    "stats": "S",
+    "camera_id": "cam",
+    "upsert": "u",
+    "remove": "r",
+    "order": "o",
+}
+
+# Normalized 0-100 coordinates are sent as hundredths, confidences as thousandths
+COORDINATE_SCALE = 100
+CONFIDENCE_SCALE = 1000
+
+def _epoch_ms(value: Any) -> Any:
+    try:
+        return int(datetime.fromisoformat(value).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return value
+
+def compact(value: Any, key: str = None) -> Any:
+    """
+    Compact form of a state message: short keys, integer coordinates and confidences,
+    and timestamps as epoch milliseconds. Message headers (type, v, seq) keep their names.
+    """
+    if isinstance(value, dict):
+        return {
+            (k if k in ("type", "v", "seq") and key is None else COMPACT_KEYS.get(k, k)): compact(v, k)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [compact(v, key) for v in value]
+    if key in ("x", "y") and isinstance(value, float):
+        return round(value * COORDINATE_SCALE)
+    if key == "confidence" and isinstance(value, float):
+        return round(value * CONFIDENCE_SCALE)
+    if key in ("lastSeen", "timestamp") and isinstance(value, str):
+        return _epoch_ms(value)
+    return value
+
+ENCODERS: Dict[str, Callable[[Any], Union[str, bytes]]] = {"json": json.dumps}
+if msgpack is not None:
+    ENCODERS["msgpack"] = lambda message: msgpack.packb(compact(message), use_bin_type=True)
+if cbor2 is not None:
+    ENCODERS["cbor"] = lambda message: cbor2.dumps(compact(message))
+
+def negotiate(requested: str = None) -> str:
+    """The encoding to use for a client that asked for `requested`."""
+    return requested if requested in ENCODERS else "json"
+
+def encode(message: Any, encoding: str = "json") -> Union[str, bytes]:
+    return ENCODERS[encoding](message)
@@ -0,0 +1,116 @@
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple, Union
+from fastapi import WebSocket
+import config
+
+class ClientChannel:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_evict: Callable[["ClientChannel", str], Any],
+        maxsize: int = config.WS_CLIENT_QUEUE_SIZE,
+        send_timeout: float = config.WS_SEND_TIMEOUT,
+        max_overflows: int = config.WS_MAX_OVERFLOWS,
+    ):
+        """
+        Outgoing queue and writer task for one WebSocket client.
+        Messages are pre-serialized text (or bytes for binary encodings). When the queue is full the queued messages are
+        discarded so the client catches up with the latest state. A client that errors,
+        times out on a send or overflows max_overflows times in a row is evicted.
+        """
+        self.websocket = websocket
+        self.on_evict = on_evict
+        self.maxsize = max(1, maxsize)
+        self.send_timeout = send_timeout
+        self.max_overflows = max_overflows
+        # (coalesce key, message) pairs
+        self._items: Deque[Tuple[Hashable, Union[str, bytes]]] = deque()
+        self._ready = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.overflows = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def full(self) -> bool:
+        return len(self._items) >= self.maxsize
+
+    def put(self, data: Union[str, bytes], coalesce: bool = False, key: Hashable = None):
+        """
+        Queue a message without blocking.
+        :param coalesce: Replace everything still queued under the same key with this message,
+                         e.g. a full state of one camera.
+        :param key: Stream the message belongs to, e.g. its camera id.
+        """
+        if self.closed:
+            return
+        if self.full():
+            self.overflows += 1
+            if self.max_overflows and self.overflows >= self.max_overflows:
+                self.evict("slow")
+                return
+            self.dropped += len(self._items)
+            self._items.clear()
+        elif coalesce:
+            kept = deque(item for item in self._items if item[0] != key)
+            self.dropped += len(self._items) - len(kept)
+            self._items = kept
+        else:
+            self.overflows = 0
+        self._items.append((key, data))
+        self._idle.clear()
+        self._ready.set()
+
+    async def drain(self):
+        """Wait until everything queued so far has been sent or dropped."""
+        await self._idle.wait()
+
+    def evict(self, reason: str):
+        if self.closed:
+            return
+        self.closed = True
+        self.dropped += len(self._items)
+        self._items.clear()
+        self._idle.set()
+        self._ready.set()
+        self.on_evict(self, reason)
+
+    def close(self):
+        self.closed = True
+        self._items.clear()
+        self._idle.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _writer(self):
+        while not self.closed:
+            if not self._items:
+                self._idle.set()
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            _, data = self._items.popleft()
+            send = self.websocket.send_bytes if isinstance(data, bytes) else self.websocket.send_text
+            try:
+                await asyncio.wait_for(send(data), self.send_timeout)
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self.evict("timeout")
+            except Exception:
+                self.evict("error")
+        self._idle.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"depth": len(self._items), "sent": self.sent, "dropped": self.dropped}
@@ -1,17 +1,26 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, UploadFile, File, Form, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from typing import List, Optional, Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any, Set, Union
 from pydantic import BaseModel
+import asyncio
 import json
 import shutil
 import os
+import time
 import uuid
 
+import config
 from auth import routes as auth_routes
 from auth import database, models, dependencies
 from audit.logger import audit_logger
 from video.processor import VideoProcessor
+from video.results import ResultStore
+from agent.zones import zone_engine
+from api import codec
+from api.fanout import ClientChannel
+from api.stream import PROTOCOL_VERSION, StateStream, Subscription
 
 app = FastAPI(title="Sentinel API")
 
@@ -38,30 +47,159 @@ app.add_middleware(
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
+        # What each connection receives; a camera of None follows the selected camera
+        self.subscriptions: Dict[WebSocket, Subscription] = {}
+        self.default_camera_id: Optional[str] = None
+        # Connections using the delta protocol, and the cameras each has a current keyframe of
+        self.delta_clients: Set[WebSocket] = set()
+        self.synced: Dict[WebSocket, Set[Optional[str]]] = {}
+        # Negotiated wire encoding per connection (see api/codec.py)
+        self.encodings: Dict[WebSocket, str] = {}
+        # One delta stream per (camera, subscription view)
+        self.streams: Dict[tuple, StateStream] = {}
+        # Each connection is written by its own task, so a slow client never blocks a broadcast
+        self.channels: Dict[WebSocket, ClientChannel] = {}
+        self.evictions: Dict[str, int] = {}
+        self.dropped = 0
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        camera_id: Optional[str] = None,
+        protocol: Optional[str] = None,
+        subscription: Optional[Subscription] = None,
+        encoding: Optional[str] = None,
+    ):
         await websocket.accept()
         self.active_connections.append(websocket)
+        self.subscriptions[websocket] = subscription or Subscription(camera=camera_id)
+        if protocol == "delta":
+            self.delta_clients.add(websocket)
+            self.synced[websocket] = set()
+        self.encodings[websocket] = codec.negotiate(encoding)
+        channel = ClientChannel(websocket, self._evict)
+        self.channels[websocket] = channel
+        channel.start()
+        if encoding is not None:
+            # Tell the client which encoding it got; JSON if the requested one is unavailable
+            channel.put(json.dumps({"type": "hello", "v": PROTOCOL_VERSION, "encoding": self.encodings[websocket]}))
+
+    def subscribe(self, websocket: WebSocket, subscription: Subscription):
+        if websocket not in self.subscriptions:
+            return
+        self.subscriptions[websocket] = subscription
+        # The client's previous stream state no longer applies
+        self.request_keyframe(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
+        self.subscriptions.pop(websocket, None)
+        self.encodings.pop(websocket, None)
+        self.delta_clients.discard(websocket)
+        self.synced.pop(websocket, None)
+        channel = self.channels.pop(websocket, None)
+        if channel:
+            self.dropped += channel.dropped
+            channel.close()
+
+    def _evict(self, channel: ClientChannel, reason: str):
+        print(f"Evicting WebSocket client ({reason})")
+        self.evictions[reason] = self.evictions.get(reason, 0) + 1
+        self.disconnect(channel.websocket)
+        asyncio.create_task(self._close_quietly(channel.websocket))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    def request_keyframe(self, websocket: WebSocket, camera_id: Optional[str] = None):
+        """Send the next message of a camera, or of every camera, as a keyframe."""
+        synced = self.synced.get(websocket)
+        if synced is None:
+            return
+        if camera_id is None:
+            synced.clear()
+        else:
+            synced.discard(camera_id)
+
+    def _wants(self, websocket: WebSocket, camera_id: Optional[str]) -> bool:
+        if camera_id is None:
+            return True
+        wanted = self.subscriptions[websocket].camera or self.default_camera_id
+        return wanted in (None, "all", camera_id)
 
     async def broadcast(self, message: dict):
-        json_str = json.dumps(message)
+        camera_id = message.get("camera_id")
+        # Recipients are grouped by view so each slice is built and serialized once
+        groups: Dict[tuple, List[WebSocket]] = {}
         for connection in self.active_connections:
-            try:
-                await connection.send_text(json_str)
-            except Exception:
-                pass
+            if self._wants(connection, camera_id):
+                groups.setdefault(self.subscriptions[connection].view_key, []).append(connection)
+
+        for view_key, connections in groups.items():
+            view = self.subscriptions[connections[0]].view(message)
+            stream = self.streams.setdefault((camera_id, view_key), StateStream())
+            update, is_keyframe = None, False
+            if any(c in self.delta_clients for c in connections):
+                update, is_keyframe = stream.advance(view)
+            else:
+                # Nobody is following this stream; resume with a keyframe
+                stream.reset()
+
+            encoded: Dict[tuple, Union[str, bytes]] = {}
+            for connection in connections:
+                channel = self.channels.get(connection)
+                if channel is None:
+                    continue
+                coalesce = False
+                if connection not in self.delta_clients:
+                    kind, payload = "full", view
+                else:
+                    if channel.full():
+                        # Queued deltas are discarded on overflow, so the client restarts from a keyframe
+                        self.synced[connection].clear()
+                    if is_keyframe or camera_id not in self.synced[connection]:
+                        kind, payload = "keyframe", update if is_keyframe else None
+                        self.synced[connection].add(camera_id)
+                        coalesce = True
+                    elif update is None:
+                        # Nothing this client sees has changed
+                        continue
+                    else:
+                        kind, payload = "delta", update
+                key = (kind, self.encodings[connection])
+                if key not in encoded:
+                    encoded[key] = codec.encode(payload if payload is not None else stream.keyframe(), key[1])
+                channel.put(encoded[key], coalesce=coalesce, key=camera_id)
+
+    async def drain(self):
+        """Wait until every client queue has been flushed."""
+        await asyncio.gather(*(channel.drain() for channel in list(self.channels.values())))
+
+    def stats(self) -> Dict[str, Any]:
+        channels = list(self.channels.values())
+        return {
+            "clients": len(channels),
+            "delta_clients": len(self.delta_clients),
+            "queue_depth": sum(len(c) for c in channels),
+            "max_queue_depth": max((len(c) for c in channels), default=0),
+            "sent": sum(c.sent for c in channels),
+            "dropped": self.dropped + sum(c.dropped for c in channels),
+            "evictions": dict(self.evictions),
+        }
 
 manager = ConnectionManager()
 
-# --- Dependency Injection for Agent Runner (Initialized in main.py) ---
-agent_runner = None 
+# --- Dependency Injection for Agent Supervisor (Initialized in main.py) ---
+supervisor = None 
 
-def set_agent_runner(runner):
-    global agent_runner
-    agent_runner = runner
+def set_supervisor(agent_supervisor):
+    global supervisor
+    supervisor = agent_supervisor
 
 # --- Models ---
 
@@ -79,25 +217,54 @@ CAMERAS: List[Camera] = [
     Camera(id="cam_1", name="Site Camera 1", source="0", type="usb")
 ]
 ACTIVE_CAMERA_ID = "cam_1"
+manager.default_camera_id = ACTIVE_CAMERA_ID
 
-# Analysis Tasks Storage
+# Analysis Tasks Storage (per-frame results live on disk in RESULTS)
 TASKS: Dict[str, Dict[str, Any]] = {}
+RESULTS = ResultStore()
 
 def run_analysis_task(task_id: str, file_path: str):
+    writer = None
     try:
+        writer = RESULTS.writer(task_id)
         TASKS[task_id]["status"] = "processing"
         processor = VideoProcessor()
         
         def update_progress(p):
             TASKS[task_id]["progress"] = round(p, 1)
         
-        result = processor.process_video(file_path, progress_callback=update_progress)
+        result = processor.process_video(file_path, progress_callback=update_progress, sink=writer.write)
+        writer.close(result["metadata"])
         TASKS[task_id]["status"] = "completed"
         TASKS[task_id]["result"] = result
+        TASKS[task_id]["frames"] = writer.count
         TASKS[task_id]["progress"] = 100
     except Exception as e:
+        if writer:
+            writer.abort()
         TASKS[task_id]["status"] = "failed"
         TASKS[task_id]["error"] = str(e)
+    finally:
+        TASKS[task_id]["finished_at"] = time.time()
+
+def evict_tasks(ttl: float = config.ANALYSIS_TASK_TTL_SECONDS):
+    """Drop finished tasks, and their results, older than the TTL."""
+    if ttl <= 0:
+        return
+    cutoff = time.time() - ttl
+    # Runs in the threadpool too, while the event loop and background tasks change TASKS
+    for task_id, task in list(TASKS.items()):
+        if task.get("finished_at", cutoff) < cutoff and TASKS.pop(task_id, None) is not None:
+            RESULTS.delete(task_id)
+
+def _finished_task(task_id: str) -> Dict[str, Any]:
+    evict_tasks()
+    task = TASKS.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Task is {task['status']}")
+    return task
 
 # --- Endpoints ---
 
@@ -106,11 +273,37 @@ async def health_check():
     return {"status": "ok", "system": "Sentinel Autonomous Agent"}
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(
+    websocket: WebSocket,
+    camera: Optional[str] = None,
+    protocol: Optional[str] = None,
+    zone: Optional[str] = None,
+    topics: Optional[str] = None,
+    encoding: Optional[str] = None,
+):
+    # ?camera=<id> follows one camera, ?camera=all receives every camera.
+    # ?zone=<name> only sends workers and incidents in that zone; ?topics=incidents,stats limits the state
+    # to those parts. {"type": "subscribe", "camera", "zone", "topics"} changes this later.
+    # ?protocol=delta sends keyframes and deltas (see api/stream.py) instead of the full state;
+    # "seq" counts per "camera_id", so with camera=all each camera's stream is followed on its own:
+    # clients keep the state and the last seq per camera_id and apply a delta only if it follows that seq.
+    # A client that sees a gap sends {"type": "resync", "camera": <camera_id>} for a new keyframe
+    # of that camera; without "camera" every stream restarts from a keyframe.
+    # ?encoding=msgpack|cbor sends compact binary frames after a JSON {"type": "hello"} reply.
+    await manager.connect(websocket, protocol=protocol, subscription=Subscription.parse(camera, zone, topics), encoding=encoding)
     try:
         while True:
-            await websocket.receive_text()
+            text = await websocket.receive_text()
+            try:
+                request = json.loads(text)
+            except ValueError:
+                continue
+            if not isinstance(request, dict):
+                continue
+            if request.get("type") == "resync":
+                manager.request_keyframe(websocket, request.get("camera"))
+            elif request.get("type") == "subscribe":
+                manager.subscribe(websocket, Subscription.parse(request.get("camera"), request.get("zone"), request.get("topics")))
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
@@ -125,9 +318,17 @@ async def add_camera(
     current_user: models.User = Depends(dependencies.get_current_active_user)
 ):
     CAMERAS.append(camera)
+    if supervisor:
+        await supervisor.start_camera(camera.id, camera.source)
     audit_logger.log_event(current_user.id, "CAMERA_ADD", "SUCCESS", f"Added camera: {camera.name}")
     return camera
 
+@app.get("/cameras/status")
+async def get_cameras_status(current_user: models.User = Depends(dependencies.get_current_active_user)):
+    if not supervisor:
+        return {}
+    return supervisor.status()
+
 @app.delete("/cameras/{camera_id}")
 async def delete_camera(
     camera_id: str,
@@ -149,12 +350,13 @@ async def delete_camera(
             audit_logger.log_event(current_user.id, "CAMERA_FILE_DELETE_ERROR", "FAILURE", str(e))
 
     CAMERAS.remove(camera)
+    if supervisor:
+        await supervisor.stop_camera(camera_id)
     
-    # If active camera was deleted, stop analysis
+    # If active camera was deleted, fall back to the first remaining one
     if ACTIVE_CAMERA_ID == camera_id:
         ACTIVE_CAMERA_ID = CAMERAS[0].id if CAMERAS else None
-        if agent_runner:
-            await agent_runner.stop()
+        manager.default_camera_id = ACTIVE_CAMERA_ID
 
     audit_logger.log_event(current_user.id, "CAMERA_DELETE", "SUCCESS", f"Deleted camera: {camera.name}")
     return {"status": "deleted", "id": camera_id}
@@ -169,13 +371,23 @@ async def select_camera(
     if not camera:
         raise HTTPException(status_code=404, detail="Camera not found")
     
+    # Selecting only changes the default view; other cameras keep running
     ACTIVE_CAMERA_ID = camera_id
-    if agent_runner:
-        await agent_runner.start(camera.source)
+    manager.default_camera_id = camera_id
+    if supervisor:
+        await supervisor.start_camera(camera.id, camera.source)
     
     audit_logger.log_event(current_user.id, "CAMERA_SELECT", "SUCCESS", f"Selected camera: {camera.name}")
     return {"status": "success", "active_camera": camera}
 
+@app.get("/zones/{camera_id}")
+async def get_zones(camera_id: str):
+    zone_map = zone_engine.zone_map(camera_id)
+    return {
+        "default_zone": zone_map.names[0],
+        "zones": zone_map.zones,
+    }
+
 # Video Upload
 @app.post("/upload-video")
 async def upload_video(
@@ -194,6 +406,7 @@ async def upload_video(
     # Create a 'camera' entry for this video
     camera_id = f"vid_{uuid.uuid4().hex[:8]}"
     camera = Camera(id=camera_id, name=f"Upload: {file.filename}", source=file_path, type="file")
+    # Uploads are usually processed offline; their live pipeline starts on select
     CAMERAS.append(camera)
     
     audit_logger.log_event(current_user.id, "VIDEO_UPLOAD", "SUCCESS", f"Uploaded video: {file.filename}")
@@ -202,20 +415,34 @@ async def upload_video(
 # Analysis Control
 @app.post("/analysis/start")
 async def start_analysis():
-    if agent_runner:
-        # Find active camera source
-        camera = next((c for c in CAMERAS if c.id == ACTIVE_CAMERA_ID), None)
-        if camera:
-            await agent_runner.start(camera.source)
-            return {"status": "started"}
-    raise HTTPException(status_code=500, detail="Agent runner not initialized")
+    if supervisor:
+        await supervisor.start_all(CAMERAS)
+        return {"status": "started"}
+    raise HTTPException(status_code=500, detail="Agent supervisor not initialized")
 
 @app.post("/analysis/stop")
 async def stop_analysis():
-    if agent_runner:
-        await agent_runner.stop()
+    if supervisor:
+        await supervisor.stop_all()
         return {"status": "stopped"}
-    raise HTTPException(status_code=500, detail="Agent runner not initialized")
+    raise HTTPException(status_code=500, detail="Agent supervisor not initialized")
+
+@app.post("/analysis/cameras/{camera_id}/start")
+async def start_camera_analysis(camera_id: str):
+    camera = next((c for c in CAMERAS if c.id == camera_id), None)
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    if not supervisor:
+        raise HTTPException(status_code=500, detail="Agent supervisor not initialized")
+    await supervisor.start_camera(camera.id, camera.source)
+    return {"status": "started", "camera_id": camera_id}
+
+@app.post("/analysis/cameras/{camera_id}/stop")
+async def stop_camera_analysis(camera_id: str):
+    if not supervisor:
+        raise HTTPException(status_code=500, detail="Agent supervisor not initialized")
+    await supervisor.stop_camera(camera_id)
+    return {"status": "stopped", "camera_id": camera_id}
 
 @app.post("/analysis/process/{camera_id}")
 async def process_video_endpoint(camera_id: str, background_tasks: BackgroundTasks):
@@ -223,6 +450,7 @@ async def process_video_endpoint(camera_id: str, background_tasks: BackgroundTas
     if not camera or camera.type != "file":
         raise HTTPException(status_code=404, detail="Video file not found or not a file")
         
+    evict_tasks()
     task_id = str(uuid.uuid4())
     TASKS[task_id] = {"status": "pending", "progress": 0}
     
@@ -230,23 +458,55 @@ async def process_video_endpoint(camera_id: str, background_tasks: BackgroundTas
     
     return {"task_id": task_id}
 
+@app.get("/metrics")
+async def get_metrics():
+    metrics = supervisor.metrics() if supervisor else {}
+    return {**metrics, "websocket": manager.stats()}
+
 @app.get("/analysis/status/{task_id}")
 async def get_analysis_status(task_id: str):
+    evict_tasks()
     if task_id not in TASKS:
         raise HTTPException(status_code=404, detail="Task not found")
+    # Frames are fetched separately from /analysis/results/{task_id}
     return TASKS[task_id]
 
+@app.get("/analysis/results/{task_id}/frames")
+def get_analysis_frames(task_id: str, offset: int = 0, limit: int = config.ANALYSIS_PAGE_SIZE):
+    _finished_task(task_id)
+    # The effective page size is returned, since the cap is configurable
+    limit = min(limit, config.ANALYSIS_PAGE_SIZE)
+    page = RESULTS.read_frames(task_id, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Results not found")
+    total, frames = page
+    return {"offset": offset, "limit": limit, "total": total, "frames": frames}
+
+@app.get("/analysis/results/{task_id}/stream")
+async def stream_analysis_frames(task_id: str):
+    _finished_task(task_id)
+    if RESULTS.metadata(task_id) is None:
+        raise HTTPException(status_code=404, detail="Results not found")
+    # Served as a download, since the frontend links here for its export
+    headers = {"Content-Disposition": f'attachment; filename="analysis_{os.path.basename(task_id)}.ndjson"'}
+    return StreamingResponse(RESULTS.iter_chunks(task_id), media_type="application/x-ndjson", headers=headers)
+
 
 # Incident Management
-# Note: We need to import IncidentLogger to access data. 
-# Ideally, IncidentLogger should be a singleton or passed around.
-# For now, we instantiate it here as it uses file storage.
-from incidents.logger import IncidentLogger
-logger = IncidentLogger()
+from incidents.logger import incident_logger as logger
 
 @app.get("/incidents")
-async def get_incidents():
-    return logger.get_all()
+async def get_incidents(
+    limit: int = config.INCIDENT_RECENT_BUFFER_SIZE,
+    offset: int = 0,
+    workerId: Optional[str] = None,
+    type: Optional[str] = None,
+    acknowledged: Optional[bool] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    # The default page is served from the in-memory recent buffer; older history is paginated
+    return logger.query(limit, offset, workerId, type, acknowledged, since, until)
 
 @app.delete("/incidents/{incident_id}")
 async def delete_incident(incident_id: str):
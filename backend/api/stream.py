@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+import config
+
+PROTOCOL_VERSION = 1
+
+# SystemState lists whose items carry an "id"
+COLLECTIONS = ("workers", "incidents", "timeline")
+# Parts of the state a client can subscribe to
+TOPICS = COLLECTIONS + ("stats",)
+
+@dataclass(frozen=True)
+class Subscription:
+    """
+    What a WebSocket client receives.
+    :param camera: Camera id, "all", or None to follow the selected camera. Each camera's
+                   state is sent as its own stream, tagged with camera_id.
+    :param zone: Only send workers currently in this zone, and incidents raised in it.
+    :param topics: Subset of TOPICS, e.g. {"incidents"} for an incidents-only feed.
+    """
+    camera: Optional[str] = None
+    zone: Optional[str] = None
+    topics: FrozenSet[str] = frozenset(TOPICS)
+
+    @classmethod
+    def parse(cls, camera: Optional[str] = None, zone: Optional[str] = None, topics: Union[str, Iterable[str], None] = None) -> "Subscription":
+        if isinstance(topics, str):
+            topics = topics.split(",")
+        wanted = frozenset(t.strip() for t in topics or () if t.strip() in TOPICS)
+        return cls(camera=camera or None, zone=zone or None, topics=wanted or frozenset(TOPICS))
+
+    @property
+    def view_key(self) -> Tuple[Optional[str], FrozenSet[str]]:
+        # Clients with the same key receive identical messages for a camera
+        return self.zone, self.topics
+
+    def view(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """The slice of a SystemState dict this subscription receives."""
+        view = {topic: state[topic] for topic in TOPICS if topic in self.topics and topic in state}
+        if self.zone is not None:
+            for name in ("workers", "incidents"):
+                if name in view:
+                    view[name] = [item for item in view[name] if item.get("zone") == self.zone]
+        view["camera_id"] = state.get("camera_id")
+        return view
+
+_MISSING = object()
+
+def diff_collection(previous: List[dict], current: List[dict]) -> Optional[Dict[str, Any]]:
+    """
+    Changes that turn `previous` into `current`.
+    Changed items are sent as patches holding the id and the fields that differ; new items
+    are sent whole. The id order is only included when it is not simply the remaining
+    items followed by the new ones. Returns None if equal.
+    """
+    before = {item["id"]: item for item in previous}
+    upsert = []
+    for item in current:
+        old = before.get(item["id"])
+        if old is None:
+            upsert.append(item)
+        elif old != item:
+            patch = {k: v for k, v in item.items() if old.get(k, _MISSING) != v}
+            patch["id"] = item["id"]
+            upsert.append(patch)
+
+    current_ids = [item["id"] for item in current]
+    present = set(current_ids)
+    remove = [item_id for item_id in before if item_id not in present]
+
+    change: Dict[str, Any] = {}
+    if upsert:
+        change["upsert"] = upsert
+    if remove:
+        change["remove"] = remove
+    appended = [item["id"] for item in current if item["id"] not in before]
+    if current_ids != [i for i in before if i in present] + appended:
+        change["order"] = current_ids
+    return change or None
+
+def apply_delta(state: Dict[str, Any], message: Dict[str, Any]) -> Dict[str, Any]:
+    """Reference client: the state after applying a keyframe or delta message."""
+    if message["type"] == "keyframe":
+        return {k: v for k, v in message.items() if k not in ("type", "v", "seq")}
+
+    state = dict(state)
+    for name in COLLECTIONS:
+        change = message.get(name)
+        if not change:
+            continue
+        items = {item["id"]: item for item in state.get(name, [])}
+        for item in change.get("upsert", []):
+            items[item["id"]] = {**items.get(item["id"], {}), **item}
+        for item_id in change.get("remove", []):
+            items.pop(item_id, None)
+        order = change.get("order")
+        if order is None:
+            order = [item["id"] for item in state.get(name, []) if item["id"] in items]
+            known = set(order)
+            order += [item["id"] for item in change.get("upsert", []) if item["id"] not in known]
+        state[name] = [items[item_id] for item_id in order]
+    if "stats" in message:
+        state["stats"] = message["stats"]
+    return state
+
+class StateStream:
+    def __init__(self, keyframe_interval: int = config.STREAM_KEYFRAME_INTERVAL):
+        """
+        Delta encoder for the SystemState broadcasts of one camera.
+        Every message has a sequence number and the camera_id; a delta applies to that
+        camera's state of seq - 1. Sequence numbers of different cameras are unrelated.
+        A full keyframe is emitted every keyframe_interval messages, and on demand
+        for clients that join or report a gap.
+        """
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.seq = 0
+        self.state: Optional[Dict[str, Any]] = None
+        self._since_keyframe = 0
+
+    def reset(self):
+        # The next message is a keyframe
+        self.state = None
+
+    def advance(self, state: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Record the next state. Returns the message for it and whether it is a keyframe.
+        If nothing changed no message is produced and the sequence number stays the same.
+        """
+        previous = self.state
+        if previous is None or self._since_keyframe + 1 >= self.keyframe_interval:
+            self.state = state
+            self.seq += 1
+            self._since_keyframe = 0
+            return self.keyframe(), True
+
+        changes: Dict[str, Any] = {}
+        for name in COLLECTIONS:
+            change = diff_collection(previous.get(name, []), state.get(name, []))
+            if change:
+                changes[name] = change
+        if "stats" in state and state.get("stats") != previous.get("stats"):
+            changes["stats"] = state.get("stats")
+        if not changes:
+            return None, False
+
+        self.state = state
+        self.seq += 1
+        self._since_keyframe += 1
+        return {"type": "delta", "v": PROTOCOL_VERSION, "seq": self.seq, "camera_id": state.get("camera_id"), **changes}, False
+
+    def keyframe(self) -> Dict[str, Any]:
+        """Full state at the current sequence number."""
+        return {"type": "keyframe", "v": PROTOCOL_VERSION, "seq": self.seq, **self.state}
@@ -0,0 +1,152 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Perception ---
+MODEL_PATH = os.getenv("SENTINEL_MODEL_PATH", "yolov8n.pt")
+# Number of YOLO instances shared by all camera pipelines
+MODEL_POOL_SIZE = int(os.getenv("SENTINEL_MODEL_POOL_SIZE", "1"))
+TRACKER_CONFIG = os.getenv("SENTINEL_TRACKER_CONFIG", "bytetrack.yaml")
+
+# --- Live Pipelines ---
+# Per-camera analysis rate
+CAMERA_FPS = int(os.getenv("SENTINEL_CAMERA_FPS", "5"))
+# Cap on total inferences per second across every camera (0 = unlimited)
+MAX_INFERENCE_FPS = float(os.getenv("SENTINEL_MAX_INFERENCE_FPS", "30"))
+# Frames buffered between capture and inference per camera
+FRAME_QUEUE_SIZE = int(os.getenv("SENTINEL_FRAME_QUEUE_SIZE", "2"))
+# Overflow policy when inference falls behind: drop_oldest, drop_newest or block
+FRAME_QUEUE_POLICY = os.getenv("SENTINEL_FRAME_QUEUE_POLICY", "drop_oldest")
+# Cross-camera micro-batching of YOLO inference
+BATCH_MAX_SIZE = int(os.getenv("SENTINEL_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("SENTINEL_BATCH_MAX_WAIT_MS", "10"))
+
+# Delta WebSocket clients get a full keyframe every N state messages
+STREAM_KEYFRAME_INTERVAL = int(os.getenv("SENTINEL_STREAM_KEYFRAME_INTERVAL", "50"))
+# Per-client outgoing queue; on overflow queued messages are replaced by the latest state
+WS_CLIENT_QUEUE_SIZE = int(os.getenv("SENTINEL_WS_CLIENT_QUEUE_SIZE", "8"))
+WS_SEND_TIMEOUT = float(os.getenv("SENTINEL_WS_SEND_TIMEOUT", "5"))
+# Clients whose queue overflows this many broadcasts in a row are disconnected (0 never)
+WS_MAX_OVERFLOWS = int(os.getenv("SENTINEL_WS_MAX_OVERFLOWS", "20"))
+
+# Tracks unseen for this long are dropped from agent memory
+MEMORY_RETENTION_SECONDS = float(os.getenv("SENTINEL_MEMORY_RETENTION_SECONDS", "10"))
+# Most recently seen tracks kept per camera (0 = no cap)
+MEMORY_MAX_TRACKS = int(os.getenv("SENTINEL_MEMORY_MAX_TRACKS", "500"))
+# Smoothed speed (percent of the frame per second) below which a worker is Stationary
+FEATURE_STATIONARY_SPEED = float(os.getenv("SENTINEL_FEATURE_STATIONARY_SPEED", "1.5"))
+# Weight of the newest sample in the velocity moving average
+FEATURE_VELOCITY_SMOOTHING = float(os.getenv("SENTINEL_FEATURE_VELOCITY_SMOOTHING", "0.5"))
+# Add a "Worker Left" timeline event when a track is dropped
+MEMORY_WORKER_LEFT_EVENTS = os.getenv("SENTINEL_MEMORY_WORKER_LEFT_EVENTS", "true").lower() == "true"
+
+# --- Video Decode ---
+# opencv, pyav (FFmpeg with threaded decoding, needs the 'av' package) or auto (pyav when installed)
+DECODE_BACKEND = os.getenv("SENTINEL_DECODE_BACKEND", "opencv")
+# Frames are downscaled to this width while decoding (0 = full resolution).
+# 640 matches the model input; larger keeps more detail in incident snapshots.
+DECODE_MAX_WIDTH = int(os.getenv("SENTINEL_DECODE_MAX_WIDTH", "1280"))
+# Ask OpenCV for hardware decoding when the build supports it
+DECODE_HW_ACCEL = os.getenv("SENTINEL_DECODE_HW_ACCEL", "true").lower() == "true"
+# PyAV decoder threads per source (0 = FFmpeg picks)
+DECODE_THREADS = int(os.getenv("SENTINEL_DECODE_THREADS", "0"))
+# Live sources are grabbed continuously and only the newest frame is analyzed,
+# so latency stays bounded when inference falls behind
+INGEST_LATEST_FRAME = os.getenv("SENTINEL_INGEST_LATEST_FRAME", "true").lower() == "true"
+# Reconnect delay after a source fails, doubled per consecutive failure up to the max
+INGEST_BACKOFF_INITIAL = float(os.getenv("SENTINEL_INGEST_BACKOFF_INITIAL", "0.5"))
+INGEST_BACKOFF_MAX = float(os.getenv("SENTINEL_INGEST_BACKOFF_MAX", "30"))
+# A connection has to deliver frames this long before the backoff resets
+INGEST_HEALTHY_SECONDS = float(os.getenv("SENTINEL_INGEST_HEALTHY_SECONDS", "10"))
+# A live source that delivers no frame for this long is reconnected
+INGEST_STALL_SECONDS = float(os.getenv("SENTINEL_INGEST_STALL_SECONDS", "10"))
+# Video files are rewound in place when they end
+INGEST_LOOP_FILES = os.getenv("SENTINEL_INGEST_LOOP_FILES", "true").lower() == "true"
+# Capture each camera in its own process, handing frames over through shared memory
+CAPTURE_PROCESS = os.getenv("SENTINEL_CAPTURE_PROCESS", "false").lower() == "true"
+# Frame slots per camera; a frame stays valid until this many newer ones were written
+FRAME_RING_SLOTS = int(os.getenv("SENTINEL_FRAME_RING_SLOTS", "4"))
+# Bytes per slot; the default fits a square BGR frame of the decode width
+FRAME_RING_SLOT_BYTES = int(os.getenv("SENTINEL_FRAME_RING_SLOT_BYTES", str((DECODE_MAX_WIDTH or 3840) ** 2 * 3)))
+
+# --- Offline Analysis ---
+# Processes used for uploaded videos (0 = half of the CPU cores, 1 = sequential)
+OFFLINE_WORKERS = int(os.getenv("SENTINEL_OFFLINE_WORKERS", "0"))
+OFFLINE_CHUNK_SECONDS = float(os.getenv("SENTINEL_OFFLINE_CHUNK_SECONDS", "60"))
+# Frames re-read before each chunk to carry track ids across the boundary
+OFFLINE_CHUNK_OVERLAP_FRAMES = int(os.getenv("SENTINEL_OFFLINE_CHUNK_OVERLAP_FRAMES", "15"))
+OFFLINE_STITCH_IOU = float(os.getenv("SENTINEL_OFFLINE_STITCH_IOU", "0.5"))
+# Frames sent to detection: all, stride (every Nth), fps (target rate) or motion (skip static frames).
+# Tracks are interpolated across skipped frames.
+OFFLINE_SAMPLING = os.getenv("SENTINEL_OFFLINE_SAMPLING", "all")
+OFFLINE_STRIDE = int(os.getenv("SENTINEL_OFFLINE_STRIDE", "3"))
+OFFLINE_ANALYSIS_FPS = float(os.getenv("SENTINEL_OFFLINE_ANALYSIS_FPS", "10"))
+# Motion sampling: 'diff' (mean pixel change, 0-255) or 'histogram' (Bhattacharyya distance, 0-1)
+OFFLINE_MOTION_METHOD = os.getenv("SENTINEL_OFFLINE_MOTION_METHOD", "diff")
+OFFLINE_MOTION_THRESHOLD = float(os.getenv("SENTINEL_OFFLINE_MOTION_THRESHOLD", "4"))
+OFFLINE_MAX_SKIP = int(os.getenv("SENTINEL_OFFLINE_MAX_SKIP", "10"))
+# Per-frame results of analysis tasks are written here as NDJSON
+ANALYSIS_RESULTS_DIR = os.getenv("SENTINEL_ANALYSIS_RESULTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos", "results"))
+# Frames between indexed byte offsets, which bounds the lines skipped per page
+ANALYSIS_RESULTS_INDEX_INTERVAL = int(os.getenv("SENTINEL_ANALYSIS_RESULTS_INDEX_INTERVAL", "100"))
+ANALYSIS_PAGE_SIZE = int(os.getenv("SENTINEL_ANALYSIS_PAGE_SIZE", "500"))
+# Finished tasks and their results are dropped after this long (0 = keep)
+ANALYSIS_TASK_TTL_SECONDS = float(os.getenv("SENTINEL_ANALYSIS_TASK_TTL_SECONDS", "3600"))
+
+# --- Zones ---
+# Per-camera polygon zones in normalized 0-100 coordinates
+ZONES_FILE = os.getenv("SENTINEL_ZONES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "zones.json"))
+# Cells per axis of the rasterized zone lookup mask
+ZONE_GRID_SIZE = int(os.getenv("SENTINEL_ZONE_GRID_SIZE", "200"))
+# Seconds between checks of the zones file for changes
+ZONES_RELOAD_INTERVAL = float(os.getenv("SENTINEL_ZONES_RELOAD_INTERVAL", "2"))
+
+# --- Reasoning ---
+# Share of samples missing PPE before the rules flag a violation without the LLM
+RULES_PPE_VIOLATION_RATIO = float(os.getenv("SENTINEL_RULES_PPE_VIOLATION_RATIO", "0.8"))
+# Stationary time in a hazardous zone that counts as loitering
+RULES_LOITER_SECONDS = float(os.getenv("SENTINEL_RULES_LOITER_SECONDS", "5"))
+# Timeline length handed to rules and LLM (slightly longer than the loiter threshold)
+REASONING_WINDOW_SECONDS = float(os.getenv("SENTINEL_REASONING_WINDOW_SECONDS", "6"))
+# Ambiguous timelines escalated to the LLM: queue size and timelines analyzed at once
+ESCALATION_QUEUE_SIZE = int(os.getenv("SENTINEL_ESCALATION_QUEUE_SIZE", "32"))
+ESCALATION_CONCURRENCY = int(os.getenv("SENTINEL_ESCALATION_CONCURRENCY", "8"))
+
+# Async Gemini client
+GENAI_API_KEY = os.getenv("GENAI_API_KEY")
+GENAI_BASE_URL = os.getenv("SENTINEL_GENAI_BASE_URL", "https://generativelanguage.googleapis.com")
+REASONING_MODEL = os.getenv("SENTINEL_REASONING_MODEL", "gemini-1.5-flash")
+# HTTP requests in flight, and requests per second allowed per API key
+REASONING_MAX_CONCURRENCY = int(os.getenv("SENTINEL_REASONING_MAX_CONCURRENCY", "4"))
+REASONING_RATE_PER_KEY = float(os.getenv("SENTINEL_REASONING_RATE_PER_KEY", "1"))
+# Timelines combined into one prompt
+REASONING_MAX_BATCH_SIZE = int(os.getenv("SENTINEL_REASONING_MAX_BATCH_SIZE", "8"))
+REASONING_MAX_WAIT_MS = float(os.getenv("SENTINEL_REASONING_MAX_WAIT_MS", "200"))
+REASONING_TIMEOUT = float(os.getenv("SENTINEL_REASONING_TIMEOUT", "15"))
+# Consecutive failures before falling back to the local heuristic, and time before retrying
+REASONING_BREAKER_FAILURES = int(os.getenv("SENTINEL_REASONING_BREAKER_FAILURES", "3"))
+REASONING_BREAKER_RESET_SECONDS = float(os.getenv("SENTINEL_REASONING_BREAKER_RESET_SECONDS", "30"))
+
+# Cache of LLM verdicts keyed on the safety-relevant content of a timeline
+REASONING_CACHE_SIZE = int(os.getenv("SENTINEL_REASONING_CACHE_SIZE", "1024"))
+REASONING_CACHE_TTL = float(os.getenv("SENTINEL_REASONING_CACHE_TTL", "30"))
+# Grid cell size (0-100 units) below which position changes are ignored
+REASONING_CACHE_CELL_SIZE = float(os.getenv("SENTINEL_REASONING_CACHE_CELL_SIZE", "10"))
+
+# --- Incidents ---
+# Snapshots are encoded by background threads; the queue drops new snapshots when full
+SNAPSHOT_WORKERS = int(os.getenv("SENTINEL_SNAPSHOT_WORKERS", "2"))
+SNAPSHOT_QUEUE_SIZE = int(os.getenv("SENTINEL_SNAPSHOT_QUEUE_SIZE", "32"))
+SNAPSHOT_JPEG_QUALITY = int(os.getenv("SENTINEL_SNAPSHOT_JPEG_QUALITY", "85"))
+# Wider frames are downscaled before encoding (0 keeps full resolution)
+SNAPSHOT_MAX_WIDTH = int(os.getenv("SENTINEL_SNAPSHOT_MAX_WIDTH", "1280"))
+SNAPSHOT_CROP_PADDING = float(os.getenv("SENTINEL_SNAPSHOT_CROP_PADDING", "0.25"))
+# Store byte-identical full-frame snapshots once and hard-link incidents to them
+SNAPSHOT_DEDUP = os.getenv("SENTINEL_SNAPSHOT_DEDUP", "false").lower() == "true"
+INCIDENTS_DB = os.getenv("SENTINEL_INCIDENTS_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "incidents", "incidents.db"))
+# Newest incidents kept in memory for the live broadcast and the default /incidents page
+INCIDENT_RECENT_BUFFER_SIZE = int(os.getenv("SENTINEL_INCIDENT_RECENT_BUFFER_SIZE", "1000"))
+INCIDENT_CONFIDENCE_THRESHOLD = float(os.getenv("SENTINEL_INCIDENT_CONFIDENCE_THRESHOLD", "0.85"))
+# Same worker and violation type are not logged again within this window
+INCIDENT_COOLDOWN_SECONDS = float(os.getenv("SENTINEL_INCIDENT_COOLDOWN_SECONDS", "30"))
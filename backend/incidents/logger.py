@@ -1,76 +1,134 @@
-import json
 import os
-import cv2
+import threading
+from collections import deque
+from itertools import islice
 import numpy as np
-from typing import List
+from typing import List, Optional, Sequence
 from datetime import datetime
+import config
 from agent.perception import Incident
+from incidents.snapshots import SnapshotWriter
+from incidents.storage import IncidentStore
 
 # Paths relative to backend execution (usually root of backend or project)
 # Assuming backend is run from Sentinel/backend or Sentinel/
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Legacy JSON history, imported into the database on first start
 DATA_FILE = os.path.join(BASE_DIR, "data.json")
 IMAGE_DIR = os.path.join(BASE_DIR, "images")
 
 class IncidentLogger:
-    def __init__(self):
+    def __init__(self, db_path: str = config.INCIDENTS_DB, recent_size: int = config.INCIDENT_RECENT_BUFFER_SIZE):
+        """
+        Incident log backed by IncidentStore.
+        The newest recent_size incidents are also kept in memory, newest first,
+        so the live broadcast and unfiltered first pages never touch the database.
+        """
         os.makedirs(IMAGE_DIR, exist_ok=True)
-        if not os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'w') as f:
-                json.dump([], f)
+        self.snapshots = SnapshotWriter(IMAGE_DIR)
+        self.store = IncidentStore(db_path, legacy_json=DATA_FILE)
+        self.recent_size = max(1, recent_size)
+        self._lock = threading.Lock()
+        self._recent = deque(self.store.query(limit=self.recent_size), maxlen=self.recent_size)
 
-    def log(self, incident: Incident, frame: np.array):
-        # Save Image
-        image_path = os.path.join(IMAGE_DIR, f"{incident.id}.jpg")
-        if frame is not None:
-            cv2.imwrite(image_path, frame)
+    def _find_recent(self, incident_id: str) -> Optional[dict]:
+        for item in self._recent:
+            if item['id'] == incident_id:
+                return item
+        return None
+
+    def _insert_recent(self, data: dict):
+        """
+        Put an incident into the buffer in store order (timestamp, newest first), replacing
+        an entry with the same id the way the store's INSERT OR REPLACE does.
+        """
+        existing = self._find_recent(data['id'])
+        if existing is not None:
+            self._recent.remove(existing)
+        # A replaced row gets the newest seq, so it goes before others with the same timestamp
+        position = next(
+            (i for i, item in enumerate(self._recent) if item['timestamp'] <= data['timestamp']),
+            len(self._recent),
+        )
+        if position < self.recent_size:
+            if len(self._recent) == self.recent_size:
+                self._recent.pop()
+            self._recent.insert(position, data)
+        elif existing is not None:
+            # The incident sorts past the buffer; refill the slot it freed
+            self._recent.extend(self.store.query(limit=1, offset=len(self._recent)))
+
+    def log(self, incident: Incident, frame: np.array, box: Optional[Sequence[float]] = None):
+        # Save Image (encoded in the background; the frame must not be modified afterwards)
+        self.snapshots.submit(incident.id, frame, box)
         
         # Save Metadata
-        incidents = self.get_all()
-        # Insert at beginning
-        incidents.insert(0, incident.model_dump())
-        # Limit history
-        incidents = incidents[:1000]
-        
-        with open(DATA_FILE, 'w') as f:
-            json.dump(incidents, f, indent=2)
+        data = incident.model_dump()
+        self.store.append(data)
+        with self._lock:
+            self._insert_recent(data)
             
         print(f"Logged Incident: {incident.id} - {incident.type}")
 
     def get_all(self) -> List[dict]:
-        if not os.path.exists(DATA_FILE):
-            return []
-        try:
-            with open(DATA_FILE, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return []
+        return self.store.query()
+
+    def recent(self, limit: int = 10, camera_id: Optional[str] = None) -> List[dict]:
+        """Newest incidents; with a camera_id, only that camera's among the buffered ones."""
+        if camera_id is not None:
+            with self._lock:
+                matches = (item for item in self._recent if item.get('cameraId') == camera_id)
+                return [dict(item) for item in islice(matches, limit)]
+        if limit > self.recent_size:
+            return self.store.query(limit=limit)
+        with self._lock:
+            return [dict(item) for item in islice(self._recent, limit)]
+
+    def query(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        worker_id: Optional[str] = None,
+        incident_type: Optional[str] = None,
+        acknowledged: Optional[bool] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[dict]:
+        unfiltered = worker_id is None and incident_type is None and acknowledged is None and since is None and until is None
+        if unfiltered and limit is not None and offset + limit <= self.recent_size:
+            with self._lock:
+                # The buffer only runs short of recent_size when the store holds no more
+                return [dict(item) for item in islice(self._recent, offset, offset + limit)]
+        return self.store.query(limit, offset, worker_id, incident_type, acknowledged, since, until)
 
     def delete(self, incident_id: str):
-        incidents = self.get_all()
-        incidents = [i for i in incidents if i['id'] != incident_id]
-        with open(DATA_FILE, 'w') as f:
-            json.dump(incidents, f, indent=2)
+        if not self.store.delete(incident_id):
+            return
+        with self._lock:
+            item = self._find_recent(incident_id)
+            if item is not None:
+                self._recent.remove(item)
+                # Backfill the freed slot with the next oldest incident
+                older = self.store.query(limit=1, offset=len(self._recent))
+                self._recent.extend(older)
 
     def resolve(self, incident_id: str):
-        incidents = self.get_all()
-        for i in incidents:
-            if i['id'] == incident_id:
-                i['acknowledged'] = True
-                break
-        with open(DATA_FILE, 'w') as f:
-            json.dump(incidents, f, indent=2)
+        self.store.set_acknowledged(incident_id)
+        with self._lock:
+            item = self._find_recent(incident_id)
+            if item is not None:
+                item['acknowledged'] = True
 
     def add_note(self, incident_id: str, note: str):
-        incidents = self.get_all()
-        for i in incidents:
-            if i['id'] == incident_id:
-                if 'notes' not in i:
-                    i['notes'] = []
-                i['notes'].append({
-                    "timestamp": datetime.now().isoformat(),
-                    "content": note
-                })
-                break
-        with open(DATA_FILE, 'w') as f:
-            json.dump(incidents, f, indent=2)
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "content": note
+        }
+        if not self.store.add_note(incident_id, entry):
+            return
+        with self._lock:
+            item = self._find_recent(incident_id)
+            if item is not None:
+                item['notes'] = item.get('notes', []) + [entry]
+
+incident_logger = IncidentLogger()
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import queue
+import shutil
+import threading
+import traceback
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+import config
+
+Box = Sequence[float]
+
+class SnapshotWriter:
+    def __init__(
+        self,
+        image_dir: str,
+        workers: int = config.SNAPSHOT_WORKERS,
+        queue_size: int = config.SNAPSHOT_QUEUE_SIZE,
+        quality: int = config.SNAPSHOT_JPEG_QUALITY,
+        max_width: int = config.SNAPSHOT_MAX_WIDTH,
+        crop_padding: float = config.SNAPSHOT_CROP_PADDING,
+        dedup: bool = config.SNAPSHOT_DEDUP,
+    ):
+        """
+        Writes incident snapshots from background threads.
+        Callers hand over a frame reference; resizing, JPEG encoding and disk I/O
+        happen off the caller's thread. When the queue is full the snapshot is dropped.
+        :param max_width: Frames wider than this are downscaled. 0 keeps full resolution.
+        :param crop_padding: Margin around the worker box for the crop, as a fraction of the box size.
+        :param dedup: Store full frames whose JPEG bytes are identical once, under their sha256,
+                      and hard-link incidents to it. Crops are never deduplicated.
+        """
+        self.image_dir = image_dir
+        self.blob_dir = os.path.join(image_dir, "by-hash")
+        self.quality = quality
+        self.max_width = max_width
+        self.crop_padding = crop_padding
+        self.dedup = dedup
+        self.workers = max(1, workers)
+        self._queue: "queue.Queue[Optional[Tuple[str, np.ndarray, Optional[Box]]]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._blob_lock = threading.Lock()
+        self.written = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.failed = 0
+        os.makedirs(self.blob_dir if dedup else image_dir, exist_ok=True)
+
+    def _ensure_threads(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, incident_id: str, frame: np.ndarray, box: Optional[Box] = None) -> bool:
+        """Queue a snapshot without blocking. Returns False if it was dropped."""
+        if frame is None:
+            return False
+        self._ensure_threads()
+        try:
+            self._queue.put_nowait((incident_id, frame, box))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self):
+        """Block until every queued snapshot has been written."""
+        self._queue.join()
+
+    def stop(self):
+        self.flush()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.write(*item)
+            except Exception as e:
+                self.failed += 1
+                print(f"Error writing snapshot: {e}")
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    def write(self, incident_id: str, frame: np.ndarray, box: Optional[Box] = None):
+        """Encode and store the snapshot (and the crop, if a box is given) synchronously."""
+        self._store(f"{incident_id}.jpg", self._resize(frame), dedup=self.dedup)
+        if box is not None:
+            crop = self._crop(frame, box)
+            if crop is not None:
+                self._store(f"{incident_id}_crop.jpg", crop)
+
+    def _resize(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        if self.max_width <= 0 or width <= self.max_width:
+            return frame
+        scale = self.max_width / width
+        return cv2.resize(frame, (self.max_width, max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+
+    def _crop(self, frame: np.ndarray, box: Box) -> Optional[np.ndarray]:
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = box
+        pad_x, pad_y = (x2 - x1) * self.crop_padding, (y2 - y1) * self.crop_padding
+        x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+        x2, y2 = min(width, int(x2 + pad_x)), min(height, int(y2 + pad_y))
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return frame[y1:y2, x1:x2]
+
+    def _store(self, name: str, image: np.ndarray, dedup: bool = False):
+        path = os.path.join(self.image_dir, name)
+        data = self._encode(image)
+        if not dedup:
+            self._write_file(path, data)
+            self.written += 1
+            return
+
+        # Only byte-identical images share a blob, so an incident never shows another scene
+        blob = os.path.join(self.blob_dir, f"{hashlib.sha256(data).hexdigest()}.jpg")
+        with self._blob_lock:
+            # Existence check and creation are atomic so concurrent writers store a hash once
+            if os.path.exists(blob):
+                self.deduplicated += 1
+            else:
+                self._write_file(blob, data)
+                self.written += 1
+        if os.path.exists(path):
+            os.remove(path)
+        try:
+            os.link(blob, path)
+        except OSError:
+            shutil.copyfile(blob, path)
+
+    def _encode(self, image: np.ndarray) -> bytes:
+        ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+    @staticmethod
+    def _write_file(path: str, data: bytes):
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "deduplicated": self.deduplicated,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
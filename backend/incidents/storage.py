@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+SCHEMA_VERSION = 2
+
+# Incident fields in column order; notes are stored as a JSON array
+COLUMNS = ("id", "timestamp", "workerId", "type", "severity", "confidence", "details", "acknowledged", "notes", "cameraId", "zone")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    workerId TEXT NOT NULL,
+    type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    details TEXT NOT NULL,
+    acknowledged INTEGER NOT NULL DEFAULT 0,
+    notes TEXT,
+    cameraId TEXT,
+    zone TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON incidents (timestamp);
+CREATE INDEX IF NOT EXISTS idx_incidents_worker ON incidents (workerId, timestamp);
+CREATE INDEX IF NOT EXISTS idx_incidents_type ON incidents (type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_incidents_acknowledged ON incidents (acknowledged, timestamp);
+CREATE INDEX IF NOT EXISTS idx_incidents_camera ON incidents (cameraId, timestamp);
+"""
+
+class IncidentStore:
+    def __init__(self, path: str, legacy_json: Optional[str] = None):
+        """
+        SQLite incident store in WAL mode.
+        Appends are single-row inserts and queries are served from indexes, newest first.
+        :param legacy_json: Old data.json file imported once when the database is created.
+        """
+        self.path = path
+        # One connection shared by the event loop and executor threads, serialized by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version == 1:
+                # Version 1 did not record where an incident happened
+                self._conn.execute("ALTER TABLE incidents ADD COLUMN cameraId TEXT")
+                self._conn.execute("ALTER TABLE incidents ADD COLUMN zone TEXT")
+            self._conn.executescript(SCHEMA)
+            if version < SCHEMA_VERSION:
+                if version == 0 and legacy_json:
+                    self._import_json(legacy_json)
+                self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def _import_json(self, path: str):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r') as f:
+                incidents = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        # data.json is newest first; insert oldest first so seq keeps the order
+        rows = [self._to_row(i) for i in reversed(incidents) if isinstance(i, dict) and "id" in i]
+        self._conn.execute("BEGIN")
+        self._conn.executemany(
+            f"INSERT OR IGNORE INTO incidents ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            rows,
+        )
+        self._conn.execute("COMMIT")
+        if rows:
+            print(f"Imported {len(rows)} incidents from {path}")
+
+    @staticmethod
+    def _to_row(incident: Dict[str, Any]) -> tuple:
+        notes = incident.get("notes")
+        return (
+            incident["id"],
+            incident.get("timestamp", ""),
+            incident.get("workerId", ""),
+            incident.get("type", ""),
+            incident.get("severity", ""),
+            float(incident.get("confidence", 0.0)),
+            incident.get("details", ""),
+            int(bool(incident.get("acknowledged", False))),
+            json.dumps(notes) if notes is not None else None,
+            incident.get("cameraId"),
+            incident.get("zone"),
+        )
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        incident = {name: row[name] for name in COLUMNS if name != "notes"}
+        incident["acknowledged"] = bool(incident["acknowledged"])
+        if row["notes"] is not None:
+            incident["notes"] = json.loads(row["notes"])
+        return incident
+
+    def append(self, incident: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO incidents ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                self._to_row(incident),
+            )
+
+    def get(self, incident_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM incidents WHERE id = ?", (incident_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def query(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        worker_id: Optional[str] = None,
+        incident_type: Optional[str] = None,
+        acknowledged: Optional[bool] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Incidents matching all given filters, newest first. Timestamps compare as ISO strings."""
+        where, params = self._filters(worker_id, incident_type, acknowledged, since, until)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM incidents{where} ORDER BY timestamp DESC, seq DESC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [max(0, limit), max(0, offset)]
+        elif offset:
+            sql += " LIMIT -1 OFFSET ?"
+            params.append(max(0, offset))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def count(
+        self,
+        worker_id: Optional[str] = None,
+        incident_type: Optional[str] = None,
+        acknowledged: Optional[bool] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> int:
+        where, params = self._filters(worker_id, incident_type, acknowledged, since, until)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM incidents{where}", params).fetchone()[0]
+
+    @staticmethod
+    def _filters(worker_id, incident_type, acknowledged, since, until):
+        clauses, params = [], []
+        if worker_id is not None:
+            clauses.append("workerId = ?")
+            params.append(worker_id)
+        if incident_type is not None:
+            clauses.append("type = ?")
+            params.append(incident_type)
+        if acknowledged is not None:
+            clauses.append("acknowledged = ?")
+            params.append(int(acknowledged))
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def delete(self, incident_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("DELETE FROM incidents WHERE id = ?", (incident_id,)).rowcount > 0
+
+    def set_acknowledged(self, incident_id: str, acknowledged: bool = True) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE incidents SET acknowledged = ? WHERE id = ?", (int(acknowledged), incident_id)
+            ).rowcount > 0
+
+    def add_note(self, incident_id: str, note: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT notes FROM incidents WHERE id = ?", (incident_id,)).fetchone()
+                if row is None:
+                    return False
+                notes = json.loads(row["notes"]) if row["notes"] else []
+                notes.append(note)
+                self._conn.execute("UPDATE incidents SET notes = ? WHERE id = ?", (json.dumps(notes), incident_id))
+                return True
+            finally:
+                self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
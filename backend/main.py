@@ -1,8 +1,9 @@
 import uvicorn
 import asyncio
 import os
-from api.server import app, manager, set_agent_runner
-from agent.loop import AgentRunner
+from api import server
+from api.server import app, manager, set_supervisor
+from agent.supervisor import AgentSupervisor
 
 # Default video path
 VIDEO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos", "construction_violation.mp4")
@@ -15,12 +16,19 @@ async def startup_event():
         print(f"WARNING: Video file not found at {VIDEO_PATH}. Defaulting to Webcam (0).")
         video_source = "0"
     
-    # Initialize AgentRunner
-    agent_runner = AgentRunner(manager)
-    set_agent_runner(agent_runner)
+    # Initialize AgentSupervisor (one pipeline per camera, shared model pool)
+    supervisor = AgentSupervisor(manager)
+    set_supervisor(supervisor)
     
-    # Start the real agent loop in the background with default source
-    await agent_runner.start(video_source)
+    # Start every configured camera; the default camera uses the demo video
+    for camera in server.CAMERAS:
+        source = video_source if camera.id == server.ACTIVE_CAMERA_ID else camera.source
+        await supervisor.start_camera(camera.id, source)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if server.supervisor:
+        await server.supervisor.stop_all()
 
 if __name__ == "__main__":
     uvicorn.run("api.server:app", host="0.0.0.0", port=8000, reload=True)
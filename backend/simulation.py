@@ -3,6 +3,7 @@ import random
 import datetime
 from typing import List
 from agent.perception import Worker, Incident, TimelineEvent, SystemState
+from agent.zones import zone_engine
 from api.server import ConnectionManager
 
 # Initial State
@@ -31,12 +32,7 @@ async def run_simulation(manager: ConnectionManager):
             w.y = max(5, min(95, w.y))
             
             # Zone Detection
-            new_zone = 'Safe'
-            if w.x > 60 and w.y < 50:
-                new_zone = 'Loading Dock'
-            if w.x < 45 and w.y > 50:
-                new_zone = 'Excavation Pit'
-            w.zone = new_zone
+            w.zone = zone_engine.zone_at(None, w.x, w.y)
             
             w.lastSeen = current_time.isoformat()
             
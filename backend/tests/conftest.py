@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+import pytest
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+@pytest.fixture
+def worker_sample():
+    """Factory for a compliant worker in the safe zone, observed i * interval seconds after START."""
+    def sample(i=0, interval=1.0, **overrides):
+        return {
+            "id": "p_1",
+            "x": 50.0,
+            "y": 50.0,
+            "hasHelmet": True,
+            "hasVest": True,
+            "zone": "Safe",
+            "status": "Moving",
+            "lastSeen": (START + timedelta(seconds=i * interval)).isoformat(),
+            "confidence": 0.9,
+            **overrides,
+        }
+    return sample
+
+@pytest.fixture
+def incident_record():
+    """Factory for stored incidents; INC-<n> is raised n seconds after START."""
+    def record(n, **overrides):
+        return {
+            "id": f"INC-{n:04d}",
+            "timestamp": (START + timedelta(seconds=n)).isoformat(),
+            "workerId": f"p_{n % 3}",
+            "type": "PPE Violation" if n % 2 else "Zone Intrusion",
+            "severity": "High",
+            "confidence": 0.9,
+            "details": "test",
+            "acknowledged": False,
+            **overrides,
+        }
+    return record
@@ -0,0 +1,108 @@
+import json
+from incidents.storage import IncidentStore
+
+def test_queries_are_paginated_filtered_and_newest_first(tmp_path, incident_record):
+    store = IncidentStore(str(tmp_path / "incidents.db"))
+    for n in range(20):
+        store.append(incident_record(n))
+
+    page = store.query(limit=5, offset=5)
+    assert [i["id"] for i in page] == [f"INC-{n:04d}" for n in range(14, 9, -1)]
+    assert len(store.query()) == 20
+
+    ppe = store.query(worker_id="p_1", incident_type="PPE Violation")
+    assert ppe and all(i["workerId"] == "p_1" and i["type"] == "PPE Violation" for i in ppe)
+    assert store.count(since="2026-01-01T12:00:15") == 5
+
+    store.set_acknowledged("INC-0003")
+    store.add_note("INC-0003", {"timestamp": "2026-01-01T13:00:00", "content": "checked"})
+    store.delete("INC-0004")
+    assert [i["id"] for i in store.query(acknowledged=True)] == ["INC-0003"]
+    assert store.get("INC-0003")["notes"][0]["content"] == "checked"
+    assert "notes" not in store.get("INC-0005")
+    assert store.get("INC-0004") is None
+
+def test_legacy_json_history_is_imported_once(tmp_path, incident_record):
+    legacy = tmp_path / "data.json"
+    legacy.write_text(json.dumps([incident_record(2), incident_record(1, acknowledged=True)]))
+    path = str(tmp_path / "incidents.db")
+
+    store = IncidentStore(path, legacy_json=str(legacy))
+    assert [i["id"] for i in store.query()] == ["INC-0002", "INC-0001"]
+    assert store.get("INC-0001")["acknowledged"] is True
+    store.delete("INC-0001")
+    store.close()
+
+    # Reopening does not bring deleted history back
+    assert [i["id"] for i in IncidentStore(path, legacy_json=str(legacy)).query()] == ["INC-0002"]
+
+def test_logger_serves_recent_incidents_from_memory(tmp_path, monkeypatch, incident_record):
+    from agent.perception import Incident
+    from incidents.logger import IncidentLogger
+
+    logger = IncidentLogger(db_path=str(tmp_path / "incidents.db"), recent_size=3)
+    for n in range(5):
+        logger.log(Incident(**incident_record(n)), None)
+
+    # Reads of the newest entries must not reach the database
+    monkeypatch.setattr(logger.store, "query", lambda *a, **k: (_ for _ in ()).throw(AssertionError("disk read")))
+    assert [i["id"] for i in logger.recent(3)] == ["INC-0004", "INC-0003", "INC-0002"]
+    logger.resolve("INC-0003")
+    logger.add_note("INC-0003", "checked")
+    assert logger.query(limit=2, offset=1)[0]["acknowledged"] is True
+    assert logger.recent(2)[1]["notes"][0]["content"] == "checked"
+    monkeypatch.undo()
+
+    logger.delete("INC-0004")
+    assert [i["id"] for i in logger.recent(3)] == ["INC-0003", "INC-0002", "INC-0001"]
+    assert logger.store.get("INC-0003")["acknowledged"] is True
+
+def test_logger_buffer_matches_store_order_for_late_and_relogged_incidents(tmp_path, incident_record):
+    from agent.perception import Incident
+    from incidents.logger import IncidentLogger
+
+    logger = IncidentLogger(db_path=str(tmp_path / "incidents.db"), recent_size=3)
+    for n in (1, 4, 2, 5):
+        logger.log(Incident(**incident_record(n)), None)
+    # Re-logging an id replaces it instead of listing it twice
+    logger.log(Incident(**incident_record(4, details="updated")), None)
+    # Older than everything buffered: stays in the store only
+    logger.log(Incident(**incident_record(0)), None)
+
+    cached = logger.recent(3)
+    assert [i["id"] for i in cached] == ["INC-0005", "INC-0004", "INC-0002"]
+    assert cached[1]["details"] == "updated"
+    assert cached == logger.store.query(limit=3)
+    assert logger.query(limit=2, offset=1) == logger.store.query(limit=2, offset=1)
+
+def test_version_1_database_gains_camera_and_zone(tmp_path, incident_record):
+    import sqlite3
+    path = str(tmp_path / "incidents.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE incidents (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, timestamp TEXT NOT NULL,
+            workerId TEXT NOT NULL, type TEXT NOT NULL, severity TEXT NOT NULL, confidence REAL NOT NULL,
+            details TEXT NOT NULL, acknowledged INTEGER NOT NULL DEFAULT 0, notes TEXT
+        );
+        INSERT INTO incidents (id, timestamp, workerId, type, severity, confidence, details)
+            VALUES ('INC-0001', '2026-01-01T12:00:01', 'p_1', 'PPE Violation', 'High', 0.9, 'old');
+        PRAGMA user_version=1;
+    """)
+    conn.close()
+
+    store = IncidentStore(path)
+    store.append(incident_record(2, cameraId="cam_1", zone="Loading Dock"))
+    assert [(i["cameraId"], i["zone"]) for i in store.query()] == [("cam_1", "Loading Dock"), (None, None)]
+
+def test_logger_recent_is_scoped_to_a_camera(tmp_path, incident_record):
+    from agent.perception import Incident
+    from incidents.logger import IncidentLogger
+
+    logger = IncidentLogger(db_path=str(tmp_path / "incidents.db"), recent_size=10)
+    for n in range(6):
+        logger.log(Incident(**incident_record(n, cameraId=f"cam_{n % 2}")), None)
+
+    assert [i["id"] for i in logger.recent(2, "cam_1")] == ["INC-0005", "INC-0003"]
+    assert [i["id"] for i in logger.recent(10, "cam_0")] == ["INC-0004", "INC-0002", "INC-0000"]
+    assert len(logger.recent(10)) == 6
@@ -0,0 +1,160 @@
+import time
+import cv2
+import numpy as np
+from video.decode import scaled_size
+from video.ingest import VideoIngest
+
+def _write_video(path, frames=12, fps=60, size=(320, 240)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 20, dtype=np.uint8))
+    writer.release()
+
+def test_scaled_size_keeps_aspect_ratio():
+    assert scaled_size(3840, 2160, 640) == (640, 360)
+    assert scaled_size(320, 240, 640) == (320, 240)
+    assert scaled_size(1920, 1080, 0) == (1920, 1080)
+
+def test_file_ingest_samples_by_media_time_and_downscales(tmp_path):
+    path = tmp_path / "clip.avi"
+    _write_video(path)
+
+    ingest = VideoIngest(str(path), fps_limit=30, backend="opencv", max_width=160)
+    try:
+        frames = [frame for _, frame in ingest.get_frames()]
+    finally:
+        ingest.stop()
+
+    # Every other frame of the 60 fps file is retrieved, the rest are only grabbed
+    assert len(frames) == 6
+    assert ingest.stats()["dropped"] == 6
+    assert frames[0].shape == (120, 160, 3)
+    assert [round(f.mean() / 20) for f in frames] == [0, 2, 4, 6, 8, 10]
+
+class _LiveDecoder:
+    """Stands in for a 100 fps camera; frames are their grab number."""
+    fps = 0.0
+
+    def __init__(self):
+        self.count = 0
+
+    def grab(self):
+        time.sleep(0.01)
+        self.count += 1
+        return True
+
+    def retrieve(self):
+        return self.count
+
+    def release(self):
+        pass
+
+def test_live_ingest_yields_the_newest_frame_when_the_consumer_lags():
+    ingest = VideoIngest("rtsp://camera", fps_limit=20, latest_frame=True)
+    ingest.decoder = _LiveDecoder()
+    frames = []
+    try:
+        for _, frame in ingest.get_frames():
+            frames.append(frame)
+            if len(frames) == 4:
+                break
+            # Slow inference: frames keep arriving meanwhile
+            time.sleep(0.1)
+    finally:
+        ingest.stop()
+
+    # Frames that arrived during the slow step were dropped instead of queued up
+    assert all(b - a >= 5 for a, b in zip(frames, frames[1:]))
+    stats = ingest.stats()
+    assert stats["yielded"] == 4
+    assert stats["dropped"] > 0
+    assert stats["capture_fps"] > 20
+
+def test_capture_rewinds_files_in_place(tmp_path):
+    from video.capture import CaptureThread, FrameQueue
+
+    path = tmp_path / "clip.avi"
+    _write_video(path, frames=4, fps=100)
+    opened = []
+
+    def factory(source, fps_limit):
+        opened.append(source)
+        return VideoIngest(source, fps_limit=fps_limit, backend="opencv")
+
+    frames = FrameQueue(maxsize=100, policy="drop_newest")
+    capture = CaptureThread(str(path), frames, fps_limit=0, ingest_factory=factory)
+    capture.start()
+    deadline = time.time() + 5
+    while capture.rewinds < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    capture.stop(timeout=2)
+
+    assert capture.rewinds >= 2
+    assert len(opened) == 1
+    assert capture.health == "stopped"
+
+def test_capture_reconnects_with_backoff():
+    from video.capture import CaptureThread, FrameQueue
+
+    class FlakyIngest:
+        attempts = 0
+
+        def __init__(self, source, fps_limit):
+            FlakyIngest.attempts += 1
+            if FlakyIngest.attempts <= 2:
+                raise RuntimeError("Connection refused")
+
+        def get_frames(self):
+            while True:
+                yield time.time(), "frame"
+                time.sleep(0.01)
+
+        def rewind(self):
+            return False
+
+        def stop(self):
+            pass
+
+    frames = FrameQueue(maxsize=1)
+    capture = CaptureThread("rtsp://camera", frames, ingest_factory=FlakyIngest, backoff_initial=0.01, backoff_max=0.05)
+    capture.failures = 10
+    assert capture.backoff() <= 0.05 * 1.2
+    capture.failures = 0
+    capture.start()
+    packet = frames.get(timeout=2)
+    health = capture.health
+    capture.stop(timeout=2)
+
+    assert packet[1] == "frame"
+    assert health == "streaming"
+    assert capture.reconnects == 2
+
+def test_flapping_source_keeps_backing_off():
+    from video.capture import CaptureThread, FrameQueue
+
+    class FlappingIngest:
+        """Connects, delivers a single frame and drops."""
+        attempts = 0
+
+        def __init__(self, source, fps_limit):
+            FlappingIngest.attempts += 1
+
+        def get_frames(self):
+            yield time.time(), "frame"
+
+        def rewind(self):
+            return False
+
+        def stop(self):
+            pass
+
+    frames = FrameQueue(maxsize=1)
+    capture = CaptureThread("rtsp://camera", frames, ingest_factory=FlappingIngest,
+                            backoff_initial=0.01, backoff_max=10, healthy_seconds=5)
+    capture.start()
+    time.sleep(0.5)
+    capture.stop(timeout=2)
+
+    # Delays double despite each connection delivering a frame: about 6 reopens, not 50
+    assert capture.failures >= 4
+    assert FlappingIngest.attempts <= 8
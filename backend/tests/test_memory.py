@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from agent.memory import Memory
+from agent.perception import Worker
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+def test_timeline_window_matches_recorded_samples(worker_sample):
+    memory = Memory()
+    samples = [
+        Worker(**worker_sample(
+            i, interval=0.2, x=float(i % 100), hasHelmet=i % 2 == 0,
+            zone="Loading Dock" if i % 3 else "Safe", status="Stationary" if i % 5 == 0 else "Moving",
+        ))
+        for i in range(450)
+    ]
+    for sample in samples:
+        memory.update([sample])
+
+    history = memory.get_worker_memory("p_1")
+    assert len(history) == 100
+    # 6 seconds at 5 samples/s, both ends inclusive
+    assert history.get_timeline(seconds=6) == [s.model_dump() for s in samples[-31:]]
+    assert history.get_timeline(seconds=60) == [s.model_dump() for s in samples[-100:]]
+    assert memory.get_worker_memory("p_2") is None
+
+def test_timeline_returns_values_as_reported():
+    memory = Memory()
+    worker = Worker(id="p_1", x=33.3, y=66.7, hasHelmet=True, hasVest=False, zone="Safe",
+                    status="Moving", lastSeen=START.isoformat(), confidence=0.6)
+    memory.update([worker])
+
+    sample = memory.get_worker_memory("p_1").get_timeline()[0]
+    assert (sample["x"], sample["y"], sample["confidence"]) == (33.3, 66.7, 0.6)
+
+def test_stale_and_excess_tracks_are_evicted(worker_sample):
+    memory = Memory(retention_seconds=2, max_tracks=3)
+    at = lambda seconds: (START + timedelta(seconds=seconds)).isoformat()
+
+    # Workers on screen are never evicted by the cap, even when there are more of them
+    assert memory.update([Worker(**worker_sample(id=f"p_{n}", lastSeen=at(0))) for n in range(4)], at(0)) == []
+    assert list(memory.workers) == ["p_0", "p_1", "p_2", "p_3"]
+    # Once p_1 is seen again, the least recently seen worker gives way
+    assert memory.update([Worker(**worker_sample(id="p_1", lastSeen=at(1)))], at(1)) == ["p_0"]
+    # p_2 and p_3 were last seen 2.5s ago; p_1 was refreshed
+    assert memory.update([], at(2.5)) == ["p_2", "p_3"]
+    assert list(memory.workers) == ["p_1"]
+    assert memory.update([], at(3.5)) == ["p_1"]
+
+def test_streaming_features_track_dwell_ppe_and_motion(worker_sample):
+    from agent.rules import RulesEngine
+    memory = Memory(retention_seconds=60)
+    at = lambda seconds: (START + timedelta(seconds=seconds)).isoformat()
+    # Walk across the safe zone for 2s, then stand still in the pit for 6s
+    for step in range(41):
+        t = step * 0.2
+        walking = t < 2
+        worker = Worker(**worker_sample(x=10.0 + 10 * min(t, 2), zone="Safe" if walking else "Excavation Pit",
+                                        hasHelmet=t < 7, lastSeen=at(t)))
+        memory.update([worker], at(t))
+
+    features = memory.get_worker_memory("p_1").features
+    assert worker.status == features.status == "Stationary"
+    assert features.zone_transitions == 1
+    assert abs(features.zone_dwell["Safe"] - 2.0) < 1e-6
+    assert abs(features.zone_seconds - 6.0) < 1e-6
+    assert abs(features.seconds_without_helmet - 1.2) < 1e-6
+    assert 5 < features.stationary_seconds <= 6
+    timeline = memory.get_worker_memory("p_1").get_timeline(seconds=6)
+    verdict = RulesEngine().evaluate(timeline, features=features)
+    assert verdict["type"] == "Zone Intrusion"
@@ -0,0 +1,107 @@
+import json
+import os
+import numpy as np
+from agent.perception import Detections, PerceptionEngine, ModelPool
+from agent.zones import ZoneEngine
+
+SITE_ZONES = {
+    "default_zone": "Safe",
+    "cameras": {
+        "default": [
+            {"name": "Loading Dock", "hazardous": True, "polygon": [[60, 0], [100, 0], [100, 50], [60, 50]]},
+            {"name": "Excavation Pit", "hazardous": True, "polygon": [[0, 50], [45, 50], [45, 100], [0, 100]]},
+        ],
+        "cam_2": [
+            {"name": "Crane Swing", "hazardous": True, "polygon": [[0, 0], [100, 0], [0, 100]]},
+            {"name": "Walkway", "polygon": [[0, 0], [20, 0], [20, 20], [0, 20]]},
+        ],
+    },
+}
+
+def _zone_engine(tmp_path, zones=SITE_ZONES):
+    path = tmp_path / "zones.json"
+    path.write_text(json.dumps(zones))
+    return ZoneEngine(str(path), grid_size=200, reload_interval=0)
+
+class _FixedTracker:
+    def __init__(self, tracks):
+        self.tracks = np.asarray(tracks, dtype=np.float32)
+
+    def update(self, boxes, frame):
+        return self.tracks
+
+class _Result:
+    class boxes:
+        @staticmethod
+        def cpu():
+            return _Result.boxes
+
+        @staticmethod
+        def numpy():
+            return None
+
+def _engine(zones, tracker):
+    # The pool loads YOLO lazily, so no weights are needed here
+    engine = PerceptionEngine(pool=ModelPool("unused.pt"), zones=zones)
+    engine.trackers[None] = tracker
+    return engine
+
+def test_tracks_are_converted_column_wise(tmp_path):
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    tracker = _FixedTracker([
+        # x1, y1, x2, y2, id, score, cls, idx
+        [140, 10, 160, 40, 7, 0.9, 0, 0],   # feet (150, 40) -> (75, 40): Loading Dock
+        [20, 50, 60, 90, 3, 0.6, 0, 1],     # feet (40, 90)  -> (20, 90): Excavation Pit
+        [90, 20, 110, 50, 5, 0.8, 0, 2],    # feet (100, 50) -> (50, 50): Safe
+    ])
+
+    detections = _engine(_zone_engine(tmp_path), tracker)._track(frame, _Result(), None)
+
+    assert len(detections) == 3
+    np.testing.assert_allclose(detections.norm, [[75, 40], [20, 90], [50, 50]])
+    workers = detections.to_workers()
+    assert [w.id for w in workers] == ["p_7", "p_3", "p_5"]
+    assert [w.zone for w in workers] == ["Loading Dock", "Excavation Pit", "Safe"]
+    assert workers[1].confidence == np.float32(0.6)
+    assert all(w.lastSeen == detections.timestamp for w in workers)
+
+def test_empty_tracks_give_empty_detections(tmp_path):
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    detections = _engine(_zone_engine(tmp_path), _FixedTracker([]))._track(frame, _Result(), None)
+
+    assert len(detections) == 0
+    assert detections.to_dicts() == []
+    assert isinstance(Detections.empty("t").to_workers(), list)
+
+def test_polygon_lookup_is_per_camera(tmp_path):
+    zones = _zone_engine(tmp_path)
+    points = np.array([[10, 10], [70, 60], [90, 90], [30, 30]], dtype=np.float32)
+
+    cam_2 = zones.zone_map("cam_2")
+    names = [cam_2.names[c] for c in cam_2.lookup(points)]
+    # Walkway overrides the triangle it overlaps because it is listed later
+    assert names == ["Walkway", "Safe", "Safe", "Crane Swing"]
+    assert zones.hazardous_zones("cam_2") == {"Crane Swing"}
+
+    # Cameras without their own zones fall back to the default set
+    assert zones.zone_at("cam_9", 80, 20) == "Loading Dock"
+    assert zones.zone_at("cam_9", 20, 80) == "Excavation Pit"
+
+def test_zones_file_is_hot_reloaded(tmp_path):
+    zones = _zone_engine(tmp_path)
+    assert zones.zone_at("cam_3", 50, 50) == "Safe"
+
+    updated = {"cameras": {"cam_3": [{"name": "Scaffold", "polygon": [[40, 40], [60, 40], [60, 60], [40, 60]]}]}}
+    path = tmp_path / "zones.json"
+    path.write_text(json.dumps(updated))
+    os.utime(path, (0, 1))
+
+    assert zones.zone_at("cam_3", 50, 50) == "Scaffold"
+
+def test_malformed_zones_file_keeps_previous_zones(tmp_path):
+    zones = _zone_engine(tmp_path)
+    path = tmp_path / "zones.json"
+    path.write_text("{not json")
+    os.utime(path, (0, 1))
+
+    assert zones.zone_at(None, 80, 20) == "Loading Dock"
@@ -0,0 +1,253 @@
+import asyncio
+import threading
+import time
+from video.capture import FrameQueue
+
+def test_drop_oldest_keeps_freshest_frames():
+    frames = FrameQueue(maxsize=2, policy="drop_oldest")
+    for i in range(5):
+        assert frames.put((float(i), i))
+
+    assert frames.dropped == 3
+    assert frames.get(timeout=0)[1] == 3
+    assert frames.get(timeout=0)[1] == 4
+    assert frames.get(timeout=0) is None
+
+def test_drop_newest_rejects_incoming_frames():
+    frames = FrameQueue(maxsize=1, policy="drop_newest")
+    assert frames.put((0.0, "first"))
+    assert not frames.put((1.0, "second"))
+    assert frames.get(timeout=0)[1] == "first"
+
+def test_async_consumer_is_woken_by_capture_thread():
+    frames = FrameQueue(maxsize=2)
+
+    async def consume():
+        producer = threading.Timer(0.05, frames.put, args=((1.0, "frame"),))
+        producer.start()
+        return await frames.get_async(timeout=2)
+
+    assert asyncio.run(consume())[1] == "frame"
+
+def test_close_releases_waiting_consumer():
+    frames = FrameQueue(maxsize=2)
+
+    async def consume():
+        threading.Timer(0.05, frames.close).start()
+        return await frames.get_async(timeout=2)
+
+    assert asyncio.run(consume()) is None
+    assert frames.closed
+
+class _RecordingPerception:
+    def __init__(self):
+        self.batches = []
+
+    def detect_batch(self, frames, camera_ids):
+        self.batches.append(list(camera_ids))
+        return [[f"{camera_id}:{frame}"] for frame, camera_id in zip(frames, camera_ids)]
+
+    def reset_camera(self, camera_id):
+        pass
+
+def test_micro_batcher_groups_cameras_into_one_call():
+    from agent.batching import MicroBatcher
+
+    perception = _RecordingPerception()
+
+    async def scenario():
+        batcher = MicroBatcher(perception, max_batch_size=4, max_wait_ms=20)
+        return await asyncio.gather(*(batcher.detect(i, f"cam_{i}") for i in range(6)))
+
+    results = asyncio.run(scenario())
+    # Results are routed back to the camera that submitted the frame
+    assert results == [[f"cam_{i}:{i}"] for i in range(6)]
+    assert [len(b) for b in perception.batches] == [4, 2]
+
+def test_frame_ring_hands_out_views_and_detects_reuse():
+    import numpy as np
+    from video.shm import FrameRing, SharedFrameReader
+
+    ring = FrameRing.create(slots=2, slot_bytes=4 * 6 * 3)
+    reader = SharedFrameReader(FrameRing.attach(ring.name))
+    try:
+        frame = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+        assert ring.write(1.0, frame) == 1
+        assert ring.write(2.0, np.zeros((8, 8, 3), dtype=np.uint8)) == -1
+
+        timestamp, view = asyncio.run(reader.get_async(timeout=0.1))
+        assert timestamp == 1.0 and np.array_equal(view, frame)
+        # Zero-copy: the view reads the shared slot directly
+        assert not view.flags.owndata
+        kept = reader.detach(view)
+
+        ring.write(2.0, frame + 1)
+        ring.write(3.0, frame + 2)
+        assert not reader.valid()
+        assert reader.detach(view) is None
+        assert np.array_equal(kept, frame)
+
+        # The reader jumps to the newest frame
+        timestamp, view = asyncio.run(reader.get_async(timeout=0.1))
+        assert timestamp == 3.0 and reader.dropped == 2
+
+        ring.close_stream()
+        assert reader.closed
+    finally:
+        reader.ring.close()
+        ring.close()
+
+def test_oversized_frames_mark_the_capture_unhealthy(capsys):
+    import numpy as np
+    from video.capture import CaptureThread
+    from video.shm import FrameRing, SharedFrameWriter
+
+    class PortraitIngest:
+        def __init__(self, source, fps_limit):
+            pass
+
+        def get_frames(self):
+            # A live camera: frames keep coming until the capture stops
+            i = 0
+            while True:
+                i += 1
+                yield (float(i), np.zeros((8, 4, 3), dtype=np.uint8))
+                time.sleep(0.001)
+
+        def rewind(self):
+            return False
+
+        def stats(self):
+            return {}
+
+        def stop(self):
+            pass
+
+    ring = FrameRing.create(slots=2, slot_bytes=4 * 4 * 3)
+    capture = CaptureThread("portrait", SharedFrameWriter(ring), ingest_factory=PortraitIngest)
+    try:
+        capture.start()
+        deadline = time.time() + 5
+        while capture.rejected < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        assert capture.health == "unhealthy"
+        assert capture.rejected >= 3 and capture.captured == 0
+        assert "SENTINEL_FRAME_RING_SLOT_BYTES" in capture.last_error
+        assert capture.stats()["rejected"] >= 3
+        # Warned once, not for every rejected frame
+        assert capsys.readouterr().out.count("does not fit") == 1
+    finally:
+        capture.stop(timeout=2)
+        ring.close()
+
+def test_capture_process_streams_through_shared_memory(tmp_path):
+    import cv2
+    import numpy as np
+    from video.capture import CaptureProcess
+    from video.shm import FrameRing, SharedFrameReader
+
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(30):
+        writer.write(np.full((48, 64, 3), 100, dtype=np.uint8))
+    writer.release()
+
+    ring = FrameRing.create(slots=4, slot_bytes=64 * 48 * 3)
+    frames = SharedFrameReader(ring)
+    capture = CaptureProcess(str(path), frames, fps_limit=30, publish_interval=0.05)
+    broken_ring = FrameRing.create(slots=2, slot_bytes=64)
+    broken = CaptureProcess(str(tmp_path / "missing.avi"), SharedFrameReader(broken_ring), publish_interval=0.05)
+    capture.start()
+    broken.start()
+    try:
+        packet = asyncio.run(frames.get_async(timeout=30))
+        assert packet is not None and packet[1].shape == (48, 64, 3)
+        # Health and errors of the child's capture thread reach the parent
+        deadline = time.time() + 30
+        while (capture.health != "streaming" or broken.health != "reconnecting") and time.time() < deadline:
+            time.sleep(0.05)
+        assert capture.health == "streaming"
+        assert capture.stats()["rewinds"] >= 0
+        assert broken.health == "reconnecting"
+        assert "Failed to open" in broken.last_error
+        assert broken.stats()["reconnects"] >= 1
+    finally:
+        capture.stop(timeout=10)
+        broken.stop(timeout=10)
+        ring.close()
+        broken_ring.close()
+    assert capture.health == "stopped"
+
+class _OverwrittenFrames:
+    """Frame source whose shared-memory slots are always reused before detach."""
+    def __init__(self, count):
+        self.packets = [(float(i), None) for i in range(count)]
+        self.dropped = 0
+        self.closed = False
+
+    async def get_async(self, timeout=None):
+        if not self.packets:
+            self.closed = True
+            return None
+        return self.packets.pop(0)
+
+    def detach(self, frame):
+        return None
+
+    def close(self):
+        self.closed = True
+
+class _IdleCapture:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self, timeout=None):
+        pass
+
+class _HelmetlessBatcher:
+    def __init__(self):
+        self.step = 0
+
+    async def detect(self, frame, camera_id):
+        import numpy as np
+        from datetime import datetime, timedelta
+        from agent.perception import Detections
+        timestamp = (datetime(2026, 1, 1, 12) + timedelta(seconds=0.2 * self.step)).isoformat()
+        self.step += 1
+        return Detections(
+            ids=np.array([1]), xyxy=np.array([[0.0, 0.0, 10.0, 20.0]]), confidence=np.array([0.9]),
+            feet=np.array([[5.0, 20.0]]), norm=np.array([[50.0, 50.0]]), zone_codes=np.array([0]),
+            has_helmet=np.array([False]), has_vest=np.array([True]), timestamp=timestamp,
+        )
+
+    def reset_camera(self, camera_id):
+        pass
+
+class _SilentManager:
+    async def broadcast(self, message):
+        pass
+
+def test_rules_still_fire_when_the_frame_slot_was_reused(tmp_path, monkeypatch):
+    import agent.loop
+    from agent.loop import AgentRunner
+    from incidents.logger import IncidentLogger
+
+    logger = IncidentLogger(db_path=str(tmp_path / "incidents.db"))
+    monkeypatch.setattr(agent.loop, "incident_logger", logger)
+    monkeypatch.setattr(agent.loop, "CaptureThread", _IdleCapture)
+    monkeypatch.setattr(agent.loop, "FrameQueue", lambda **kwargs: _OverwrittenFrames(11))
+    monkeypatch.setattr(agent.loop.config, "CAPTURE_PROCESS", False)
+
+    async def scenario():
+        runner = AgentRunner(_SilentManager(), camera_id="cam_1", batcher=_HelmetlessBatcher())
+        await runner.start("unused")
+        await runner.task
+        await runner.escalation.stop()
+
+    asyncio.run(scenario())
+    # The incident is logged without a snapshot instead of being skipped
+    incidents = logger.recent(10, "cam_1")
+    assert [i["type"] for i in incidents] == ["PPE Violation"]
@@ -0,0 +1,99 @@
+from video.processor import VideoProcessor, stitch_chunks
+
+def _frame(index, boxes):
+    return {
+        "frame": index,
+        "timestamp": index / 10,
+        "workers": [{"id": worker_id} for worker_id in boxes],
+        "boxes": boxes,
+    }
+
+def test_chunk_ranges_cover_the_file():
+    processor = VideoProcessor(workers=4, chunk_seconds=10, overlap_frames=5)
+    assert processor.chunk_ranges(1000, 30) == [(0, 300), (300, 600), (600, None)]
+    assert processor.chunk_ranges(500, 30) == [(0, None)]
+
+def test_tracks_keep_their_ids_across_chunk_boundaries():
+    walker = lambda i: [10.0 + i, 10.0, 60.0 + i, 110.0]
+    standing = [300.0, 50.0, 350.0, 150.0]
+    chunks = [
+        {"index": 0, "overlap": {}, "frames": [_frame(i, {"p_1": walker(i), "p_2": standing}) for i in range(10)]},
+        # The second chunk's tracker restarts numbering and sees a newcomer
+        {"index": 1, "overlap": {i: {"p_1": standing, "p_2": walker(i)} for i in range(7, 10)},
+         "frames": [_frame(i, {"p_1": standing, "p_2": walker(i), "p_3": [500.0, 0.0, 540.0, 90.0]}) for i in range(10, 20)]},
+    ]
+
+    frames = stitch_chunks(chunks)
+    assert [f["frame"] for f in frames] == list(range(20))
+    assert [w["id"] for w in frames[-1]["workers"]] == ["p_2", "p_1", "p_3"]
+    assert all("boxes" not in f for f in frames)
+
+def test_samplers_and_interpolation():
+    import numpy as np
+    from video.sampler import FpsSampler, MotionSampler, interpolate_frame
+
+    assert [i for i in range(10) if FpsSampler(30, 10).should_analyze(i)] == [0, 3, 6, 9]
+
+    motion = MotionSampler(threshold=4, max_skip=3)
+    still = np.full((90, 160, 3), 100, dtype=np.uint8)
+    moved = still.copy()
+    moved[:, :80] = 200
+    decisions = [motion.should_analyze(i, frame) for i, frame in enumerate([still] * 6 + [moved, moved])]
+    assert decisions == [True, False, False, False, True, False, True, False]
+
+    before = _frame(0, {"p_1": [0.0, 0.0, 10.0, 10.0], "p_2": [50.0, 50.0, 60.0, 60.0]})
+    after = _frame(4, {"p_1": [40.0, 0.0, 50.0, 10.0], "p_3": [90.0, 0.0, 99.0, 10.0]})
+    for record, x in ((before, 0.0), (after, 40.0)):
+        for worker in record["workers"]:
+            worker.update({"x": x, "y": 5.0})
+
+    early, late = interpolate_frame(before, after, 1, 10), interpolate_frame(before, after, 3, 10)
+    assert [w["id"] for w in early["workers"]] == ["p_1", "p_2"]
+    assert [w["id"] for w in late["workers"]] == ["p_1", "p_3"]
+    assert early["workers"][0]["x"] == 10.0 and late["boxes"]["p_1"] == [30.0, 0.0, 40.0, 10.0]
+    assert early["interpolated"] and early["timestamp"] == 0.1
+
+    # The zone follows the interpolated position instead of being copied from an end frame
+    from agent.zones import ZoneMap
+    zones = ZoneMap([{"name": "Pit", "polygon": [[15, 0], [25, 0], [25, 10], [15, 10]], "hazardous": True}])
+    middle = interpolate_frame(before, after, 2, 10, zones)
+    assert middle["workers"][0]["x"] == 20.0 and middle["workers"][0]["zone"] == "Pit"
+    assert interpolate_frame(before, after, 1, 10, zones)["workers"][0]["zone"] == "Safe"
+
+class _FixedDetections:
+    def __init__(self):
+        import numpy as np
+        self.xyxy = np.array([[1.0, 2.0, 11.0, 22.0]])
+
+    def worker_ids(self):
+        return ["p_1"]
+
+    def to_dicts(self):
+        return [{"id": "p_1"}]
+
+class _FixedPerception:
+    def detect(self, frame, camera_id=None):
+        return _FixedDetections()
+
+    def reset_camera(self, camera_id):
+        pass
+
+def test_sink_receives_frames_in_order_and_result_has_only_metadata(tmp_path):
+    import cv2
+    import numpy as np
+
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 24))
+    for i in range(12):
+        writer.write(np.full((24, 32, 3), i * 10, dtype=np.uint8))
+    writer.release()
+
+    processor = VideoProcessor(workers=1, sampling="all")
+    processor._perception = _FixedPerception()
+    received = []
+    result = processor.process_video(str(path), sink=received.append)
+
+    assert list(result) == ["metadata"]
+    assert result["metadata"]["analyzed_frames"] == 12
+    assert [f["frame"] for f in received] == list(range(12))
+    assert all("boxes" not in f and f["workers"] == [{"id": "p_1"}] for f in received)
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import re
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from agent.reasoning_client import AsyncReasoningClient
+from agent.throttle import CircuitBreaker
+
+def _stub_gemini(state):
+    """In-process stand-in for the Gemini generateContent endpoint."""
+    app = FastAPI()
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate(model: str, request: Request):
+        state["requests"] += 1
+        state["keys"].append(request.headers.get("x-goog-api-key"))
+        if state.get("fail"):
+            return JSONResponse({"error": "unavailable"}, status_code=503)
+        prompt = (await request.json())["contents"][0]["parts"][0]["text"]
+        timeline_ids = sorted(set(re.findall(r'"(t\d+)":', prompt)))
+        state["batch_sizes"].append(len(timeline_ids))
+        results = [
+            {"timeline_id": tid, "incident": tid == "t0", "reason": "PPE Violation: missing helmet", "confidence": 0.95}
+            for tid in timeline_ids
+        ]
+        text = json.dumps({"results": results})
+        return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+    return app
+
+def _client(state, **kwargs):
+    transport = httpx.ASGITransport(app=_stub_gemini(state))
+    options = dict(api_key="test-key", base_url="http://stub", rate_per_key=0, max_wait_ms=20, transport=transport)
+    options.update(kwargs)
+    return AsyncReasoningClient(**options)
+
+def _state():
+    return {"requests": 0, "keys": [], "batch_sizes": []}
+
+TIMELINE = [{"id": "p_1", "zone": "Loading Dock", "hasHelmet": False, "hasVest": True, "status": "Moving"}]
+
+def test_concurrent_timelines_share_one_request():
+    state = _state()
+
+    async def scenario():
+        client = _client(state, max_batch_size=8)
+        results = await asyncio.gather(*(client.analyze(f"p_{i}", TIMELINE) for i in range(3)))
+        await client.aclose()
+        return results
+
+    results = asyncio.run(scenario())
+    assert state["requests"] == 1 and state["batch_sizes"] == [3]
+    assert [r["incident"] for r in results] == [True, False, False]
+    assert all(r["source"] == "llm" for r in results)
+    assert state["keys"] == ["test-key"]
+
+def test_batches_are_capped_and_limited_per_key():
+    state = _state()
+
+    async def scenario():
+        client = _client(state, max_batch_size=2, max_concurrency=1)
+        await asyncio.gather(*(client.analyze(f"p_{i}", TIMELINE) for i in range(5)))
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert sorted(state["batch_sizes"]) == [1, 2, 2]
+
+def test_breaker_opens_and_falls_back_to_heuristic():
+    state = _state()
+    state["fail"] = True
+
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        client = _client(state, max_wait_ms=0, breaker=breaker)
+        results = [await client.analyze("p_1", TIMELINE) for _ in range(4)]
+        await client.aclose()
+        return client, results
+
+    client, results = asyncio.run(scenario())
+    # Two failures open the circuit, later calls never reach the server
+    assert state["requests"] == 2
+    assert client.breaker.state == "open"
+    assert all(r["source"] == "fallback" for r in results)
+
+def test_missing_api_key_uses_heuristic_without_network():
+    state = _state()
+
+    async def scenario():
+        return await _client(state, api_key=None).analyze("p_1", TIMELINE)
+
+    assert asyncio.run(scenario())["source"] == "fallback"
+    assert state["requests"] == 0
+
+def test_unchanged_situation_reuses_cached_verdict():
+    from datetime import datetime, timedelta
+    from agent.reasoning_cache import timeline_fingerprint
+
+    def timeline(start, jitter):
+        t0 = datetime(2026, 1, 1, 12, 0, 0) + timedelta(seconds=start)
+        return [
+            {"zone": "Loading Dock", "hasHelmet": False, "hasVest": True, "status": "Moving",
+             "x": 72.0 + jitter, "y": 31.0 - jitter, "lastSeen": (t0 + timedelta(seconds=i)).isoformat()}
+            for i in range(5)
+        ]
+
+    # Later timestamps and sub-cell movement keep the same fingerprint
+    assert timeline_fingerprint(timeline(0, 0)) == timeline_fingerprint(timeline(7, 0.8))
+    changed = timeline(7, 0)
+    changed[-1]["hasHelmet"] = True
+    assert timeline_fingerprint(changed) != timeline_fingerprint(timeline(0, 0))
+
+    state = _state()
+
+    async def scenario():
+        client = _client(state, max_wait_ms=0)
+        first = await client.analyze("p_1", timeline(0, 0))
+        second = await client.analyze("p_1", timeline(7, 0.8))
+        return client, first, second
+
+    client, first, second = asyncio.run(scenario())
+    assert state["requests"] == 1
+    assert first["source"] == "llm" and second["source"] == "cache"
+    assert second["incident"] == first["incident"]
+    assert client.stats()["cache"]["hits"] == 1
+
+def test_prompt_lists_hazardous_zones_from_the_zone_config(tmp_path):
+    from agent.zones import ZoneEngine
+    square = [[0, 0], [10, 0], [10, 10], [0, 10]]
+    path = tmp_path / "zones.json"
+    path.write_text(json.dumps({"cameras": {
+        "default": [{"name": "Loading Dock", "hazardous": True, "polygon": square}],
+        "cam_2": [{"name": "Crane Swing", "hazardous": True, "polygon": square}, {"name": "Walkway", "polygon": square}],
+    }}))
+    zones = ZoneEngine(str(path), reload_interval=0)
+    client = _client(_state(), zones=zones)
+
+    hazardous = [client.zones.hazardous_zones(camera_id) for camera_id in ("cam_1", "cam_2", "cam_1")]
+    prompt = client.create_batch_prompt([("p_1", TIMELINE, None, zones, "", None) for zones in hazardous])
+    assert "t0, t2: 'Loading Dock'; t1: 'Crane Swing'" in prompt
+    assert "Excavation Pit" not in prompt and "Walkway" not in prompt
+
+    prompt = client.create_batch_prompt([("p_1", TIMELINE, {"seconds_without_helmet": 12.5}, hazardous[0], "", None)])
+    assert '{"t0": {"seconds_without_helmet": 12.5}}' in prompt
+
+    # Without a key, the local heuristic judges by the same zones
+    offline = _client(_state(), api_key=None, zones=zones)
+    crane = [{**TIMELINE[0], "zone": "Crane Swing", "hasHelmet": True}]
+    assert asyncio.run(offline.analyze("p_1", crane, camera_id="cam_2"))["incident"] is True
+    assert asyncio.run(offline.analyze("p_1", crane, camera_id="cam_1"))["incident"] is False
@@ -0,0 +1,52 @@
+import time
+from fastapi.testclient import TestClient
+from api import server
+from video.results import ResultStore
+
+def _store(tmp_path, frames=10):
+    store = ResultStore(str(tmp_path), index_interval=4)
+    writer = store.writer("task-1")
+    for i in range(frames):
+        writer.write({"frame": i, "workers": []})
+    writer.close({"total_frames": frames})
+    return store
+
+def test_frames_are_paged_from_disk(tmp_path):
+    store = _store(tmp_path)
+    total, frames = store.read_frames("task-1", offset=5, limit=3)
+    assert total == 10 and [f["frame"] for f in frames] == [5, 6, 7]
+    assert store.read_frames("task-1", offset=9, limit=5)[1] == [{"frame": 9, "workers": []}]
+    assert store.read_frames("task-1", offset=10) == (10, [])
+    assert store.read_frames("missing") is None
+
+def test_results_endpoints_page_stream_and_expire(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    monkeypatch.setattr(server, "RESULTS", store)
+    monkeypatch.setitem(server.TASKS, "task-1", {"status": "completed", "progress": 100, "finished_at": time.time()})
+    client = TestClient(server.app)
+
+    page = client.get("/analysis/results/task-1/frames", params={"offset": 8}).json()
+    assert page["total"] == 10 and [f["frame"] for f in page["frames"]] == [8, 9]
+    # A smaller configured page size is reported back to the client
+    monkeypatch.setattr(server.config, "ANALYSIS_PAGE_SIZE", 3)
+    page = client.get("/analysis/results/task-1/frames", params={"offset": 3, "limit": 500}).json()
+    assert page["limit"] == 3 and [f["frame"] for f in page["frames"]] == [3, 4, 5]
+    export = client.get("/analysis/results/task-1/stream")
+    assert len(export.text.splitlines()) == 10
+    assert "attachment" in export.headers["content-disposition"]
+
+    server.TASKS["task-1"]["finished_at"] = time.time() - 2
+    server.evict_tasks(ttl=1)
+    assert "task-1" not in server.TASKS
+    assert store.metadata("task-1") is None
+
+def test_task_fails_when_results_cannot_be_written(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path))
+    monkeypatch.setattr(server, "RESULTS", store)
+    monkeypatch.setitem(server.TASKS, "task-2", {"status": "pending", "progress": 0})
+    # The results directory disappears after startup
+    tmp_path.rmdir()
+
+    server.run_analysis_task("task-2", "missing.mp4")
+    assert server.TASKS["task-2"]["status"] == "failed"
+    assert "finished_at" in server.TASKS["task-2"]
@@ -0,0 +1,102 @@
+import asyncio
+from agent.decision import DecisionEngine
+from agent.escalation import EscalationQueue
+from agent.rules import RulesEngine
+
+def test_compliant_worker_in_safe_zone_is_settled_locally(worker_sample):
+    verdict = RulesEngine().evaluate([worker_sample(i) for i in range(6)])
+    assert verdict["incident"] is False
+    assert verdict["source"] == "rules"
+
+def test_consistently_missing_ppe_is_a_violation(worker_sample):
+    verdict = RulesEngine().evaluate([worker_sample(i, hasHelmet=False) for i in range(6)])
+    assert verdict["incident"] is True
+    assert verdict["type"] == "PPE Violation"
+    assert "helmet" in verdict["reason"]
+
+def test_flickering_ppe_is_escalated(worker_sample):
+    timeline = [worker_sample(i) for i in range(6)]
+    timeline[2]["hasVest"] = False
+    assert RulesEngine().evaluate(timeline) is None
+
+def test_loitering_in_hazardous_zone(worker_sample):
+    rules = RulesEngine()
+    long_stay = [worker_sample(i, zone="Excavation Pit", status="Stationary") for i in range(6)]
+    verdict = rules.evaluate(long_stay)
+    assert verdict["incident"] is True
+    assert verdict["type"] == "Zone Intrusion"
+
+    # Moving through a hazardous zone needs judgment
+    assert rules.evaluate([worker_sample(i, zone="Excavation Pit") for i in range(6)]) is None
+
+def test_rules_read_streaming_features_instead_of_the_samples(worker_sample):
+    from agent.features import WorkerFeatures
+    rules = RulesEngine()
+    # The track started without a helmet well before this timeline, which only holds compliant samples
+    timeline = [worker_sample(i) for i in range(6)]
+    features = WorkerFeatures()
+    for t in range(0, 11):
+        features.observe(t * 1_000_000, 50.0 + t, 50.0, "Excavation Pit" if t > 8 else "Safe", False, True)
+
+    verdict = rules.evaluate(timeline, features=features)
+    assert verdict["type"] == "PPE Violation" and "helmet" in verdict["reason"]
+    # Zone presence comes from the current zone as well
+    features.helmet_seen = features.last_seen
+    assert rules.evaluate(timeline, features=features) is None
+    assert rules.evaluate(timeline)["incident"] is False
+
+def test_decision_engine_applies_threshold_and_cooldown(worker_sample):
+    decision = DecisionEngine(confidence_threshold=0.85, cooldown_seconds=60)
+    verdict = RulesEngine().evaluate([worker_sample(i, hasVest=False) for i in range(6)])
+
+    incident = decision.evaluate(verdict, "p_1")
+    assert incident.type == "PPE Violation" and incident.workerId == "p_1"
+    # Same violation again is suppressed, a low-confidence verdict is ignored
+    assert decision.evaluate(verdict, "p_1") is None
+    assert decision.evaluate({"incident": True, "reason": "zone", "confidence": 0.5}, "p_2") is None
+
+def test_decision_engine_forgets_workers_after_the_cooldown(monkeypatch):
+    import agent.decision
+    from types import SimpleNamespace
+    clock = iter([0.0, 10.0, 11.0])
+    monkeypatch.setattr(agent.decision, "time", SimpleNamespace(monotonic=lambda: next(clock)))
+    decision = DecisionEngine(confidence_threshold=0.5, cooldown_seconds=5)
+    verdict = {"incident": True, "type": "PPE Violation", "reason": "no helmet", "confidence": 0.9}
+
+    assert decision.evaluate(verdict, "p_1")
+    assert decision.evaluate(verdict, "p_2")
+    # p_1's entry expired when p_2 was raised
+    assert list(decision._last_raised) == [("p_2", "PPE Violation")]
+    assert decision.evaluate(verdict, "p_2") is None
+
+class _StubReasoning:
+    def __init__(self):
+        self.calls = []
+
+    async def analyze_worker(self, worker_id, timeline, camera_id=None, features=None):
+        self.calls.append(worker_id)
+        return {"incident": True, "reason": "Zone Intrusion", "confidence": 0.9}
+
+    def stats(self):
+        return {}
+
+    async def aclose(self):
+        pass
+
+def test_escalation_queue_dedupes_and_reports_results():
+    reasoning = _StubReasoning()
+    results = []
+
+    async def scenario():
+        queue = EscalationQueue(reasoning, maxsize=4, concurrency=1)
+        assert queue.submit("p_1", "p_1", [], results.append)
+        # A second request for the same worker is dropped while one is pending
+        assert not queue.submit("p_1", "p_1", [], results.append)
+        assert queue.submit("p_2", "p_2", [], results.append)
+        while queue.stats()["completed"] < 2:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert reasoning.calls == ["p_1", "p_2"]
+    assert all(r["source"] == "llm" for r in results)
@@ -0,0 +1,37 @@
+import os
+import cv2
+import numpy as np
+from incidents.snapshots import SnapshotWriter
+
+def test_snapshots_are_resized_cropped_and_deduplicated(tmp_path):
+    writer = SnapshotWriter(str(tmp_path), workers=2, queue_size=8, max_width=320, dedup=True)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    cv2.rectangle(frame, (200, 100), (300, 400), (255, 255, 255), -1)
+    similar = frame.copy()
+    similar[200:210, 400:410] = 90  # looks alike, but is a different scene
+
+    assert writer.submit("INC-1", frame, box=[200, 100, 300, 400])
+    assert writer.submit("INC-2", frame.copy(), box=[200, 100, 300, 400])
+    assert writer.submit("INC-3", similar)
+    writer.stop()
+
+    full = cv2.imread(str(tmp_path / "INC-1.jpg"))
+    crop = cv2.imread(str(tmp_path / "INC-1_crop.jpg"))
+    assert full.shape[:2] == (240, 320)
+    assert crop.shape[:2] == (450, 150)  # box plus 25% padding, clipped to the frame
+    # Identical frames share a blob; crops and merely similar frames get their own files
+    assert os.path.samefile(tmp_path / "INC-1.jpg", tmp_path / "INC-2.jpg")
+    assert not os.path.samefile(tmp_path / "INC-1.jpg", tmp_path / "INC-3.jpg")
+    assert not os.path.samefile(tmp_path / "INC-1_crop.jpg", tmp_path / "INC-2_crop.jpg")
+    assert writer.stats()["deduplicated"] == 1
+    assert writer.stats()["written"] == 4
+
+def test_dedup_is_off_by_default(tmp_path):
+    writer = SnapshotWriter(str(tmp_path))
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    writer.submit("INC-1", frame)
+    writer.submit("INC-2", frame)
+    writer.stop()
+
+    assert not os.path.samefile(tmp_path / "INC-1.jpg", tmp_path / "INC-2.jpg")
+    assert writer.stats()["deduplicated"] == 0
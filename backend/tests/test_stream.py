@@ -0,0 +1,208 @@
+import asyncio
+import json
+from api.server import ConnectionManager
+from api.stream import StateStream, apply_delta
+
+def _state(step):
+    workers = [
+        {"id": f"p_{i}", "x": 10.0 * i + (step if i == 1 else 0), "y": 50.0, "zone": "Safe", "lastSeen": f"t{step}"}
+        for i in range(3 if step < 3 else 2)
+    ]
+    incidents = [{"id": f"INC-{n}", "acknowledged": False} for n in range(step // 2, -1, -1)]
+    return {
+        "workers": workers,
+        "incidents": incidents,
+        "timeline": [{"id": f"evt_{n}"} for n in range(step)],
+        "stats": {"fps": 5, "active_workers": len(workers)},
+        "camera_id": "cam_1",
+    }
+
+def test_deltas_reconstruct_every_state():
+    stream = StateStream(keyframe_interval=4)
+    client = {}
+    kinds = []
+    for step in range(8):
+        message, is_keyframe = stream.advance(_state(step))
+        assert message["seq"] == step + 1
+        kinds.append(message["type"])
+        client = apply_delta(client, json.loads(json.dumps(message)))
+        assert client == _state(step)
+    assert kinds == ["keyframe", "delta", "delta", "delta", "keyframe", "delta", "delta", "delta"]
+
+    # Unchanged workers are not resent; changed ones only carry the changed fields
+    stream = StateStream()
+    stream.advance(_state(4))
+    delta, _ = stream.advance(_state(5))
+    assert "stats" not in delta and "incidents" not in delta
+    assert delta["timeline"] == {"upsert": [{"id": "evt_4"}]}
+    assert delta["workers"]["upsert"][0] == {"id": "p_0", "lastSeen": "t5"}
+    assert delta["workers"]["upsert"][1] == {"id": "p_1", "x": 15.0, "lastSeen": "t5"}
+
+class _FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+def test_delta_clients_get_keyframes_on_join_and_resync():
+    manager = ConnectionManager()
+    legacy, delta = _FakeSocket(), _FakeSocket()
+
+    async def scenario():
+        await manager.connect(legacy, "cam_1")
+        await manager.connect(delta, "cam_1", protocol="delta")
+        for step in range(3):
+            await manager.broadcast(_state(step))
+        await manager.drain()
+        manager.request_keyframe(delta)
+        await manager.broadcast(_state(3))
+        await manager.drain()
+
+    asyncio.run(scenario())
+    assert legacy.sent == [_state(step) for step in range(4)]
+    assert [m["type"] for m in delta.sent] == ["keyframe", "delta", "delta", "keyframe"]
+    assert [m["seq"] for m in delta.sent] == [1, 2, 3, 4]
+
+class _StuckSocket(_FakeSocket):
+    async def send_text(self, text):
+        await asyncio.sleep(3600)
+
+class _DeadSocket(_FakeSocket):
+    async def send_text(self, text):
+        raise RuntimeError("connection reset")
+
+    async def close(self):
+        pass
+
+def test_slow_and_dead_clients_do_not_block_the_broadcast():
+    import config
+    manager = ConnectionManager()
+    healthy, stuck, dead = _FakeSocket(), _StuckSocket(), _DeadSocket()
+
+    async def scenario():
+        for socket in (healthy, stuck, dead):
+            await manager.connect(socket, "cam_1")
+        for step in range(config.WS_CLIENT_QUEUE_SIZE + 4):
+            await manager.broadcast(_state(step % 3))
+            await asyncio.sleep(0)
+        await manager.channels[healthy].drain()
+        return manager.stats()
+
+    stats = asyncio.run(scenario())
+    assert len(healthy.sent) == config.WS_CLIENT_QUEUE_SIZE + 4
+    assert dead not in manager.active_connections
+    assert stats["evictions"] == {"error": 1}
+    assert stats["clients"] == 2
+    # The stuck client's queue overflowed and was coalesced to the newest state
+    assert stats["dropped"] > 0 and stats["max_queue_depth"] < config.WS_CLIENT_QUEUE_SIZE
+
+def test_subscriptions_receive_only_their_slice():
+    from api.stream import Subscription
+    manager = ConnectionManager()
+    incidents_a, incidents_b, zone, other_camera = _FakeSocket(), _FakeSocket(), _FakeSocket(), _FakeSocket()
+    state = _state(4)
+    state["workers"][0]["zone"] = "Loading Dock"
+
+    async def scenario():
+        await manager.connect(incidents_a, subscription=Subscription.parse("cam_1", topics="incidents"))
+        await manager.connect(incidents_b, protocol="delta", subscription=Subscription.parse("cam_1", topics=["incidents"]))
+        await manager.connect(zone, subscription=Subscription.parse("cam_1", zone="Loading Dock", topics="workers,bogus"))
+        await manager.connect(other_camera, "cam_2")
+        await manager.broadcast(state)
+        await manager.broadcast(state)
+        await manager.drain()
+
+    asyncio.run(scenario())
+    assert incidents_a.sent == [{"incidents": state["incidents"], "camera_id": "cam_1"}] * 2
+    # Unchanged delta views are not sent again
+    assert [m["type"] for m in incidents_b.sent] == ["keyframe"]
+    assert [w["id"] for w in zone.sent[0]["workers"]] == ["p_0"]
+    assert set(zone.sent[0]) == {"workers", "camera_id"}
+    assert other_camera.sent == []
+
+def test_binary_encoding_is_negotiated_and_compact():
+    import pytest
+    msgpack = pytest.importorskip("msgpack")
+    manager = ConnectionManager()
+    binary, fallback = _FakeSocket(), _FakeSocket()
+    state = _state(2)
+    state["workers"][0].update({"x": 12.3456, "confidence": 0.87654, "lastSeen": "2026-01-01T12:00:00.250000"})
+
+    async def scenario():
+        await manager.connect(binary, "cam_1", encoding="msgpack")
+        await manager.connect(fallback, "cam_1", encoding="yaml")
+        await manager.broadcast(state)
+        await manager.drain()
+
+    asyncio.run(scenario())
+    assert binary.sent[0] == {"type": "hello", "v": 1, "encoding": "msgpack"}
+    assert fallback.sent == [{"type": "hello", "v": 1, "encoding": "json"}, state]
+    assert len(binary.sent[1]) < len(json.dumps(state))
+
+    decoded = msgpack.unpackb(binary.sent[1])
+    worker = decoded["W"][0]
+    assert worker["i"] == "p_0" and worker["x"] == 1235 and worker["c"] == 877
+    assert worker["t"] % 1000 == 250
+    assert decoded["cam"] == "cam_1"
+
+class StreamClient:
+    """Follows the delta protocol the way a client subscribed to "all" cameras has to: per camera_id."""
+    def __init__(self):
+        self.states = {}
+        self.seqs = {}
+
+    def receive(self, message):
+        # False on a gap, after which a real client sends a resync for that camera
+        camera_id = message.get("camera_id")
+        if message["type"] == "delta" and self.seqs.get(camera_id) != message["seq"] - 1:
+            return False
+        self.states[camera_id] = apply_delta(self.states.get(camera_id, {}), message)
+        self.seqs[camera_id] = message["seq"]
+        return True
+
+def test_all_cameras_client_follows_each_camera_stream():
+    from api.stream import Subscription
+    manager = ConnectionManager()
+    socket = _FakeSocket()
+    states = {}
+    for camera_id in ("cam_1", "cam_2"):
+        for step in range(3):
+            states[camera_id, step] = {**_state(step), "camera_id": camera_id}
+
+    async def scenario():
+        await manager.connect(socket, protocol="delta", subscription=Subscription.parse("all"))
+        for step in range(2):
+            await manager.broadcast(states["cam_1", step])
+            await manager.broadcast(states["cam_2", step])
+        await manager.drain()
+        # A gap on cam_2 only restarts cam_2's stream
+        manager.request_keyframe(socket, "cam_2")
+        await manager.broadcast(states["cam_1", 2])
+        await manager.broadcast(states["cam_2", 2])
+        await manager.drain()
+
+    asyncio.run(scenario())
+    # Sequence numbers count per camera, and every message says which camera it belongs to
+    assert [(m["camera_id"], m["seq"], m["type"]) for m in socket.sent] == [
+        ("cam_1", 1, "keyframe"), ("cam_2", 1, "keyframe"),
+        ("cam_1", 2, "delta"), ("cam_2", 2, "delta"),
+        ("cam_1", 3, "delta"), ("cam_2", 3, "keyframe"),
+    ]
+    client = StreamClient()
+    assert all(client.receive(json.loads(json.dumps(m))) for m in socket.sent)
+    assert client.states == {"cam_1": states["cam_1", 2], "cam_2": states["cam_2", 2]}
+    assert not client.receive({"type": "delta", "seq": 5, "camera_id": "cam_1"})
+
+def test_zone_subscription_only_receives_incidents_raised_in_the_zone():
+    from api.stream import Subscription
+    state = _state(4)
+    state["incidents"][0]["zone"] = "Loading Dock"
+    view = Subscription.parse("cam_1", zone="Loading Dock", topics="incidents").view(state)
+    assert view["incidents"] == [state["incidents"][0]]
@@ -0,0 +1,45 @@
+import asyncio
+import time
+from agent.loop import AgentRunner
+from agent.supervisor import AgentSupervisor
+from agent.throttle import TokenBucket
+from api.server import ConnectionManager
+
+async def _idle_loop(self):
+    while self.running:
+        await asyncio.sleep(0.01)
+
+def test_supervisor_runs_cameras_concurrently(monkeypatch):
+    monkeypatch.setattr(AgentRunner, "_loop", _idle_loop)
+
+    async def scenario():
+        supervisor = AgentSupervisor(ConnectionManager(), pool_size=1, max_inference_fps=0)
+        await supervisor.start_camera("cam_1", "a.mp4")
+        await supervisor.start_camera("cam_2", "b.mp4")
+
+        assert supervisor.is_running("cam_1") and supervisor.is_running("cam_2")
+        # Every runner feeds the same batcher (and model pool) and budget
+        batchers = {id(r.batcher) for r in supervisor.runners.values()}
+        budgets = {id(r.inference_budget) for r in supervisor.runners.values()}
+        assert len(batchers) == 1 and len(budgets) == 1
+        assert supervisor.batcher.perception.pool is supervisor.model_pool
+
+        await supervisor.stop_camera("cam_1")
+        assert not supervisor.is_running("cam_1")
+        assert supervisor.is_running("cam_2")
+
+        await supervisor.stop_all()
+        assert supervisor.status() == {}
+
+    asyncio.run(scenario())
+
+def test_token_bucket_caps_throughput():
+    async def scenario():
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # First token is free, the remaining five need ~0.1s at 50/s
+    assert asyncio.run(scenario()) >= 0.09
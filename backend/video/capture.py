@@ -0,0 +1,311 @@
+import asyncio
+import json
+import multiprocessing
+import random
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import config
+from video.ingest import VideoIngest
+from video.shm import FrameRing, FrameTooLarge, SharedFrameReader, SharedFrameWriter
+
+FramePacket = Tuple[float, Any]
+
+class FrameQueue:
+    POLICIES = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, maxsize: int = 2, policy: str = "drop_oldest"):
+        """
+        Bounded frame queue between a capture thread and an asyncio consumer.
+        :param maxsize: Number of frames held before the overflow policy applies.
+        :param policy: 'drop_oldest' keeps the freshest frames, 'drop_newest' discards
+                       incoming frames, 'block' makes the producer wait.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown frame queue policy: {policy}")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self._items: Deque[FramePacket] = deque()
+        self._cond = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item: FramePacket, timeout: Optional[float] = None) -> bool:
+        """Add a frame. Returns False if the frame was discarded."""
+        with self._cond:
+            if self.closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.policy == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped += 1
+                elif self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                else:
+                    self._cond.wait_for(lambda: len(self._items) < self.maxsize or self.closed, timeout)
+                    if self.closed or len(self._items) >= self.maxsize:
+                        return False
+            self._items.append(item)
+            self._wake()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[FramePacket]:
+        """Blocking get for thread consumers. Returns None on timeout or close."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self.closed, timeout)
+            return self._pop()
+
+    async def get_async(self, timeout: Optional[float] = None) -> Optional[FramePacket]:
+        """Await the next frame without tying up an executor thread."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        with self._cond:
+            if self._items or self.closed:
+                return self._pop()
+            self._async_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._cond:
+            if waiter in self._async_waiters:
+                self._async_waiters.remove(waiter)
+            return self._pop()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._wake()
+
+    def detach(self, frame: Any) -> Any:
+        # Queued frames are owned by the consumer, unlike shared-memory views
+        return frame
+
+    def _pop(self) -> Optional[FramePacket]:
+        if not self._items:
+            return None
+        item = self._items.popleft()
+        # Room was made for a blocked producer
+        self._cond.notify_all()
+        return item
+
+    def _wake(self):
+        # Caller holds the condition lock
+        self._cond.notify_all()
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+        self._async_waiters.clear()
+
+class CaptureThread(threading.Thread):
+    # connecting -> streaming; failures go to reconnecting until the next frame arrives.
+    # The backoff only resets once a connection has stayed up for healthy_seconds.
+    # unhealthy: frames arrive but cannot be delivered (e.g. larger than a shared-memory slot).
+    HEALTH_STATES = ("connecting", "streaming", "reconnecting", "unhealthy", "stopped")
+
+    def __init__(
+        self,
+        source: str,
+        frames: FrameQueue,
+        fps_limit: int = 5,
+        ingest_factory: Callable[..., VideoIngest] = VideoIngest,
+        backoff_initial: float = config.INGEST_BACKOFF_INITIAL,
+        backoff_max: float = config.INGEST_BACKOFF_MAX,
+        loop_files: bool = config.INGEST_LOOP_FILES,
+        healthy_seconds: float = config.INGEST_HEALTHY_SECONDS,
+    ):
+        """
+        Reads frames from a source on a dedicated thread and pushes them into a FrameQueue,
+        so blocking capture never runs on the asyncio event loop.
+        Files that end are rewound in place; sources that fail or end are reopened with
+        exponential backoff, reset once frames have flowed for healthy_seconds.
+        """
+        super().__init__(name=f"capture-{source}", daemon=True)
+        self.source = source
+        self.frames = frames
+        self.fps_limit = fps_limit
+        self.ingest_factory = ingest_factory
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.loop_files = loop_files
+        self.healthy_seconds = healthy_seconds
+        self.ingest: Optional[VideoIngest] = None
+        self.captured = 0
+        self.rejected = 0
+        self.health = "connecting"
+        self.failures = 0
+        self.reconnects = 0
+        self.rewinds = 0
+        self.last_error: Optional[str] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def backoff(self) -> float:
+        """Delay before the next reopen, with jitter so flapping cameras don't reconnect in lockstep."""
+        delay = min(self.backoff_max, self.backoff_initial * 2 ** max(0, self.failures - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _stream(self, ingest: VideoIngest) -> bool:
+        """Push frames until the source ends. Returns False if stopped meanwhile."""
+        connected: Optional[float] = None
+        while True:
+            for packet in ingest.get_frames():
+                if self.stopped:
+                    return False
+                if connected is None:
+                    connected = time.monotonic()
+                    self.health = "streaming"
+                # A camera that drops right after connecting keeps backing off
+                if self.failures and time.monotonic() - connected >= self.healthy_seconds:
+                    self.failures = 0
+                try:
+                    self.frames.put(packet)
+                except FrameTooLarge as e:
+                    if not self.rejected:
+                        print(f"Warning ({self.source}): {e}")
+                    self.rejected += 1
+                    self.last_error = str(e)
+                    self.health = "unhealthy"
+                    continue
+                self.captured += 1
+            if self.stopped or not (self.loop_files and ingest.rewind()):
+                return not self.stopped
+            self.rewinds += 1
+
+    def run(self):
+        while not self.stopped:
+            ingest = None
+            try:
+                ingest = self.ingest = self.ingest_factory(self.source, fps_limit=self.fps_limit)
+                if not self._stream(ingest):
+                    break
+                self.last_error = "Stream ended"
+                print(f"Video ended ({self.source}). Reconnecting...")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Video Error ({self.source}): {e}")
+                traceback.print_exc()
+            finally:
+                if ingest:
+                    ingest.stop()
+            if self.stopped:
+                break
+            self.failures += 1
+            self.reconnects += 1
+            self.health = "reconnecting"
+            self._stop_event.wait(self.backoff())
+        self.health = "stopped"
+        self.frames.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Decode and pacing figures of the current ingest, plus frames lost at the queue."""
+        return {
+            "health": self.health,
+            "reconnects": self.reconnects,
+            "rewinds": self.rewinds,
+            "last_error": self.last_error,
+            **(self.ingest.stats() if self.ingest else {}),
+            "captured": self.captured,
+            "rejected": self.rejected,
+            "queue_dropped": self.frames.dropped,
+        }
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop_event.set()
+        self.frames.close()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+# Bytes reserved for the JSON status a capture process publishes to its parent
+_STATUS_BYTES = 4096
+
+def _publish_status(status, capture: CaptureThread):
+    stats = capture.stats()
+    stats["last_error"] = (stats["last_error"] or "")[:500] or None
+    data = json.dumps(stats).encode()
+    if len(data) < _STATUS_BYTES:
+        with status.get_lock():
+            status.value = data
+
+def _run_capture_process(source: str, ring_name: str, fps_limit: int, stop_event, status, publish_interval: float):
+    ring = FrameRing.attach(ring_name)
+    capture = CaptureThread(source, SharedFrameWriter(ring), fps_limit=fps_limit)
+    capture.start()
+    while not stop_event.wait(publish_interval):
+        _publish_status(status, capture)
+    capture.stop(5)
+    _publish_status(status, capture)
+    ring.close()
+
+class CaptureProcess:
+    def __init__(self, source: str, frames: SharedFrameReader, fps_limit: int = 5, publish_interval: float = 0.5):
+        """
+        Runs a CaptureThread in a separate process that writes into a shared-memory
+        FrameRing, so decoding does not compete with inference for the GIL.
+        The child publishes the thread's stats (health, reconnects, last error) as JSON
+        in a shared buffer every publish_interval seconds.
+        """
+        self.source = source
+        self.frames = frames
+        self.fps_limit = fps_limit
+        self.publish_interval = publish_interval
+        self.process: Optional[multiprocessing.Process] = None
+        self._stop_event = None
+        self._status = None
+
+    def start(self):
+        # spawn keeps the model and event loop state out of the child
+        context = multiprocessing.get_context("spawn")
+        self._stop_event = context.Event()
+        self._status = context.Array("c", _STATUS_BYTES)
+        self.process = context.Process(
+            target=_run_capture_process,
+            args=(self.source, self.frames.ring.name, self.fps_limit, self._stop_event, self._status, self.publish_interval),
+            name=f"capture-{self.source}",
+            daemon=True,
+        )
+        self.process.start()
+
+    def _published(self) -> Dict[str, Any]:
+        if self._status is None:
+            return {}
+        with self._status.get_lock():
+            data = self._status.value
+        return json.loads(data) if data else {}
+
+    @property
+    def health(self) -> str:
+        if not self.process or not self.process.is_alive():
+            return "stopped"
+        return self._published().get("health", "connecting")
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self._published().get("last_error")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._published(),
+            "health": self.health,
+            "captured": self.frames.ring.write_seq,
+            "queue_dropped": self.frames.dropped,
+        }
+
+    def stop(self, timeout: Optional[float] = None):
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self.process and self.process.is_alive():
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.frames.close()
@@ -0,0 +1,126 @@
+from typing import Optional, Union
+import cv2
+import numpy as np
+import config
+
+# PyAV is optional; without it every source is decoded by OpenCV
+try:
+    import av
+except ImportError:
+    av = None
+
+def scaled_size(width: int, height: int, max_width: int):
+    """Output size for a frame, keeping the aspect ratio. max_width <= 0 keeps the original size."""
+    if max_width <= 0 or width <= max_width:
+        return width, height
+    return max_width, max(2, round(height * max_width / width) // 2 * 2)
+
+class OpenCVDecoder:
+    def __init__(self, source: Union[str, int], max_width: int = config.DECODE_MAX_WIDTH, hw_accel: bool = config.DECODE_HW_ACCEL):
+        """
+        cv2.VideoCapture with a grab/retrieve split: grab() advances the stream,
+        only retrieve() converts the frame and downscales it to max_width.
+        """
+        self.max_width = max_width
+        self.cap = None
+        if hw_accel:
+            try:
+                self.cap = cv2.VideoCapture(source, cv2.CAP_ANY, [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+            except (cv2.error, TypeError, AttributeError):
+                # OpenCV builds without capture parameters
+                self.cap = None
+        if self.cap is None or not self.cap.isOpened():
+            self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Failed to open video source: {source}")
+
+    @property
+    def fps(self) -> float:
+        return self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    def grab(self) -> bool:
+        return self.cap.grab()
+
+    def rewind(self) -> bool:
+        """Seek back to the first frame of a file without reopening it."""
+        return bool(self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0))
+
+    def retrieve(self) -> Optional[np.ndarray]:
+        ret, frame = self.cap.retrieve()
+        if not ret:
+            return None
+        height, width = frame.shape[:2]
+        size = scaled_size(width, height, self.max_width)
+        if size != (width, height):
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return frame
+
+    def release(self):
+        self.cap.release()
+
+class PyAVDecoder:
+    def __init__(self, source: Union[str, int], max_width: int = config.DECODE_MAX_WIDTH, threads: int = config.DECODE_THREADS):
+        """
+        FFmpeg decoding through PyAV with multi-threaded decoding.
+        grab() only decodes to the native YUV frame; retrieve() scales it with swscale
+        while converting to BGR, so full-resolution BGR images are never built.
+        """
+        if av is None:
+            raise RuntimeError("PyAV is not installed")
+        if isinstance(source, int):
+            raise RuntimeError("PyAV backend does not open camera indexes")
+        options = {"rtsp_transport": "tcp"} if str(source).startswith("rtsp://") else {}
+        self.max_width = max_width
+        self.container = av.open(source, options=options)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+        if threads > 0:
+            self.stream.thread_count = threads
+        self._frames = self.container.decode(self.stream)
+        self._frame = None
+
+    @property
+    def fps(self) -> float:
+        rate = self.stream.average_rate
+        return float(rate) if rate else 0.0
+
+    def grab(self) -> bool:
+        try:
+            self._frame = next(self._frames)
+            return True
+        except (StopIteration, av.error.EOFError):
+            self._frame = None
+            return False
+
+    def rewind(self) -> bool:
+        try:
+            self.container.seek(0)
+        except av.error.FFmpegError:
+            return False
+        self._frames = self.container.decode(self.stream)
+        self._frame = None
+        return True
+
+    def retrieve(self) -> Optional[np.ndarray]:
+        if self._frame is None:
+            return None
+        width, height = scaled_size(self._frame.width, self._frame.height, self.max_width)
+        return self._frame.to_ndarray(format="bgr24", width=width, height=height)
+
+    def release(self):
+        self.container.close()
+
+Decoder = Union[OpenCVDecoder, PyAVDecoder]
+
+def open_decoder(source: Union[str, int], backend: str = config.DECODE_BACKEND, max_width: int = config.DECODE_MAX_WIDTH) -> Decoder:
+    """
+    Open a source with the configured backend.
+    'auto' prefers PyAV for files and streams when it is installed; camera indexes
+    always use OpenCV.
+    """
+    if backend not in ("opencv", "pyav", "auto"):
+        raise ValueError(f"Unknown decode backend: {backend}")
+    use_pyav = backend == "pyav" or (backend == "auto" and av is not None and not isinstance(source, int))
+    if use_pyav:
+        return PyAVDecoder(source, max_width=max_width)
+    return OpenCVDecoder(source, max_width=max_width)
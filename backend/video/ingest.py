@@ -1,59 +1,237 @@
-import cv2
+import threading
 import time
 import os
-from typing import Generator, Tuple, Union
+from typing import Any, Dict, Generator, Optional, Tuple, Union
+import config
+from video.decode import Decoder, open_decoder
+
+class StreamStalled(RuntimeError):
+    pass
+
+class LatestFrameReader(threading.Thread):
+    def __init__(self, decoder: Decoder, ingest: "VideoIngest"):
+        """
+        Grabs a live source continuously on its own thread, so the decoder's buffer never
+        backs up while the consumer is busy. A frame is only retrieved when one is
+        requested, and it is the first frame grabbed after the request.
+        The reader owns the decoder and releases it when it exits.
+        """
+        super().__init__(name=f"reader-{ingest.source}", daemon=True)
+        self.decoder = decoder
+        self.ingest = ingest
+        self.ended = False
+        self._wanted = False
+        self._frame: Optional[Tuple[float, Any]] = None
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                if not self.decoder.grab():
+                    break
+                self.ingest._record_grab()
+                with self._cond:
+                    wanted = self._wanted
+                if not wanted:
+                    continue
+                started = time.monotonic()
+                frame = self.decoder.retrieve()
+                self.ingest._record_decode(time.monotonic() - started)
+                with self._cond:
+                    self._frame = (time.time(), frame) if frame is not None else None
+                    self._wanted = False
+                    self._cond.notify_all()
+        finally:
+            self.decoder.release()
+            with self._cond:
+                self.ended = True
+                self._cond.notify_all()
+
+    def read(self, timeout: Optional[float] = None) -> Optional[Tuple[float, Any]]:
+        """Wait for the next grabbed frame. Returns None on timeout or when the stream ended."""
+        with self._cond:
+            self._wanted = True
+            self._frame = None
+            self._cond.wait_for(lambda: self._frame is not None or self.ended, timeout)
+            packet, self._frame = self._frame, None
+            self._wanted = False
+            return packet
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
 
 class VideoIngest:
-    def __init__(self, source: Union[str, int], fps_limit: int = 5):
+    def __init__(
+        self,
+        source: Union[str, int],
+        fps_limit: int = 5,
+        backend: str = config.DECODE_BACKEND,
+        max_width: int = config.DECODE_MAX_WIDTH,
+        latest_frame: bool = config.INGEST_LATEST_FRAME,
+        stall_seconds: float = config.INGEST_STALL_SECONDS,
+    ):
         """
         Initialize video ingestion.
         :param source: Path to video file, RTSP URL, or camera index (int).
         :param fps_limit: Maximum frames per second to yield.
+        :param backend: Decoder backend (see video/decode.py).
+        :param max_width: Frames are downscaled to this width while decoding (0 = full size).
+        :param latest_frame: For live sources, always yield the newest frame and drop
+                             the ones in between (see LatestFrameReader).
+        :param stall_seconds: Raise StreamStalled when a live source delivers nothing for this long.
         """
         self.source = source
         self.fps_limit = fps_limit
-        self.cap = None
+        self.backend = backend
+        self.max_width = max_width
+        self.latest_frame = latest_frame
+        self.stall_seconds = stall_seconds
+        self.decoder: Optional[Decoder] = None
+        self.reader: Optional[LatestFrameReader] = None
         self.frame_interval = 1.0 / fps_limit if fps_limit > 0 else 0
-        self.last_frame_time = 0
+        self._stopped = False
+        # Counters and moving averages for stats()
+        self.grabbed = 0
+        self.yielded = 0
+        self._last_grab: Optional[float] = None
+        self._grab_interval = 0.0
+        self._last_yield: Optional[float] = None
+        self._yield_interval = 0.0
+        self._decode_seconds = 0.0
+
+    @property
+    def is_file(self) -> bool:
+        return isinstance(self.source, str) and os.path.exists(self.source)
 
     def start(self):
         # Check if source is an integer (webcam index) passed as string
         if isinstance(self.source, str) and self.source.isdigit():
              self.source = int(self.source)
 
-        if isinstance(self.source, str):
-             if not os.path.exists(self.source) and not self.source.startswith(('rtsp://', 'http://', 'https://')):
-                 # If file doesn't exist and not a URL, try treating as int (though likely caught above)
-                 pass
-        
-        self.cap = cv2.VideoCapture(self.source)
-        
-        if not self.cap.isOpened():
-            raise RuntimeError(f"Failed to open video source: {self.source}")
+        self.decoder = open_decoder(self.source, backend=self.backend, max_width=self.max_width)
+
+    def rewind(self) -> bool:
+        """Restart a file from its first frame, keeping the open decoder. False for live sources."""
+        if not self.is_file or not self.decoder or self.reader:
+            return False
+        return self.decoder.rewind()
 
     def get_frames(self) -> Generator[Tuple[float, any], None, None]:
-        if not self.cap:
+        """
+        Yield (timestamp, frame) at up to fps_limit, on a monotonic schedule.
+        Skipped frames are grabbed but never retrieved. Files are sampled by media time
+        and paced to real time; live sources yield the newest frame once it is due.
+        """
+        if not self.decoder:
             self.start()
-            
-        while self.cap.isOpened():
-            now = time.time()
-            
-            # Simple FPS limiting
-            if self.fps_limit > 0 and (now - self.last_frame_time) < self.frame_interval:
-                # Sleep a tiny bit to prevent CPU spinning, but not too much to drift
-                time.sleep(0.01)
+
+        source_fps = self.decoder.fps if self.is_file else 0.0
+        if source_fps > 0:
+            frames = self._file_frames(source_fps)
+        elif self.latest_frame:
+            frames = self._latest_frames()
+        else:
+            frames = self._sequential_frames()
+        for packet in frames:
+            now = time.monotonic()
+            if self._last_yield is not None:
+                self._yield_interval = _ema(self._yield_interval, now - self._last_yield)
+            self._last_yield = now
+            self.yielded += 1
+            yield packet
+
+    def _wait_until(self, due: float) -> float:
+        """Sleep until a monotonic deadline and return the next one. Missed slots are skipped, not caught up."""
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return max(due + self.frame_interval, time.monotonic())
+
+    def _retrieve(self) -> Optional[Any]:
+        started = time.monotonic()
+        frame = self.decoder.retrieve()
+        self._record_decode(time.monotonic() - started)
+        return frame
+
+    def _file_frames(self, source_fps: float):
+        # Source frames per yielded frame
+        step = source_fps * self.frame_interval
+        index, next_index = 0, 0.0
+        due = time.monotonic()
+        while self.decoder.grab():
+            self._record_grab()
+            selected = not step or index >= next_index
+            index += 1
+            if not selected:
+                continue
+            next_index += step
+            if self.frame_interval:
+                due = self._wait_until(due)
+            frame = self._retrieve()
+            if frame is None:
+                break
+            yield time.time(), frame
+
+    def _sequential_frames(self):
+        due = time.monotonic()
+        while self.decoder.grab():
+            self._record_grab()
+            if self.frame_interval and time.monotonic() < due:
                 continue
-                
-            ret, frame = self.cap.read()
-            if not ret:
-                # If file, maybe loop? For now, just stop.
-                # To loop: self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                # But typically we want to stop.
+            frame = self._retrieve()
+            if frame is None:
                 break
-                
-            self.last_frame_time = now
-            yield now, frame
-            
+            due = max(due + self.frame_interval, time.monotonic())
+            yield time.time(), frame
+
+    def _latest_frames(self):
+        self.reader = LatestFrameReader(self.decoder, self)
+        self.reader.start()
+        due = last_frame = time.monotonic()
+        while not self._stopped:
+            if self.frame_interval:
+                due = self._wait_until(due)
+            packet = self.reader.read(timeout=1.0)
+            if packet is None:
+                if self.reader.ended:
+                    break
+                if self.stall_seconds and time.monotonic() - last_frame > self.stall_seconds:
+                    raise StreamStalled(f"No frames for {self.stall_seconds:g}s")
+                continue
+            last_frame = time.monotonic()
+            yield packet
+
+    def _record_grab(self):
+        now = time.monotonic()
+        if self._last_grab is not None:
+            self._grab_interval = _ema(self._grab_interval, now - self._last_grab)
+        self._last_grab = now
+        self.grabbed += 1
+
+    def _record_decode(self, seconds: float):
+        self._decode_seconds = _ema(self._decode_seconds, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capture_fps": round(1 / self._grab_interval, 2) if self._grab_interval else 0.0,
+            "output_fps": round(1 / self._yield_interval, 2) if self._yield_interval else 0.0,
+            "decode_ms": round(self._decode_seconds * 1000, 2),
+            "grabbed": self.grabbed,
+            "yielded": self.yielded,
+            # Grabbed but never retrieved: skipped by the rate limit or superseded by a newer frame
+            "dropped": max(0, self.grabbed - self.yielded),
+        }
+
     def stop(self):
-        if self.cap:
-            self.cap.release()
+        self._stopped = True
+        if self.reader:
+            # The reader releases the decoder once its current grab returns
+            self.reader.stop(timeout=2)
+        elif self.decoder:
+            self.decoder.release()
+
+def _ema(average: float, sample: float, weight: float = 0.1) -> float:
+    return sample if average == 0 else average + weight * (sample - average)
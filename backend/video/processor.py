@@ -1,25 +1,218 @@
 import cv2
 import json
+import multiprocessing
 import os
+import queue
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple
+import config
 from agent.perception import PerceptionEngine, Worker
-from video.ingest import VideoIngest
+from agent.zones import zone_engine
+from video.sampler import FrameSampler, create_sampler, hold_frame, interpolate_frame
+
+# --- Chunk workers (run in the process pool) ---
+
+_worker_perception: Optional[PerceptionEngine] = None
+_worker_progress = None
+
+def _init_chunk_worker(model_path: str, progress, threads: int):
+    global _worker_perception, _worker_progress
+    # Each process gets its own model and a share of the cores
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_perception = PerceptionEngine(model_path)
+    _worker_progress = progress
+
+def track_range(
+    perception: PerceptionEngine,
+    file_path: str,
+    camera_id: str,
+    start: int,
+    end: Optional[int],
+    warmup: int,
+    fps: float,
+    sampler: FrameSampler,
+    report: Optional[Callable[[int], None]] = None,
+    emit: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[int, Dict[str, List[float]]]]:
+    """
+    Track frames [start - warmup, end) of a video with a fresh tracker.
+    Frames the sampler skips are filled in by interpolation. Warm-up frames are
+    only returned as boxes, for stitching with the previous chunk.
+    :param report: Called with the number of frames read so far.
+    :param emit: Receives each frame record in order instead of the returned list.
+                 Records must not be modified, as they are still used for interpolation.
+    """
+    first = max(0, start - warmup)
+    cap = cv2.VideoCapture(file_path)
+    if first:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    frames, overlap = [], {}
+    emit = emit or frames.append
+    skipped: List[int] = []
+    previous: Optional[Dict[str, Any]] = None
+    # Interpolated workers get the zone at their interpolated position
+    zones = zone_engine.zone_map(camera_id)
+    index = first
+    try:
+        while end is None or index < end:
+            # Warm-up frames and the first and last frame of the range are always analyzed
+            forced = index <= start or (end is not None and index == end - 1)
+            if not forced and not sampler.needs_frame and not sampler.should_analyze(index):
+                # Index-based skips only advance the stream, without decoding
+                if not cap.grab():
+                    break
+                skipped.append(index)
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                analyze = sampler.should_analyze(index, frame) if sampler.needs_frame else True
+                if not (analyze or forced):
+                    skipped.append(index)
+                else:
+                    detections = perception.detect(frame, camera_id)
+                    boxes = dict(zip(detections.worker_ids(), detections.xyxy.tolist()))
+                    if index < start:
+                        overlap[index] = boxes
+                    else:
+                        record = {
+                            "frame": index,
+                            "timestamp": index / fps if fps > 0 else 0,
+                            "workers": detections.to_dicts(),
+                            "boxes": boxes,
+                        }
+                        for i in skipped:
+                            emit(interpolate_frame(previous, record, i, fps, zones))
+                        emit(record)
+                        previous, skipped = record, []
+            index += 1
+            if report and index % 10 == 0:
+                report(index - first)
+    finally:
+        cap.release()
+        perception.reset_camera(camera_id)
+    if previous is not None:
+        # Frames after the last analyzed one keep its state
+        for i in skipped:
+            emit(hold_frame(previous, i, fps))
+    if report:
+        report(index - first)
+    return frames, overlap
+
+def _process_chunk(file_path: str, index: int, start: int, end: Optional[int], warmup: int, fps: float, sampler: FrameSampler) -> Dict[str, Any]:
+    report = (lambda count: _worker_progress.put((index, count))) if _worker_progress is not None else None
+    frames, overlap = track_range(_worker_perception, file_path, f"chunk-{index}", start, end, warmup, fps, sampler, report)
+    return {"index": index, "frames": frames, "overlap": overlap}
+
+# --- Stitching ---
+
+def _iou(a: List[float], b: List[float]) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+class ChunkStitcher:
+    def __init__(self, min_iou: float = config.OFFLINE_STITCH_IOU, keep_frames: int = 0):
+        """
+        Merges chunk results, added in index order, into one frame sequence with global worker ids.
+        A track in a chunk keeps the id of the previous chunk's track whose boxes it overlaps
+        most over the warm-up frames; unmatched tracks get new ids.
+        :param keep_frames: Boxes retained for matching the next chunk (0 = all). Set it to the
+                            chunk overlap to keep memory flat on long videos.
+        """
+        self.min_iou = min_iou
+        self.keep_frames = keep_frames
+        # Boxes of the already merged frames, by frame index, with global ids
+        self.global_boxes: Dict[int, Dict[str, List[float]]] = {}
+        self.next_id = 1
+
+    def add(self, chunk: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Yield the chunk's frames with global ids. Consume it fully before adding the next chunk."""
+        votes: Counter = Counter()
+        for frame_index, boxes in chunk["overlap"].items():
+            previous = self.global_boxes.get(frame_index, {})
+            for local_id, box in boxes.items():
+                best = max(previous.items(), key=lambda item: _iou(box, item[1]), default=None)
+                if best is not None and _iou(box, best[1]) >= self.min_iou:
+                    votes[(local_id, best[0])] += 1
+
+        mapping: Dict[str, str] = {}
+        taken = set()
+        for (local_id, global_id), _ in votes.most_common():
+            if local_id not in mapping and global_id not in taken:
+                mapping[local_id] = global_id
+                taken.add(global_id)
+
+        last = None
+        for frame in chunk["frames"]:
+            for worker in frame["workers"]:
+                local_id = worker["id"]
+                if local_id not in mapping:
+                    mapping[local_id] = f"p_{self.next_id}"
+                    self.next_id += 1
+                worker["id"] = mapping[local_id]
+            last = frame["frame"]
+            self.global_boxes[last] = {mapping[k]: v for k, v in frame.pop("boxes").items()}
+            yield frame
+
+        if self.keep_frames and last is not None:
+            for frame_index in [i for i in self.global_boxes if i <= last - self.keep_frames]:
+                del self.global_boxes[frame_index]
+
+def stitch_chunks(chunks: List[Dict[str, Any]], min_iou: float = config.OFFLINE_STITCH_IOU) -> List[Dict[str, Any]]:
+    """Merge chunk results (ordered by index) into one frame list with global worker ids."""
+    stitcher = ChunkStitcher(min_iou)
+    return [frame for chunk in chunks for frame in stitcher.add(chunk)]
 
 class VideoProcessor:
-    def __init__(self, model_path: str = 'yolov8n.pt'):
-        self.perception = PerceptionEngine(model_path)
+    def __init__(
+        self,
+        model_path: str = config.MODEL_PATH,
+        workers: int = config.OFFLINE_WORKERS,
+        chunk_seconds: float = config.OFFLINE_CHUNK_SECONDS,
+        overlap_frames: int = config.OFFLINE_CHUNK_OVERLAP_FRAMES,
+        sampling: str = config.OFFLINE_SAMPLING,
+    ):
+        """
+        Offline analysis of uploaded videos.
+        With more than one worker, long videos are split into time ranges that are
+        tracked in parallel processes (one model each) and stitched back together.
+        :param workers: Process count; 0 uses half of the CPU cores.
+        :param overlap_frames: Frames each chunk re-reads before its start to match track ids.
+        :param sampling: Which frames go through detection (see video/sampler.py).
+        """
+        self.model_path = model_path
+        self.workers = workers if workers > 0 else max(1, (os.cpu_count() or 2) // 2)
+        self.chunk_seconds = chunk_seconds
+        self.overlap_frames = max(1, overlap_frames)
+        self.sampling = sampling
+        self._perception: Optional[PerceptionEngine] = None
+
+    @property
+    def perception(self) -> PerceptionEngine:
+        # Only the sequential path loads a model in this process
+        if self._perception is None:
+            self._perception = PerceptionEngine(self.model_path)
+        return self._perception
 
-    def process_video(self, file_path: str, progress_callback=None) -> Dict[str, Any]:
+    def process_video(self, file_path: str, progress_callback=None, sink: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Process a video file and return detection metadata.
+        :param sink: Receives each frame record in order as soon as it is final. The result
+                     then holds only the metadata, so long videos are never held in memory.
         """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Video file not found: {file_path}")
 
-        # Use VideoIngest with fps_limit=0 for maximum speed
-        ingest = VideoIngest(file_path, fps_limit=0)
-        
         # Get video properties for duration calculation
         cap = cv2.VideoCapture(file_path)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -27,46 +220,93 @@ class VideoProcessor:
         duration = total_frames / fps if fps > 0 else 0
         cap.release()
 
-        frames_data = []
-        frame_count = 0
-        
-        ingest.start()
-        video_gen = ingest.get_frames()
-
-        try:
-            for timestamp, frame in video_gen:
-                # Detect workers
-                workers = self.perception.detect(frame)
-                
-                # Convert workers to dicts
-                workers_data = [w.model_dump() for w in workers]
-                
-                # Calculate current time in video
-                # timestamp from ingest is strictly system time based which isn't right for batch processing
-                # We should calculate based on frame count
-                current_time = frame_count / fps if fps > 0 else 0
-                
-                frames_data.append({
-                    "frame": frame_count,
-                    "timestamp": current_time,
-                    "workers": workers_data
-                })
-                
-                frame_count += 1
-                
-                if progress_callback:
-                    progress = (frame_count / total_frames) * 100
-                    progress_callback(progress)
-                    
-        finally:
-            ingest.stop()
-
-        return {
-            "metadata": {
-                "duration": duration,
-                "total_frames": total_frames,
-                "fps": fps,
-                "processed_at": datetime.now().isoformat()
-            },
-            "frames": frames_data
+        frames_data: List[Dict[str, Any]] = []
+        output = sink or frames_data.append
+        analyzed = 0
+
+        def emit(frame: Dict[str, Any]):
+            nonlocal analyzed
+            if not frame.get("interpolated"):
+                analyzed += 1
+            output(frame)
+
+        ranges = self.chunk_ranges(total_frames, fps)
+        if self.workers > 1 and len(ranges) > 1:
+            self._process_chunked(file_path, ranges, fps, total_frames, emit, progress_callback)
+        else:
+            self._process_sequential(file_path, fps, total_frames, emit, progress_callback)
+            ranges = [(0, None)]
+
+        metadata = {
+            "duration": duration,
+            "total_frames": total_frames,
+            "fps": fps,
+            "chunks": len(ranges),
+            "sampling": self.sampling,
+            "analyzed_frames": analyzed,
+            "processed_at": datetime.now().isoformat()
         }
+        if sink:
+            return {"metadata": metadata}
+        return {"metadata": metadata, "frames": frames_data}
+
+    def chunk_ranges(self, total_frames: int, fps: float) -> List[Tuple[int, Optional[int]]]:
+        """Frame ranges [start, end) of the chunks; the last one runs to the end of the file."""
+        chunk_frames = int(self.chunk_seconds * fps) if fps > 0 else 0
+        if chunk_frames <= self.overlap_frames or total_frames < 2 * chunk_frames:
+            return [(0, None)]
+        starts = list(range(0, total_frames, chunk_frames))
+        # A short tail is folded into the previous chunk
+        if total_frames - starts[-1] < chunk_frames // 2:
+            starts.pop()
+        return [(start, nxt) for start, nxt in zip(starts, starts[1:])] + [(starts[-1], None)]
+
+    def _process_sequential(self, file_path: str, fps: float, total_frames: int, emit, progress_callback=None):
+        report = None
+        if progress_callback and total_frames:
+            report = lambda count: progress_callback(min(100.0, count / total_frames * 100))
+        # Records are still read for interpolation, so boxes are left out of a copy
+        strip = lambda frame: emit({key: value for key, value in frame.items() if key != "boxes"})
+        track_range(self.perception, file_path, None, 0, None, 0, fps, create_sampler(self.sampling, fps), report, strip)
+
+    def _process_chunked(self, file_path: str, ranges, fps: float, total_frames: int, emit, progress_callback=None):
+        # spawn keeps CUDA/torch state out of forked children
+        context = multiprocessing.get_context("spawn")
+        progress = context.Queue()
+        workers = min(self.workers, len(ranges))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        done: Dict[int, int] = {}
+        # Finished chunks waiting for their predecessors; each is stitched and released in order
+        results: Dict[int, Dict[str, Any]] = {}
+        next_chunk = 0
+        stitcher = ChunkStitcher(keep_frames=self.overlap_frames)
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_chunk_worker,
+            initargs=(self.model_path, progress, threads),
+        ) as pool:
+            pending = {
+                pool.submit(_process_chunk, file_path, i, start, end, 0 if i == 0 else self.overlap_frames, fps, create_sampler(self.sampling, fps))
+                for i, (start, end) in enumerate(ranges)
+            }
+            while pending:
+                finished, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    chunk = future.result()
+                    results[chunk["index"]] = chunk
+                while next_chunk in results:
+                    for frame in stitcher.add(results.pop(next_chunk)):
+                        emit(frame)
+                    next_chunk += 1
+                # Merge per-chunk frame counts into one overall percentage
+                while True:
+                    try:
+                        index, count = progress.get_nowait()
+                    except queue.Empty:
+                        break
+                    done[index] = max(done.get(index, 0), count)
+                if progress_callback and total_frames:
+                    warmup = self.overlap_frames * (len(ranges) - 1)
+                    progress_callback(min(99.9, 100 * sum(done.values()) / (total_frames + warmup)))
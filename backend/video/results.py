@@ -0,0 +1,109 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import config
+
+class ResultWriter:
+    def __init__(self, frames_path: str, meta_path: str, index_interval: int):
+        """
+        Appends frame records to an NDJSON file as they are produced.
+        The byte offset of every index_interval-th frame is kept, and written with the
+        metadata on close, so pages can be read by seeking instead of parsing the file.
+        """
+        self.frames_path = frames_path
+        self.meta_path = meta_path
+        self.index_interval = index_interval
+        self.count = 0
+        self.offsets: List[int] = []
+        self._file = open(frames_path, "wb")
+
+    def write(self, frame: Dict[str, Any]):
+        if self.count % self.index_interval == 0:
+            self.offsets.append(self._file.tell())
+        self._file.write(json.dumps(frame, separators=(",", ":")).encode() + b"\n")
+        self.count += 1
+
+    def close(self, metadata: Dict[str, Any]):
+        self._file.close()
+        meta = {
+            "metadata": metadata,
+            "frames": self.count,
+            "index_interval": self.index_interval,
+            "offsets": self.offsets,
+        }
+        # The metadata file marks the results as complete, so it appears atomically
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self.frames_path):
+            os.remove(self.frames_path)
+
+class ResultStore:
+    def __init__(self, directory: str = config.ANALYSIS_RESULTS_DIR, index_interval: int = config.ANALYSIS_RESULTS_INDEX_INTERVAL):
+        """On-disk results of offline analysis tasks: <task>.ndjson frames plus <task>.meta.json."""
+        self.directory = directory
+        self.index_interval = max(1, index_interval)
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, task_id: str) -> Tuple[str, str]:
+        # Task ids are generated server-side; basename keeps them inside the directory regardless
+        name = os.path.basename(task_id)
+        return os.path.join(self.directory, f"{name}.ndjson"), os.path.join(self.directory, f"{name}.meta.json")
+
+    def writer(self, task_id: str) -> ResultWriter:
+        frames_path, meta_path = self._paths(task_id)
+        return ResultWriter(frames_path, meta_path, self.index_interval)
+
+    def _meta(self, task_id: str) -> Optional[Dict[str, Any]]:
+        _, meta_path = self._paths(task_id)
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def metadata(self, task_id: str) -> Optional[Dict[str, Any]]:
+        meta = self._meta(task_id)
+        return meta["metadata"] if meta else None
+
+    def read_frames(self, task_id: str, offset: int = 0, limit: int = config.ANALYSIS_PAGE_SIZE) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Frames [offset, offset + limit) of a finished task and the total frame count.
+        Returns None if the task has no complete results.
+        """
+        meta = self._meta(task_id)
+        if meta is None:
+            return None
+        total = meta["frames"]
+        offset = max(0, offset)
+        if offset >= total or limit <= 0:
+            return total, []
+        block, skip = divmod(offset, meta["index_interval"])
+        frames_path, _ = self._paths(task_id)
+        frames = []
+        with open(frames_path, "rb") as f:
+            f.seek(meta["offsets"][block])
+            for _ in range(skip):
+                f.readline()
+            for _ in range(min(limit, total - offset)):
+                frames.append(json.loads(f.readline()))
+        return total, frames
+
+    def iter_chunks(self, task_id: str, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """Raw NDJSON of a task in chunks, for streaming responses."""
+        frames_path, _ = self._paths(task_id)
+        with open(frames_path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def delete(self, task_id: str):
+        for path in self._paths(task_id):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,145 @@
+from typing import Any, Dict, List, Optional
+import cv2
+import numpy as np
+import config
+from agent.zones import ZoneMap, zone_engine
+
+class FrameSampler:
+    """
+    Decides which frames of an offline job go through detection.
+    Samplers with needs_frame = False decide from the index alone, so skipped
+    frames can be grabbed without being decoded.
+    """
+    needs_frame = False
+
+    def should_analyze(self, index: int, frame: Optional[np.ndarray] = None) -> bool:
+        return True
+
+class StrideSampler(FrameSampler):
+    def __init__(self, stride: int = config.OFFLINE_STRIDE):
+        # Global frame indexes keep chunks of a parallel job on the same grid
+        self.stride = max(1, stride)
+
+    def should_analyze(self, index: int, frame: Optional[np.ndarray] = None) -> bool:
+        return index % self.stride == 0
+
+class FpsSampler(StrideSampler):
+    def __init__(self, source_fps: float, target_fps: float = config.OFFLINE_ANALYSIS_FPS):
+        """Analyze about target_fps frames per second of video."""
+        super().__init__(round(source_fps / target_fps) if source_fps > 0 and target_fps > 0 else 1)
+
+class MotionSampler(FrameSampler):
+    needs_frame = True
+
+    def __init__(
+        self,
+        threshold: float = config.OFFLINE_MOTION_THRESHOLD,
+        max_skip: int = config.OFFLINE_MAX_SKIP,
+        method: str = config.OFFLINE_MOTION_METHOD,
+        size: int = 64,
+    ):
+        """
+        Skips frames that look like the last analyzed one.
+        :param threshold: Motion score that triggers analysis. For 'diff' the mean absolute
+                          difference of downscaled grayscale frames (0-255); for 'histogram'
+                          the Bhattacharyya distance of their histograms (0-1).
+        :param max_skip: Analyze at least every max_skip + 1 frames.
+        """
+        if method not in ("diff", "histogram"):
+            raise ValueError(f"Unknown motion method: {method}")
+        self.threshold = threshold
+        self.max_skip = max(0, max_skip)
+        self.method = method
+        self.size = size
+        self._reference: Optional[np.ndarray] = None
+        self._last_index: Optional[int] = None
+
+    def _signature(self, frame: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        height = max(1, self.size * gray.shape[0] // max(1, gray.shape[1]))
+        small = cv2.resize(gray, (self.size, height), interpolation=cv2.INTER_AREA)
+        if self.method == "histogram":
+            return cv2.calcHist([small], [0], None, [32], [0, 256])
+        return small
+
+    def score(self, signature: np.ndarray) -> float:
+        if self.method == "histogram":
+            return float(cv2.compareHist(self._reference, signature, cv2.HISTCMP_BHATTACHARYYA))
+        return float(cv2.absdiff(self._reference, signature).mean())
+
+    def should_analyze(self, index: int, frame: Optional[np.ndarray] = None) -> bool:
+        signature = self._signature(frame)
+        analyze = (
+            self._reference is None
+            or index - self._last_index > self.max_skip
+            or self.score(signature) >= self.threshold
+        )
+        if analyze:
+            self._reference, self._last_index = signature, index
+        return analyze
+
+def create_sampler(mode: str = config.OFFLINE_SAMPLING, source_fps: float = 0.0) -> FrameSampler:
+    if mode == "all":
+        return FrameSampler()
+    if mode == "stride":
+        return StrideSampler()
+    if mode == "fps":
+        return FpsSampler(source_fps)
+    if mode == "motion":
+        return MotionSampler()
+    raise ValueError(f"Unknown sampling mode: {mode}")
+
+def _lerp(a: List[float], b: List[float], t: float) -> List[float]:
+    return [va + (vb - va) * t for va, vb in zip(a, b)]
+
+def hold_frame(last: Dict[str, Any], index: int, fps: float) -> Dict[str, Any]:
+    """Frame record for a skipped frame after the last analyzed one."""
+    return {
+        "frame": index,
+        "timestamp": index / fps if fps > 0 else 0,
+        "workers": [dict(w) for w in last["workers"]],
+        "boxes": dict(last["boxes"]),
+        "interpolated": True,
+    }
+
+def interpolate_frame(before: Dict[str, Any], after: Dict[str, Any], index: int, fps: float, zones: Optional[ZoneMap] = None) -> Dict[str, Any]:
+    """
+    Frame record for a skipped frame between two analyzed ones.
+    Workers seen in both get linearly interpolated positions and boxes, and the zone at
+    that position; workers seen in only one are taken from it if it is the nearer frame.
+    :param zones: Zone map of the video's camera; defaults to that of the default camera.
+    """
+    t = (index - before["frame"]) / (after["frame"] - before["frame"])
+    nearer = before if t <= 0.5 else after
+    after_workers = {w["id"]: w for w in after["workers"]}
+    workers, boxes = [], {}
+    moved: List[int] = []
+    for worker in before["workers"]:
+        other = after_workers.get(worker["id"])
+        if other is None:
+            if nearer is before:
+                workers.append(dict(worker))
+                boxes[worker["id"]] = before["boxes"][worker["id"]]
+            continue
+        x, y = _lerp([worker["x"], worker["y"]], [other["x"], other["y"]], t)
+        moved.append(len(workers))
+        workers.append({**(worker if nearer is before else other), "x": x, "y": y})
+        boxes[worker["id"]] = _lerp(before["boxes"][worker["id"]], after["boxes"][worker["id"]], t)
+    if nearer is after:
+        seen = {w["id"] for w in before["workers"]}
+        for worker in after["workers"]:
+            if worker["id"] not in seen:
+                workers.append(dict(worker))
+                boxes[worker["id"]] = after["boxes"][worker["id"]]
+    if moved:
+        zones = zones or zone_engine.zone_map(None)
+        codes = zones.lookup(np.array([[workers[i]["x"], workers[i]["y"]] for i in moved]))
+        for i, code in zip(moved, codes.tolist()):
+            workers[i]["zone"] = zones.names[code]
+    return {
+        "frame": index,
+        "timestamp": index / fps if fps > 0 else 0,
+        "workers": workers,
+        "boxes": boxes,
+        "interpolated": True,
+    }
@@ -0,0 +1,202 @@
+import asyncio
+from multiprocessing import shared_memory
+from typing import Any, Optional, Tuple
+import numpy as np
+
+# Header fields (int64)
+_SLOTS, _SLOT_BYTES, _WRITE_SEQ, _CLOSED, _OVERSIZED = range(5)
+_HEADER_FIELDS = 8
+_ALIGN = 64
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+class FrameTooLarge(ValueError):
+    """Raised by SharedFrameWriter for a frame that does not fit a ring slot."""
+
+class FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """
+        Single-producer ring of fixed-size frame slots in shared memory.
+        Every frame gets a sequence number; a slot's sequence is set to -1 while it is
+        being written, so readers can tell whether a view they hold was overwritten.
+        Use FrameRing.create in the owning process and FrameRing.attach elsewhere.
+        """
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        self.header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=buf)
+        self.slots = int(self.header[_SLOTS])
+        self.slot_bytes = int(self.header[_SLOT_BYTES])
+        offset = _align(self.header.nbytes)
+        self.slot_seq = np.ndarray((self.slots,), dtype=np.int64, buffer=buf, offset=offset)
+        offset = _align(offset + self.slot_seq.nbytes)
+        self.slot_time = np.ndarray((self.slots,), dtype=np.float64, buffer=buf, offset=offset)
+        offset = _align(offset + self.slot_time.nbytes)
+        self.slot_shape = np.ndarray((self.slots, 3), dtype=np.int64, buffer=buf, offset=offset)
+        offset = _align(offset + self.slot_shape.nbytes)
+        self.data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=buf, offset=offset)
+
+    @staticmethod
+    def _size(slots: int, slot_bytes: int) -> int:
+        offset = _align(_HEADER_FIELDS * 8)
+        offset = _align(offset + slots * 8)
+        offset = _align(offset + slots * 8)
+        offset = _align(offset + slots * 24)
+        return offset + slots * slot_bytes
+
+    @classmethod
+    def create(cls, slots: int, slot_bytes: int, name: Optional[str] = None) -> "FrameRing":
+        slots = max(2, slots)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls._size(slots, slot_bytes))
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[_SLOTS], header[_SLOT_BYTES] = slots, slot_bytes
+        del header
+        ring = cls(shm, owner=True)
+        ring.slot_seq[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRing":
+        # Spawned children share the creator's resource tracker, which unlinks the
+        # segment only if the creator exits without doing so
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def write_seq(self) -> int:
+        return int(self.header[_WRITE_SEQ])
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.header[_CLOSED])
+
+    @property
+    def oversized(self) -> int:
+        return int(self.header[_OVERSIZED])
+
+    def write(self, timestamp: float, frame: np.ndarray) -> int:
+        """Copy a frame into the next slot and publish it. Returns its sequence, or -1 if it does not fit."""
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        if frame.nbytes > self.slot_bytes or frame.ndim not in (2, 3):
+            self.header[_OVERSIZED] += 1
+            return -1
+        seq = self.write_seq + 1
+        slot = seq % self.slots
+        self.slot_seq[slot] = -1
+        self.data[slot, :frame.nbytes] = frame.reshape(-1)
+        self.slot_shape[slot] = frame.shape if frame.ndim == 3 else (*frame.shape, 0)
+        self.slot_time[slot] = timestamp
+        self.slot_seq[slot] = seq
+        self.header[_WRITE_SEQ] = seq
+        return seq
+
+    def read(self, seq: int) -> Optional[Tuple[float, np.ndarray]]:
+        """Zero-copy view of a frame, or None if its slot has been reused."""
+        slot = seq % self.slots
+        if seq <= 0 or self.slot_seq[slot] != seq:
+            return None
+        height, width, channels = self.slot_shape[slot].tolist()
+        shape = (height, width, channels) if channels else (height, width)
+        view = self.data[slot, :int(np.prod(shape))].reshape(shape)
+        timestamp = float(self.slot_time[slot])
+        return (timestamp, view) if self.valid(seq) else None
+
+    def valid(self, seq: int) -> bool:
+        """Whether a frame read earlier is still intact in its slot."""
+        return seq > 0 and self.slot_seq[seq % self.slots] == seq
+
+    def close_stream(self):
+        """Tell readers the producer is done."""
+        self.header[_CLOSED] = 1
+
+    def close(self):
+        # Views into the buffer have to go before the mapping can be closed
+        self.header = self.slot_seq = self.slot_time = self.slot_shape = self.data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A consumer still holds a frame view; the mapping goes away with it
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+class SharedFrameWriter:
+    def __init__(self, ring: FrameRing):
+        """Producer side with the FrameQueue interface used by CaptureThread."""
+        self.ring = ring
+
+    @property
+    def dropped(self) -> int:
+        return self.ring.oversized
+
+    def put(self, item: Tuple[float, Any], timeout: Optional[float] = None) -> bool:
+        timestamp, frame = item
+        if self.ring.write(timestamp, frame) < 0:
+            # Every later frame of the source would be rejected too, so the capture has to know
+            raise FrameTooLarge(
+                f"Frame of shape {np.shape(frame)} does not fit a {self.ring.slot_bytes}-byte ring slot; "
+                "raise SENTINEL_FRAME_RING_SLOT_BYTES"
+            )
+        return True
+
+    def close(self):
+        self.ring.close_stream()
+
+class SharedFrameReader:
+    def __init__(self, ring: FrameRing, poll_interval: float = 0.005):
+        """
+        Consumer side with the FrameQueue interface used by AgentRunner.
+        Always returns the newest published frame as a zero-copy view; frames published
+        in between are counted as dropped.
+        """
+        self.ring = ring
+        self.poll_interval = poll_interval
+        self.skipped = 0
+        self._seq = 0
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed or (self.ring.closed and self.ring.write_seq == self._seq)
+
+    @property
+    def dropped(self) -> int:
+        return self.skipped + self.ring.oversized
+
+    def _next(self) -> Optional[Tuple[float, np.ndarray]]:
+        seq = self.ring.write_seq
+        if seq <= self._seq:
+            return None
+        packet = self.ring.read(seq)
+        if packet is not None:
+            self.skipped += seq - self._seq - 1
+            self._seq = seq
+        return packet
+
+    async def get_async(self, timeout: Optional[float] = None) -> Optional[Tuple[float, np.ndarray]]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        while True:
+            packet = self._next()
+            if packet is not None or self.closed:
+                return packet
+            if deadline is not None and loop.time() >= deadline:
+                return None
+            await asyncio.sleep(self.poll_interval)
+
+    def valid(self) -> bool:
+        """Whether the last returned frame was not overwritten while it was in use."""
+        return self.ring.valid(self._seq)
+
+    def detach(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """Copy of the last returned frame for use after the ring moves on, or None if it was overwritten."""
+        copy = frame.copy()
+        return copy if self.valid() else None
+
+    def close(self):
+        self._closed = True
@@ -7,7 +7,7 @@ export interface Worker {
   y: number; // percentage 0-100
   hasHelmet: boolean;
   hasVest: boolean;
-  zone: 'Safe' | 'Loading Dock' | 'Excavation Pit';
+  zone: string; // Zone names come from the backend zone config
   status: 'Moving' | 'Stationary' | 'Working';
   lastSeen: string;
 }
@@ -22,13 +22,15 @@ export interface Incident {
   details: string;
   acknowledged: boolean;
   notes?: { timestamp: string, content: string }[];
+  cameraId?: string | null;
+  zone?: string | null;
 }
 
 export interface TimelineEvent {
   id: string;
   workerId: string;
   timestamp: string;
-  type: 'Zone Change' | 'Status Change' | 'Violation';
+  type: 'Zone Change' | 'Status Change' | 'Violation' | 'Worker Left';
   description: string;
 }
 
@@ -58,6 +60,8 @@ export const ZONES = [
 ];
 
 const API_URL = 'http://localhost:8000';
+// Requested page size; the server may cap it lower (SENTINEL_ANALYSIS_PAGE_SIZE) and reports the limit it used
+export const ANALYSIS_PAGE_SIZE = 500;
 
 // Axios instance with interceptor for token
 export const axiosInstance = axios.create({
@@ -106,6 +110,12 @@ export const api = {
         const res = await axiosInstance.get(`/analysis/status/${taskId}`);
         return res.data;
     },
+    getAnalysisFrames: async (taskId: string, offset: number, limit: number = ANALYSIS_PAGE_SIZE) => {
+        // Per-frame results are paged from disk; the player only loads pages near the playback position
+        const res = await axiosInstance.get(`/analysis/results/${taskId}/frames`, { params: { offset, limit } });
+        return res.data;
+    },
+    getAnalysisExportUrl: (taskId: string) => `${API_URL}/analysis/results/${taskId}/stream`,
     startAnalysis: async () => {
         const res = await axiosInstance.post('/analysis/start');
         return res.data;
@@ -1,38 +1,75 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { AlertTriangle, Shield, User, ZoomIn, ZoomOut } from 'lucide-react';
-import { Worker, ZONES } from '../api';
+import { api, ANALYSIS_PAGE_SIZE, Worker, ZONES } from '../api';
 
 interface VideoPlayerProps {
     workers?: Worker[];
     simplified?: boolean;
     videoUrl?: string;
+    taskId?: string;
     metadata?: any;
 }
 
-const VideoPlayer = ({ workers: propWorkers = [], simplified = false, videoUrl, metadata }: VideoPlayerProps) => {
+// Result pages held at once; the rest of a long video stays on the server
+const CACHED_PAGES = 3;
+
+const VideoPlayer = ({ workers: propWorkers = [], simplified = false, videoUrl, taskId, metadata }: VideoPlayerProps) => {
   const [zoom, setZoom] = useState(1);
   const [pan, setPan] = useState({ x: 0, y: 0 });
   const [isDragging, setIsDragging] = useState(false);
   const videoRef = useRef<HTMLVideoElement>(null);
   const [localWorkers, setLocalWorkers] = useState<Worker[]>([]);
 
-  // If we have videoUrl and metadata, we sync workers to video time
-  const workers = videoUrl && metadata ? localWorkers : propWorkers;
+  // If we have videoUrl and analysis results, we sync workers to video time
+  const workers = videoUrl && taskId && metadata ? localWorkers : propWorkers;
 
   useEffect(() => {
-    if (!videoUrl || !metadata) return;
-    
+    if (!videoUrl || !taskId || !metadata) return;
+
+    // Cached frames keyed by the offset of their page
+    const pages = new Map<number, any[]>();
+    const loading = new Set<number>();
+    let pageSize = ANALYSIS_PAGE_SIZE;
+    let index = 0;
+    let cancelled = false;
     let animationFrameId: number;
-    
+
+    const loadPage = (offset: number) => {
+        if (pages.has(offset) || loading.has(offset)) return;
+        loading.add(offset);
+        api.getAnalysisFrames(taskId, offset, pageSize)
+            .then(res => {
+                if (cancelled) return;
+                // Pages are aligned to the size the server actually serves
+                pageSize = res.limit;
+                pages.set(res.offset, res.frames);
+                // Drop the page farthest from the playback position
+                if (pages.size > CACHED_PAGES) {
+                    const farthest = [...pages.keys()].sort((a, b) => Math.abs(b - index) - Math.abs(a - index))[0];
+                    pages.delete(farthest);
+                }
+            })
+            .catch(e => console.error(e))
+            .finally(() => loading.delete(offset));
+    };
+
+    const frameAt = (i: number) => {
+        for (const [offset, frames] of pages) {
+            if (i >= offset && i < offset + frames.length) return frames[i - offset];
+        }
+        return undefined;
+    };
+
     const update = () => {
         if (videoRef.current) {
-            const currentTime = videoRef.current.currentTime;
-            // Find closest frame in metadata
-            const frameData = metadata.frames.find((f: any, i: number) => {
-                const next = metadata.frames[i+1];
-                return f.timestamp <= currentTime && (!next || next.timestamp > currentTime);
-            });
-            
+            // Every video frame has a record, so the playback time maps straight to an index
+            index = Math.floor(videoRef.current.currentTime * (metadata.fps || 0));
+            const offset = Math.floor(index / pageSize) * pageSize;
+            loadPage(offset);
+            // Prefetch the next page before playback reaches it
+            loadPage(offset + pageSize);
+
+            const frameData = frameAt(index);
             if (frameData) {
                 setLocalWorkers(frameData.workers);
             }
@@ -41,8 +78,11 @@ const VideoPlayer = ({ workers: propWorkers = [], simplified = false, videoUrl,
     };
     
     animationFrameId = requestAnimationFrame(update);
-    return () => cancelAnimationFrame(animationFrameId);
-  }, [videoUrl, metadata]);
+    return () => {
+        cancelled = true;
+        cancelAnimationFrame(animationFrameId);
+    };
+  }, [videoUrl, taskId, metadata]);
 
   const handleWheel = (e: React.WheelEvent) => {
     if (simplified) return;
@@ -29,9 +29,10 @@ const VideoAnalysis = () => {
                 try {
                     const res = await api.getAnalysisStatus(taskId);
                     if (res.status === 'completed') {
+                        clearInterval(interval);
+                        // Frames are paged in by the player as the video plays
                         setResult(res.result);
                         setStatus('completed');
-                        clearInterval(interval);
                     } else if (res.status === 'failed') {
                         setStatus('failed');
                         clearInterval(interval);
@@ -47,11 +48,11 @@ const VideoAnalysis = () => {
     }, [status, taskId]);
 
     const handleExport = () => {
-        if (!result) return;
-        const dataStr = "data:text/json;charset=utf-8," + encodeURIComponent(JSON.stringify(result, null, 2));
+        if (!result || !taskId) return;
+        // The server streams the stored NDJSON, so the report is never built in the browser
         const downloadAnchorNode = document.createElement('a');
-        downloadAnchorNode.setAttribute("href", dataStr);
-        downloadAnchorNode.setAttribute("download", `analysis_${camera?.id}.json`);
+        downloadAnchorNode.setAttribute("href", api.getAnalysisExportUrl(taskId));
+        downloadAnchorNode.setAttribute("download", `analysis_${camera?.id}.ndjson`);
         document.body.appendChild(downloadAnchorNode);
         downloadAnchorNode.click();
         downloadAnchorNode.remove();
@@ -91,7 +92,8 @@ const VideoAnalysis = () => {
                         <div className="bg-slate-900 border border-slate-800 rounded-lg overflow-hidden aspect-video">
                             <VideoPlayer 
                                 videoUrl={videoUrl}
-                                metadata={result}
+                                taskId={taskId ?? undefined}
+                                metadata={result.metadata}
                             />
                         </div>
                         <div className="flex justify-between items-center bg-slate-900/50 p-4 rounded-lg border border-slate-800">